@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+
+class EmbeddingCacheProvider(ABC):
+    """
+    Abstract base class for embedding caches.
+    Keys are opaque strings built from the embedding model and the normalized text.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[float]]:
+        """
+        Look up a cached embedding.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            list | None: The embedding, or None if it is missing or expired.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def set(self, key: str, embedding: List[float]) -> None:
+        """
+        Store an embedding.
+
+        Args:
+            key (str): The cache key.
+            embedding (list): The embedding vector.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def close(self) -> None:
+        """Release any resources held by the cache."""
+        pass
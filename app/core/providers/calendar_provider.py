@@ -1,14 +1,18 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from langchain_core.tools import tool
 
-class CalendarProvider(ABC):
+class AsyncCalendarProvider(ABC):
+    """
+    Abstract base class for calendar providers, whose calls run on the event loop.
+
+    Every method takes an optional `workspace_id`; when given, only the workspace's
+    own accounts may be used, and appointments are only looked up in them.
+    """
 
-    @tool("schedule_appointment")
     @abstractmethod
-    def schedule_appointment(
+    async def schedule_appointment(
         self,
         user_id: str,
         start_time: datetime,
@@ -16,6 +20,7 @@ class CalendarProvider(ABC):
         title: str,
         description: Optional[str] = None,
         location: Optional[str] = None,
+        workspace_id: Optional[str] = None,
     ) -> str:
         """
         Schedule an appointment for a user.
@@ -27,36 +32,30 @@ class CalendarProvider(ABC):
             title (str): The title of the appointment.
             description (Optional[str]): A description of the appointment.
             location (Optional[str]): The location of the appointment.
+            workspace_id (Optional[str]): Only accept the workspace's own accounts.
 
         Returns:
-            str: Confirmation message or appointment ID.
+            str: The appointment ID.
         """
         pass
 
-    @tool("cancel_appointment")
     @abstractmethod
-    def cancel_appointment(
-        self,
-        appointment_id: str
-    ) -> bool:
+    async def cancel_appointment(self, appointment_id: str, workspace_id: Optional[str] = None) -> bool:
         """
         Cancel an existing appointment using the appointment ID.
-        
+
         Args:
             appointment_id (str): The ID of the appointment to cancel.
-        
+            workspace_id (Optional[str]): Only look for it in the workspace's accounts.
+
         Returns:
             bool: True if the appointment was successfully cancelled, False otherwise.
         """
         pass
 
-    @tool("check_availability")
     @abstractmethod
-    def check_availability(
-        self,
-        user_id: str,
-        start_time: datetime,
-        end_time: datetime
+    async def check_availability(
+        self, user_id: str, start_time: datetime, end_time: datetime, workspace_id: Optional[str] = None
     ) -> bool:
         """
         Check if a user is available for an appointment within a specified time range.
@@ -64,18 +63,15 @@ class CalendarProvider(ABC):
             user_id (str): The ID of the user.
             start_time (datetime): The start time of the appointment.
             end_time (datetime): The end time of the appointment.
+            workspace_id (Optional[str]): Only accept the workspace's own accounts.
         Returns:
             bool: True if the user is available, False otherwise.
         """
         pass
 
-    @tool("get_availability_slots")
     @abstractmethod
-    def get_availability_slots(
-        self,
-        user_id: str,
-        start_date: datetime,
-        end_date: datetime
+    async def get_availability_slots(
+        self, user_id: str, start_date: datetime, end_date: datetime, workspace_id: Optional[str] = None
     ) -> List[Dict[str, datetime]]:
         """
         Get available time slots for a user within a specified date range.
@@ -84,17 +80,20 @@ class CalendarProvider(ABC):
             user_id (str): The ID of the user.
             start_date (datetime): The start date of the range.
             end_date (datetime): The end date of the range.
+            workspace_id (Optional[str]): Only accept the workspace's own accounts.
 
         Returns:
             List[Dict[str, datetime]]: A list of available time slots with start and end times.
         """
         pass
 
-    @tool("reschedule_appointment")
     @abstractmethod
-    def reschedule_appointment(
-        self, appointment_id: str, new_start_time: datetime, new_end_time: datetime
+    async def reschedule_appointment(
+        self,
+        appointment_id: str,
+        new_start_time: datetime,
+        new_end_time: datetime,
+        workspace_id: Optional[str] = None,
     ) -> bool:
-        """Reschedule an existing appointment to a new time slot."""
+        """Reschedule an existing appointment to a new time slot, looked up in the workspace's accounts."""
         pass
-    
\ No newline at end of file
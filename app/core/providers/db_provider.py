@@ -1,3 +1,4 @@
+import threading
 from abc import ABC, abstractmethod
 
 class DBProvider(ABC):
@@ -9,6 +10,22 @@ class DBProvider(ABC):
     def __init__(self, db_config, tokenizer=None):
         self.db_config = db_config
         self.tokenizer = tokenizer
+        self._connected = False
+        self._connect_lock = threading.Lock()
+
+    def ensure_connected(self):
+        """
+        Connect on first use, once, even when called from several threads.
+
+        Lets a provider be constructed without blocking on I/O and connected during
+        application warm-up or by whichever request needs it first.
+        """
+        if self._connected:
+            return
+        with self._connect_lock:
+            if not self._connected:
+                self.connect()
+                self._connected = True
 
     @abstractmethod
     def connect(self):
@@ -39,15 +56,71 @@ class DBProvider(ABC):
         """
         raise NotImplementedError("Subclasses must implement this method.")
     
-    def retrieve_similar(self, query, k=1):
+    def add_documents(self, documents, collection, persist=True):
+        """
+        Add or update several documents, embedding them in batches.
+
+        Subclasses should override this with a bulk write; the default adds one at a time.
+
+        Args:
+            documents (list[dict]): The documents to add.
+            collection (str): The target collection.
+            persist (bool): Whether to save the collection now. Bulk loads pass False
+                and call `flush` once at the end; providers whose writes are durable ignore it.
+
+        Returns:
+            dict: Counts of `upserted`, `modified` and `failed` documents.
+        """
+        added = sum(1 for document in documents if self.add_document(document, collection))
+        return {"upserted": added, "modified": 0, "failed": len(documents) - added}
+
+    def get_documents(self, resource, keys):
+        """
+        Fetch documents by key, as stored now.
+
+        Args:
+            resource (str): The collection, 'products' or 'services'.
+            keys (list[tuple]): `document_key` of each document.
+
+        Returns:
+            list[dict]: The documents found, in the order of `keys`; missing ones are left out.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def flush(self, collection):
+        """
+        Save writes made with `persist=False`. A no-op for providers whose writes are durable.
+
+        Args:
+            collection (str): The collection to save.
+        """
+
+    def embed_many(self, texts):
+        """
+        Embed several texts, batched when the tokenizer supports it.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list: One embedding per text, in order.
+        """
+        embed_many = getattr(self.tokenizer, "embed_many", None)
+        if embed_many is not None:
+            return embed_many(texts)
+        return [self.tokenizer(text) for text in texts]
+
+    def retrieve_similar(self, query, resource, k=1, workspace_id=None):
         """
         Retrieve top-k similar documents based on a query.
         
         Args:
             query (str): The query string to search for.
+            resource (str): The collection to search, 'products' or 'services'.
             k (int): The number of similar documents to retrieve.
+            workspace_id (str | None): Restrict the search to one workspace's documents.
         
         Returns:
             list: A list of similar documents.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement this method.")
@@ -0,0 +1,87 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+
+class SharedStateProvider(ABC):
+    """
+    Abstract base class for state shared by every worker (and node) serving calls.
+    Keys and values are strings; callers serialize structured values themselves.
+    Implementations must be safe to call from several threads.
+    """
+
+    @abstractmethod
+    def hset(self, name: str, field: str, value: str) -> None:
+        """
+        Set one field of a hash.
+
+        Args:
+            name (str): The hash key.
+            field (str): The field within the hash.
+            value (str): The value to store.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def hdel(self, name: str, field: str) -> None:
+        """Remove one field of a hash, if present."""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def hgetall(self, name: str) -> Dict[str, str]:
+        """Return every field of a hash (empty if the hash does not exist)."""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically add to a counter.
+
+        Args:
+            key (str): The counter key.
+            amount (int): The increment, may be negative.
+            ttl (float | None): Seconds until the counter expires, e.g. a rate window.
+
+        Returns:
+            int: The value after the increment.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        """Return a counter's value, 0 if it is missing or expired."""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def add_member(self, name: str, member: str, ttl: float, limit: int = 0) -> bool:
+        """
+        Add or refresh a member of an expiring set.
+
+        Args:
+            name (str): The set key.
+            member (str): The member, e.g. a call id.
+            ttl (float): Seconds until the member expires unless refreshed again.
+            limit (int): Maximum live members; 0 means unlimited. Refreshing an
+                existing member always succeeds.
+
+        Returns:
+            bool: False if the set was full and the member was not added.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def remove_member(self, name: str, member: str) -> None:
+        """Remove a member of an expiring set, if present."""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @abstractmethod
+    def members(self, name: str) -> Dict[str, float]:
+        """Return the live members of an expiring set with their expiry (epoch seconds)."""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def ping(self) -> None:
+        """Raise if the backend is unreachable."""
+        pass
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+        pass
@@ -0,0 +1,93 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config.services import ADMISSION
+
+WORKER_FULL = "worker_full"
+GLOBAL_FULL = "global_full"
+RATE_LIMITED = "rate_limited"
+
+
+class AdmissionController:
+    """Decides in `/incoming-call` whether this worker takes another call.
+
+    A call is turned away when the worker already relays `max_calls` streams
+    (calls admitted in the last `pending_ttl` seconds whose stream has not started
+    yet count too, so a burst of webhooks cannot overshoot), when the shared
+    active-call cap is reached, or when the latest OpenAI `rate_limits.updated`
+    left less than `min_headroom` of any limit before it resets.
+    """
+
+    def __init__(
+        self,
+        max_calls: int = ADMISSION.max_calls,
+        pending_ttl: float = ADMISSION.pending_ttl,
+        min_headroom: float = ADMISSION.min_headroom,
+    ) -> None:
+        self.max_calls = max_calls
+        self.pending_ttl = pending_ttl
+        self.min_headroom = min_headroom
+        self.active = 0
+        self._pending: Deque[float] = deque()  # admission times of calls whose stream has not started
+        self._limits: Dict[str, Tuple[float, float]] = {}  # limit name -> (remaining share, valid until)
+        self.stats = {"admitted": 0, WORKER_FULL: 0, GLOBAL_FULL: 0, RATE_LIMITED: 0}
+
+    @property
+    def pending(self) -> int:
+        cutoff = time.monotonic() - self.pending_ttl
+        while self._pending and self._pending[0] < cutoff:
+            self._pending.popleft()
+        return len(self._pending)
+
+    def headroom(self) -> Optional[float]:
+        """Smallest remaining share of an OpenAI rate limit that has not reset yet; None if unknown."""
+        now = time.monotonic()
+        shares = [share for share, valid_until in self._limits.values() if valid_until > now]
+        return min(shares) if shares else None
+
+    def check(self, active_calls: Optional[int] = None, max_active_calls: int = 0) -> Optional[str]:
+        """Return why a new call must be rejected, or None and count it as admitted.
+
+        `active_calls` is the shared count across workers, checked against
+        `max_active_calls` when that cap is set.
+        """
+        if self.max_calls and self.active + self.pending >= self.max_calls:
+            reason = WORKER_FULL
+        elif max_active_calls and active_calls is not None and active_calls >= max_active_calls:
+            reason = GLOBAL_FULL
+        elif (headroom := self.headroom()) is not None and headroom < self.min_headroom:
+            reason = RATE_LIMITED
+        else:
+            self._pending.append(time.monotonic())
+            self.stats["admitted"] += 1
+            return None
+        self.stats[reason] += 1
+        return reason
+
+    def stream_started(self) -> None:
+        if self._pending:
+            self._pending.popleft()
+        self.active += 1
+
+    def stream_ended(self) -> None:
+        self.active = max(self.active - 1, 0)
+
+    def on_rate_limits(self, rate_limits: List[dict]) -> None:
+        """Record the limits of a `rate_limits.updated` event from any call's session."""
+        now = time.monotonic()
+        for limit in rate_limits or []:
+            try:
+                share = limit["remaining"] / limit["limit"] if limit["limit"] else 1.0
+                self._limits[limit["name"]] = (share, now + float(limit.get("reset_seconds", 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "pending": self.pending,
+            "max_calls": self.max_calls,
+            "rate_limit_headroom": self.headroom(),
+            **self.stats,
+        }
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class AppointmentIndex:
+    """Persistent map of calendar event id -> `(account_id, calendar_id)`.
+
+    Filled when an appointment is scheduled so cancel and reschedule can go
+    straight to the owning account instead of probing every account.
+    """
+
+    def __init__(self, path: str) -> None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS appointments "
+            "(event_id TEXT PRIMARY KEY, account_id TEXT, calendar_id TEXT, created_at REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, event_id: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT account_id, calendar_id FROM appointments WHERE event_id = ?", (event_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, event_id: str, account_id: str, calendar_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO appointments (event_id, account_id, calendar_id, created_at) VALUES (?, ?, ?, ?)",
+                (event_id, account_id, calendar_id, time.time()),
+            )
+
+    def delete(self, event_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM appointments WHERE event_id = ?", (event_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
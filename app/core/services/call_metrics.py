@@ -0,0 +1,45 @@
+from app.utils.metrics import REGISTRY
+
+# Served at GET /metrics. Label values are kept to a small fixed set.
+CALLS = REGISTRY.counter("calls", "Twilio media streams accepted.")
+CALLS_ACTIVE = REGISTRY.gauge("calls_active", "Twilio media streams currently open.")
+SESSION_READY = REGISTRY.histogram(
+    "call_session_ready_seconds", "Twilio stream connected until its OpenAI Realtime session is ready."
+)
+FIRST_AUDIO = REGISTRY.histogram(
+    "call_first_audio_seconds", "Twilio stream connected until the first assistant audio delta is relayed."
+)
+INTERRUPTION = REGISTRY.histogram(
+    "call_interruption_seconds", "speech_started received until the truncate and clear are sent."
+)
+TOOL_CALL = REGISTRY.histogram(
+    "tool_call_seconds", "Function call received until its output and response.create are sent.", ("tool",)
+)
+RAG_EMBEDDING = REGISTRY.histogram(
+    "rag_embedding_seconds", "Query embedding in retrieve_similar, cache hits included.", ("backend",)
+)
+RAG_SEARCH = REGISTRY.histogram(
+    "rag_vector_search_seconds", "Search step of retrieve_similar (backend 'lexical' is the BM25 index).", ("backend",)
+)
+RAG_PATH = REGISTRY.counter(
+    "rag_retrievals", "Hybrid retrievals by path: lexical only, fused, or lexical after a vector failure.", ("path",)
+)
+RAG_PREFETCH = REGISTRY.counter(
+    "rag_prefetch", "Speculative retrievals from caller transcripts: started, skipped while the prefetch threads were busy, and rag_search calls they hit or missed.", ("outcome",)
+)
+ADMISSIONS = REGISTRY.counter(
+    "call_admissions", "/incoming-call decisions: admitted, or rejected as worker_full, global_full or rate_limited.", ("outcome",)
+)
+FRAMES = REGISTRY.counter("media_frames_relayed", "Media frames relayed between Twilio and OpenAI.", ("direction",))
+FRAMES_IN = FRAMES.labels(direction="inbound")
+FRAMES_OUT = FRAMES.labels(direction="outbound")
+RELAY_QUEUE_DEPTH = REGISTRY.gauge(
+    "relay_queue_depth", "Entries waiting in the relay queues of this worker's calls.", ("direction",)
+)
+RELAY_QUEUE_OVERFLOW = REGISTRY.counter(
+    "relay_queue_overflow", "Inbound frames dropped from a full queue; outbound deltas merged into a queued frame.", ("direction",)
+)
+QUEUE_IN_DEPTH = RELAY_QUEUE_DEPTH.labels(direction="inbound")
+QUEUE_OUT_DEPTH = RELAY_QUEUE_DEPTH.labels(direction="outbound")
+QUEUE_IN_DROPPED = RELAY_QUEUE_OVERFLOW.labels(direction="inbound")
+QUEUE_OUT_COALESCED = RELAY_QUEUE_OVERFLOW.labels(direction="outbound")
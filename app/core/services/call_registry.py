@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Dict, List
+
+from app.core.providers.state_provider import SharedStateProvider
+from config.services import SHARED_STATE
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_CALLS = "calls:active"
+CALL_INFO = "calls:info"
+
+
+class CallRegistry:
+    """Active calls and call-rate counters shared by every worker.
+
+    A call is a member of an expiring set while its stream is relayed; the owning
+    worker refreshes its calls every `ttl / 3` seconds (`heartbeat`), so calls of
+    a crashed worker drop out after `ttl`. `register` enforces `max_active`
+    across all workers at once. Methods are blocking; call them via
+    `asyncio.to_thread` from the event loop.
+    """
+
+    def __init__(
+        self,
+        state: SharedStateProvider,
+        max_active: int = SHARED_STATE.max_active_calls,
+        ttl: float = SHARED_STATE.call_ttl,
+        rate_window: int = SHARED_STATE.rate_window,
+    ) -> None:
+        self.state = state
+        self.max_active = max_active
+        self.ttl = ttl
+        self.rate_window = rate_window
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._local: Dict[str, float] = {}  # call id -> started_at, for calls relayed by this worker
+
+    def register(self, call_id: str, **info) -> bool:
+        """Record a call as active; False when the global cap is reached."""
+        if not self.state.add_member(ACTIVE_CALLS, call_id, self.ttl, self.max_active):
+            return False
+        started_at = time.time()
+        self._local[call_id] = started_at
+        self.state.hset(CALL_INFO, call_id, json.dumps({"worker": self.worker, "started_at": started_at, **info}))
+        self.hit("calls")
+        return True
+
+    def unregister(self, call_id: str) -> None:
+        self._local.pop(call_id, None)
+        self.state.remove_member(ACTIVE_CALLS, call_id)
+        self.state.hdel(CALL_INFO, call_id)
+
+    def refresh(self) -> None:
+        """Extend the expiry of every call this worker is relaying."""
+        for call_id in list(self._local):
+            self.state.add_member(ACTIVE_CALLS, call_id, self.ttl)
+
+    def active_count(self) -> int:
+        return len(self.state.members(ACTIVE_CALLS))
+
+    def active(self) -> List[dict]:
+        """Live calls across all workers; details left behind by crashed workers are dropped."""
+        live = self.state.members(ACTIVE_CALLS)
+        calls = []
+        for call_id, raw in self.state.hgetall(CALL_INFO).items():
+            if call_id in live:
+                calls.append({"call_id": call_id, **json.loads(raw)})
+            else:
+                self.state.hdel(CALL_INFO, call_id)
+        return sorted(calls, key=lambda c: c["started_at"])
+
+    # ---------------
+    # Rate counters
+    # ---------------
+    def _window_key(self, name: str, offset: int = 0) -> str:
+        return f"rate:{name}:{int(time.time() // self.rate_window) - offset}"
+
+    def hit(self, name: str, amount: int = 1) -> int:
+        """Count an event in the current window; returns the window's count so far."""
+        return self.state.incr(self._window_key(name), amount, ttl=self.rate_window * 2)
+
+    def rate(self, name: str) -> int:
+        """Events counted in the last full window."""
+        return self.state.get_counter(self._window_key(name, offset=1))
+
+    async def heartbeat(self) -> None:
+        """Refresh this worker's calls until cancelled; run as a task from the lifespan hook."""
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning("Refreshing active calls failed: %s", e)
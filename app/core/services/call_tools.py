@@ -0,0 +1,209 @@
+from datetime import datetime
+
+from app.core.providers.calendar_provider import AsyncCalendarProvider
+from app.core.providers.db_provider import DBProvider
+from app.core.services.tool_registry import ToolRegistry
+from app.utils.functions import format_documents
+
+# ---------------
+# JSON schemas announced to the model
+# ---------------
+
+ACCOUNT_ID = {"type": "string", "description": "The calendar account ID."}
+DATE_TIME = {"type": "string", "format": "date-time"}
+
+RAG_SEARCH_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "query": {
+            "type": "string",
+            "description": "The natural language query to search in the RAG database."
+        },
+        "resource": {
+            "type": "string",
+            "description": "The resource to search in the RAG database, only can be 'services' or 'products'.",
+            "default": "services"
+        },
+        "top_k": {
+            "type": "integer",
+            "description": "Number of most relevant documents to return.",
+            "default": 5
+        }
+    },
+    "required": ["query"]
+}
+
+SCHEDULE_APPOINTMENT_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "account_id": ACCOUNT_ID,
+        "start_time": {**DATE_TIME, "description": "Start time of the appointment in ISO 8601 format."},
+        "end_time": {**DATE_TIME, "description": "End time of the appointment in ISO 8601 format."},
+        "title": {"type": "string", "description": "Title of the appointment."},
+        "description": {"type": ["string", "null"], "description": "Description of the appointment.", "default": None},
+        "location": {"type": ["string", "null"], "description": "Location of the appointment.", "default": None}
+    },
+    "required": ["account_id", "start_time", "end_time", "title"]
+}
+
+CHECK_AVAILABILITY_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "account_id": ACCOUNT_ID,
+        "start_time": {**DATE_TIME, "description": "Start of the time range in ISO 8601 format."},
+        "end_time": {**DATE_TIME, "description": "End of the time range in ISO 8601 format."}
+    },
+    "required": ["account_id", "start_time", "end_time"]
+}
+
+AVAILABILITY_SLOTS_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "account_id": ACCOUNT_ID,
+        "start_date": {**DATE_TIME, "description": "Start of the search range in ISO 8601 format."},
+        "end_date": {**DATE_TIME, "description": "End of the search range in ISO 8601 format."}
+    },
+    "required": ["account_id", "start_date", "end_date"]
+}
+
+CANCEL_APPOINTMENT_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "appointment_id": {"type": "string", "description": "The ID returned when the appointment was scheduled."}
+    },
+    "required": ["appointment_id"]
+}
+
+RESCHEDULE_APPOINTMENT_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "appointment_id": {"type": "string", "description": "The ID returned when the appointment was scheduled."},
+        "new_start_time": {**DATE_TIME, "description": "New start time in ISO 8601 format."},
+        "new_end_time": {**DATE_TIME, "description": "New end time in ISO 8601 format."}
+    },
+    "required": ["appointment_id", "new_start_time", "new_end_time"]
+}
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp from the model, accepting a trailing 'Z'."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"'{value}' is not an ISO 8601 date-time")
+
+
+# ---------------
+# Handlers
+# ---------------
+
+def register_rag_tools(registry: ToolRegistry, database: DBProvider) -> None:
+    """`rag_search`, answered from the call's prefetch cache when it has the result."""
+
+    async def rag_search(arguments: dict, context: dict) -> str:
+        resource = arguments.get('resource', 'services')
+        k = arguments.get('top_k', 2)
+        prefetch = context.get('prefetch')
+        # Usually already searched from the caller's transcript while they spoke.
+        documents = await prefetch.lookup(arguments['query'], resource, k) if prefetch else None
+        if documents is not None:
+            result = format_documents(documents)
+        else:
+            result = await registry.executor.run(
+                database.retrieve_similar,
+                arguments['query'],
+                resource,
+                k=k,
+                workspace_id=context.get('workspace_id')
+            )
+        return f"Context from Database:\n {result}"
+
+    registry.register(
+        "rag_search",
+        "Search the knowledge base and return relevant documents about services and products.",
+        RAG_SEARCH_PARAMETERS,
+        rag_search,
+    )
+
+
+def register_calendar_tools(registry: ToolRegistry, calendar: AsyncCalendarProvider) -> None:
+    """The `AsyncCalendarProvider` operations, awaited on the event loop.
+
+    The model picks account and appointment ids, so every call is limited to the
+    calendar accounts of the call's workspace.
+    """
+
+    async def schedule_appointment(arguments: dict, context: dict) -> str:
+        appointment_id = await calendar.schedule_appointment(
+            user_id=arguments['account_id'],
+            title=arguments['title'],
+            start_time=parse_datetime(arguments['start_time']),
+            end_time=parse_datetime(arguments['end_time']),
+            description=arguments.get('description'),
+            location=arguments.get('location'),
+            workspace_id=context.get('workspace_id'),
+        )
+        return f"Appointment scheduled. Appointment ID: {appointment_id}"
+
+    async def check_availability(arguments: dict, context: dict) -> str:
+        available = await calendar.check_availability(
+            arguments['account_id'],
+            parse_datetime(arguments['start_time']),
+            parse_datetime(arguments['end_time']),
+            workspace_id=context.get('workspace_id'),
+        )
+        return "The time range is free." if available else "The time range is not available."
+
+    async def get_availability_slots(arguments: dict, context: dict) -> list:
+        slots = await calendar.get_availability_slots(
+            arguments['account_id'],
+            parse_datetime(arguments['start_date']),
+            parse_datetime(arguments['end_date']),
+            workspace_id=context.get('workspace_id'),
+        )
+        return [{"start": slot["start"].isoformat(), "end": slot["end"].isoformat()} for slot in slots]
+
+    async def cancel_appointment(arguments: dict, context: dict) -> str:
+        if await calendar.cancel_appointment(arguments['appointment_id'], workspace_id=context.get('workspace_id')):
+            return "The appointment was cancelled."
+        return "No appointment with that ID was found."
+
+    async def reschedule_appointment(arguments: dict, context: dict) -> str:
+        moved = await calendar.reschedule_appointment(
+            arguments['appointment_id'],
+            parse_datetime(arguments['new_start_time']),
+            parse_datetime(arguments['new_end_time']),
+            workspace_id=context.get('workspace_id'),
+        )
+        return "The appointment was rescheduled." if moved else "No appointment with that ID was found."
+
+    registry.register(
+        "schedule_appointment",
+        "Schedule an appointment to the calendar.",
+        SCHEDULE_APPOINTMENT_PARAMETERS,
+        schedule_appointment,
+    )
+    registry.register(
+        "check_availability",
+        "Check whether the calendar is free for the whole time range.",
+        CHECK_AVAILABILITY_PARAMETERS,
+        check_availability,
+    )
+    registry.register(
+        "get_availability_slots",
+        "List free 30-minute slots in the calendar within a date range.",
+        AVAILABILITY_SLOTS_PARAMETERS,
+        get_availability_slots,
+    )
+    registry.register(
+        "cancel_appointment",
+        "Cancel an existing appointment.",
+        CANCEL_APPOINTMENT_PARAMETERS,
+        cancel_appointment,
+    )
+    registry.register(
+        "reschedule_appointment",
+        "Move an existing appointment to a new time.",
+        RESCHEDULE_APPOINTMENT_PARAMETERS,
+        reschedule_appointment,
+    )
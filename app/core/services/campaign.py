@@ -0,0 +1,597 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import random
+import secrets
+import socket
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.providers.state_provider import SharedStateProvider
+from config.services import CAMPAIGN
+
+logger = logging.getLogger(__name__)
+
+# Twilio final call statuses worth another attempt.
+RETRY_STATUSES = {"busy", "no-answer", "failed"}
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Shared-state keys.
+CAMPAIGNS = "campaigns"  # campaign id -> campaign JSON without its calls
+CAMPAIGN_CALLS = "campaign:{}:calls"  # call index -> call JSON
+STATUS_MAILBOX = "campaign:statuses"  # call sid -> final status posted by any worker
+CANCEL_MAILBOX = "campaign:cancels"  # campaign id -> cancel requested by any worker
+DIALER_LEASE = "campaign:dialer"  # expiring set holding the one worker that dials
+
+
+class CampaignCall:
+    """One number of a campaign and the state of its latest attempt."""
+
+    def __init__(self, campaign: "Campaign", index: int, number: str) -> None:
+        self.campaign = campaign
+        self.index = index
+        self.number = number
+        self.status = "queued"  # queued, dialing, in-progress, retrying, completed, failed, cancelled
+        self.attempts = 0
+        self.call_sid: Optional[str] = None
+        self.sids: List[str] = []  # every call placed for this number, to tell a new one from an earlier attempt's
+        self.last_error: Optional[str] = None
+        self.deadline: Optional[float] = None  # time.monotonic() at which the call frees its slot
+        self.dialed_at: Optional[float] = None  # epoch seconds of the latest create-call request
+
+    def as_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "status": self.status,
+            "attempts": self.attempts,
+            "call_sid": self.call_sid,
+            "last_error": self.last_error,
+        }
+
+    def to_state(self) -> dict:
+        state = self.as_dict()
+        state["dialed_at"] = self.dialed_at
+        state["sids"] = self.sids
+        if self.deadline is not None:
+            state["deadline_at"] = time.time() + self.deadline - time.monotonic()
+        return state
+
+    def load_state(self, state: dict) -> None:
+        self.status = state["status"]
+        self.attempts = state.get("attempts", 0)
+        self.call_sid = state.get("call_sid")
+        self.last_error = state.get("last_error")
+        self.dialed_at = state.get("dialed_at")
+        self.sids = state.get("sids", [])
+        if state.get("deadline_at") is not None:
+            self.deadline = time.monotonic() + state["deadline_at"] - time.time()
+
+
+class Campaign:
+    def __init__(self, campaign_id: str, numbers: List[str]) -> None:
+        self.id = campaign_id
+        self.calls = [CampaignCall(self, index, number) for index, number in enumerate(numbers)]
+        self.created_at = time.time()
+        self.cancelled = False
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return all(call.status in FINAL_STATUSES for call in self.calls)
+
+    def as_dict(self, details: bool = True) -> dict:
+        counts: Dict[str, int] = {}
+        for call in self.calls:
+            counts[call.status] = counts.get(call.status, 0) + 1
+        report = {
+            "id": self.id,
+            "created_at": self.created_at,
+            "cancelled": self.cancelled,
+            "done": self.done,
+            "total": len(self.calls),
+            "counts": counts,
+        }
+        if details:
+            report["calls"] = [call.as_dict() for call in self.calls]
+        return report
+
+    def to_state(self) -> dict:
+        return {"id": self.id, "created_at": self.created_at, "cancelled": self.cancelled, "finished_at": self.finished_at}
+
+
+class CampaignStore:
+    """Campaigns in the shared-state backend, so every worker can serve them.
+
+    Only the dialing worker writes campaigns and calls; other workers read them
+    and post status callbacks and cancellations to mailboxes the dialer applies.
+    Methods are blocking; call them via `asyncio.to_thread` from the event loop.
+    """
+
+    def __init__(self, state: SharedStateProvider) -> None:
+        self.state = state
+
+    def save(self, campaign: Campaign, calls) -> None:
+        self.state.hset(CAMPAIGNS, campaign.id, json.dumps(campaign.to_state()))
+        for call in calls:
+            self.state.hset(CAMPAIGN_CALLS.format(campaign.id), str(call.index), json.dumps(call.to_state()))
+
+    def load(self, campaign_id: str) -> Optional[Campaign]:
+        raw = self.state.hgetall(CAMPAIGNS).get(campaign_id)
+        if raw is None:
+            return None
+        meta = json.loads(raw)
+        calls = {int(index): json.loads(call) for index, call in self.state.hgetall(CAMPAIGN_CALLS.format(campaign_id)).items()}
+        campaign = Campaign(campaign_id, [calls[index]["number"] for index in sorted(calls)])
+        campaign.created_at = meta["created_at"]
+        campaign.cancelled = meta["cancelled"]
+        campaign.finished_at = meta.get("finished_at")
+        for call in campaign.calls:
+            call.load_state(calls[call.index])
+        return campaign
+
+    def campaigns(self) -> Dict[str, dict]:
+        return {campaign_id: json.loads(raw) for campaign_id, raw in self.state.hgetall(CAMPAIGNS).items()}
+
+    def delete(self, campaign_id: str) -> None:
+        calls = CAMPAIGN_CALLS.format(campaign_id)
+        for index in self.state.hgetall(calls):
+            self.state.hdel(calls, index)
+        self.state.hdel(CAMPAIGNS, campaign_id)
+
+    def post_status(self, call_sid: str, status: str) -> None:
+        self.state.hset(STATUS_MAILBOX, call_sid, json.dumps({"status": status, "at": time.time()}))
+
+    def post_cancel(self, campaign_id: str) -> None:
+        self.state.hset(CANCEL_MAILBOX, campaign_id, str(time.time()))
+
+    def take(self, mailbox: str, keep: Callable[[str, str], bool] = lambda key, value: False) -> Dict[str, str]:
+        """Remove and return a mailbox's entries, except those `keep` leaves for a later pass."""
+        taken = {}
+        for key, value in self.state.hgetall(mailbox).items():
+            if not keep(key, value):
+                self.state.hdel(mailbox, key)
+                taken[key] = value
+        return taken
+
+    def acquire_lease(self, worker: str, ttl: float) -> bool:
+        """Take or refresh the dialer lease; False while another live worker holds it."""
+        return self.state.add_member(DIALER_LEASE, worker, ttl, limit=1)
+
+    def release_lease(self, worker: str) -> None:
+        if worker in self.state.members(DIALER_LEASE):
+            self.state.remove_member(DIALER_LEASE, worker)
+
+
+class CampaignDialer:
+    """Queues, paces and dispatches outbound calls for campaigns.
+
+    A single dispatcher task places calls no faster than `cps` per second and keeps
+    at most `max_concurrent` campaign calls in progress. A call holds its slot from
+    the create-call request until Twilio's status callback (`on_status`) reports a
+    final status, or until `call_timeout` passes without one. API errors and
+    busy / no-answer / failed outcomes are retried up to `max_attempts` times with
+    exponential backoff. Calls are placed concurrently, so a slow API request does
+    not hold back the pace. A create-call request that times out may still have
+    placed the call, so it is looked up with `find_calls` before any retry.
+
+    With a `store`, campaigns live in the shared-state backend and one worker at a
+    time holds the dialer lease. That worker dials and writes campaign state every
+    `poll_interval`; any worker can create campaigns, serve them and take status
+    callbacks and cancellations, which the dialer picks up on its next pass. A
+    worker taking over the lease adopts the unfinished campaigns. Finished
+    campaigns are dropped from memory and kept for `retention` seconds.
+
+    Args:
+        place_call: Coroutine `(number) -> call_sid` starting one call; the Twilio
+            client in production, a stub in benchmarks.
+        find_calls: Coroutine `(number, since) -> [call_sid, ...]` listing the calls
+            to `number` created since the epoch time `since`.
+        store: Shared campaign state; None keeps everything in this worker.
+    """
+
+    def __init__(
+        self,
+        place_call: Callable[[str], Awaitable[str]],
+        find_calls: Optional[Callable[[str, float], Awaitable[List[str]]]] = None,
+        store: Optional[CampaignStore] = None,
+        cps: float = CAMPAIGN.cps,
+        max_concurrent: int = CAMPAIGN.max_concurrent_calls,
+        max_attempts: int = CAMPAIGN.max_attempts,
+        backoff_base: float = CAMPAIGN.backoff_base,
+        backoff_max: float = CAMPAIGN.backoff_max,
+        api_timeout: float = CAMPAIGN.api_timeout,
+        call_timeout: float = CAMPAIGN.call_timeout,
+        poll_interval: float = CAMPAIGN.poll_interval,
+        lease_ttl: float = CAMPAIGN.lease_ttl,
+        retention: float = CAMPAIGN.retention,
+    ) -> None:
+        self._place_call = place_call
+        self._find_calls = find_calls
+        self.store = store
+        self.cps = cps
+        self.max_concurrent = max_concurrent
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.api_timeout = api_timeout
+        self.call_timeout = call_timeout
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.retention = retention
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.leader = store is None
+
+        self.campaigns: Dict[str, Campaign] = {}
+        self._ready: List[Tuple[float, int, CampaignCall]] = []  # heap of (ready_at, seq, call)
+        self._seq = 0
+        self._active = 0  # calls dialing or in progress
+        self._by_sid: Dict[str, CampaignCall] = {}
+        self._next_dial_at = 0.0
+        self._next_sync = 0.0
+        self._dirty: Set[CampaignCall] = set()  # calls changed since the last write to the store
+        self._unmatched: Dict[str, Tuple[str, float]] = {}  # call sid -> (status, monotonic time), without a store
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._dials: Set[asyncio.Task] = set()
+        self.stats = {"placed": 0, "api_errors": 0, "api_timeouts": 0, "retries": 0, "timeouts": 0}
+
+    # ---------------
+    # Lifecycle
+    # ---------------
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        tasks = [t for t in [self._task, *self._dials] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if self.store is not None and self.leader:
+            try:
+                await asyncio.to_thread(self._flush)
+                await asyncio.to_thread(self.store.release_lease, self.worker)
+            except Exception as e:
+                logger.warning("Saving campaigns on shutdown failed: %s", e)
+
+    # ---------------
+    # Campaigns
+    # ---------------
+    async def create(self, numbers: List[str]) -> Campaign:
+        """Queue a campaign; its calls start as soon as pace and capacity allow."""
+        campaign = Campaign(secrets.token_urlsafe(8), numbers)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, campaign, campaign.calls)
+            if not self.leader:
+                # The dialer adopts it from the store on its next pass.
+                return campaign
+        self._adopt(campaign)
+        return campaign
+
+    async def get(self, campaign_id: str) -> Optional[Campaign]:
+        campaign = self.campaigns.get(campaign_id)
+        if campaign is None and self.store is not None:
+            campaign = await asyncio.to_thread(self.store.load, campaign_id)
+        return campaign
+
+    async def cancel(self, campaign_id: str) -> Optional[Campaign]:
+        """Stop placing calls for a campaign; calls already in progress are left to finish."""
+        campaign = self.campaigns.get(campaign_id)
+        if campaign is not None:
+            self._cancel(campaign)
+            return campaign
+        if self.store is None:
+            return None
+        campaign = await asyncio.to_thread(self.store.load, campaign_id)
+        if campaign is None or campaign.done:
+            return campaign
+        await asyncio.to_thread(self.store.post_cancel, campaign_id)
+        # What the dialer will record once it applies the cancellation.
+        campaign.cancelled = True
+        for call in campaign.calls:
+            if call.status in ("queued", "retrying"):
+                call.status = "cancelled"
+        return campaign
+
+    def on_status(self, call_sid: str, status: str) -> bool:
+        """Record a final call status for a call this worker dialed; False for unknown calls."""
+        call = self._by_sid.pop(call_sid, None)
+        if call is None:
+            return False
+        self._release()
+        if status in RETRY_STATUSES:
+            self._retry(call, status)
+        else:
+            call.status = "completed" if status == "completed" else "cancelled" if status == "canceled" else status
+            self._touch(call)
+        return True
+
+    async def report_status(self, call_sid: str, status: str) -> None:
+        """Twilio status callback: applied here if this worker dialed the call, else posted for the dialer.
+
+        A status can beat the call it belongs to, e.g. while a timed-out request
+        is looked up, so an unknown one is kept until the call shows up.
+        """
+        if self.on_status(call_sid, status):
+            return
+        if self.store is not None:
+            await asyncio.to_thread(self.store.post_status, call_sid, status)
+        else:
+            self._unmatched[call_sid] = (status, time.monotonic())
+
+    # ---------------
+    # Shared state
+    # ---------------
+    def _adopt(self, campaign: Campaign) -> None:
+        """Take over a campaign's calls in whatever state they were left."""
+        self.campaigns[campaign.id] = campaign
+        now = time.monotonic()
+        for call in campaign.calls:
+            if call.status in ("queued", "retrying"):
+                self._push(now, call)
+            elif call.status == "in-progress" and call.call_sid:
+                if call.deadline is None:
+                    call.deadline = now + self.call_timeout
+                self._by_sid[call.call_sid] = call
+                self._active += 1
+            elif call.status == "dialing":
+                # The previous dialer stopped during the create-call request.
+                self._active += 1
+                self._spawn(self._resolve_unknown(call))
+        self._wakeup.set()
+
+    def _cancel(self, campaign: Campaign) -> None:
+        campaign.cancelled = True
+        for call in campaign.calls:
+            if call.status in ("queued", "retrying"):
+                call.status = "cancelled"
+                self._touch(call)
+        self._wakeup.set()
+
+    def _touch(self, call: CampaignCall) -> None:
+        if self.store is not None:
+            self._dirty.add(call)
+
+    def _flush(self) -> None:
+        """Write changed calls, and their campaigns, to the store (blocking)."""
+        dirty, self._dirty = self._dirty, set()
+        by_campaign: Dict[str, List[CampaignCall]] = {}
+        for call in dirty:
+            by_campaign.setdefault(call.campaign.id, []).append(call)
+        for calls in by_campaign.values():
+            self.store.save(calls[0].campaign, calls)
+
+    async def _sync(self) -> None:
+        """Renew the lease; as the dialer, apply mailboxes, adopt campaigns, save and evict."""
+        was_leader = self.leader
+        self.leader = await asyncio.to_thread(self.store.acquire_lease, self.worker, self.lease_ttl)
+        if was_leader and not self.leader:
+            logger.warning("Campaign dialer lease lost; another worker dials from now on")
+            self._drop_local()
+        if not self.leader:
+            return
+        if not was_leader:
+            logger.info("Campaign dialer lease acquired by %s", self.worker)
+
+        stale = time.time() - self.lease_ttl
+        campaigns = await asyncio.to_thread(self.store.campaigns)
+        for campaign_id, meta in campaigns.items():
+            if campaign_id in self.campaigns:
+                continue
+            if meta.get("finished_at") is None:
+                campaign = await asyncio.to_thread(self.store.load, campaign_id)
+                if campaign is not None and not campaign.done:
+                    self._adopt(campaign)
+            elif meta["finished_at"] < time.time() - self.retention:
+                await asyncio.to_thread(self.store.delete, campaign_id)
+
+        for campaign_id in await asyncio.to_thread(self.store.take, CANCEL_MAILBOX):
+            if campaign_id in self.campaigns:
+                self._cancel(self.campaigns[campaign_id])
+
+        # A status for a call not known here yet is kept a while: its dialer may not have saved it.
+        statuses = await asyncio.to_thread(
+            self.store.take, STATUS_MAILBOX,
+            lambda sid, value: sid not in self._by_sid and json.loads(value)["at"] > stale,
+        )
+        for call_sid, value in statuses.items():
+            self.on_status(call_sid, json.loads(value)["status"])
+
+        finished = [c for c in self.campaigns.values() if c.done]
+        for campaign in finished:
+            campaign.finished_at = time.time()
+            self._dirty.update(campaign.calls)
+        await asyncio.to_thread(self._flush)
+        for campaign in finished:
+            self.campaigns.pop(campaign.id, None)
+
+    def _evict_local(self) -> None:
+        """Without a store, finished campaigns stay readable for `retention` seconds."""
+        stale = time.monotonic() - self.call_timeout
+        for call_sid, (_, at) in list(self._unmatched.items()):
+            if at < stale:
+                del self._unmatched[call_sid]
+        cutoff = time.time() - self.retention
+        for campaign in list(self.campaigns.values()):
+            if campaign.finished_at is None:
+                if campaign.done:
+                    campaign.finished_at = time.time()
+            elif campaign.finished_at < cutoff:
+                del self.campaigns[campaign.id]
+
+    def _drop_local(self) -> None:
+        for task in self._dials:
+            task.cancel()
+        self.campaigns.clear()
+        self._ready.clear()
+        self._by_sid.clear()
+        self._dirty.clear()
+        self._active = 0
+
+    # ---------------
+    # Dispatch
+    # ---------------
+    def _push(self, ready_at: float, call: CampaignCall) -> None:
+        self._seq += 1
+        heapq.heappush(self._ready, (ready_at, self._seq, call))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._dials.add(task)
+        task.add_done_callback(self._dials.discard)
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._wakeup.set()
+
+    def _retry(self, call: CampaignCall, error: str) -> None:
+        call.last_error = error
+        if call.campaign.cancelled:
+            call.status = "cancelled"
+        elif call.attempts >= self.max_attempts:
+            call.status = "failed"
+        else:
+            call.status = "retrying"
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (call.attempts - 1))
+            self.stats["retries"] += 1
+            self._push(time.monotonic() + delay * random.uniform(0.8, 1.2), call)
+            self._wakeup.set()
+        self._touch(call)
+
+    def _expire(self, now: float) -> Optional[float]:
+        """Free slots of calls whose status never arrived; returns the next deadline."""
+        next_deadline = None
+        for call_sid, call in list(self._by_sid.items()):
+            if call.deadline <= now:
+                del self._by_sid[call_sid]
+                call.status = "completed"
+                call.last_error = "no status callback received"
+                self.stats["timeouts"] += 1
+                self._touch(call)
+                self._release()
+            elif next_deadline is None or call.deadline < next_deadline:
+                next_deadline = call.deadline
+        return next_deadline
+
+    async def _wait(self, until: Optional[float]) -> None:
+        self._wakeup.clear()
+        timeout = None if until is None else max(0.0, until - time.monotonic())
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now >= self._next_sync:
+                if self.store is None:
+                    self._evict_local()
+                else:
+                    try:
+                        await self._sync()
+                    except Exception as e:
+                        logger.warning("Campaign state sync failed: %s", e)
+                self._next_sync = time.monotonic() + self.poll_interval
+            wake = [self._next_sync]
+            if not self.leader:
+                await self._wait(self._next_sync)
+                continue
+
+            next_deadline = self._expire(now)
+            if next_deadline is not None:
+                wake.append(next_deadline)
+            while self._ready and self._ready[0][2].status == "cancelled":
+                heapq.heappop(self._ready)
+
+            if self._active >= self.max_concurrent or not self._ready:
+                await self._wait(min(wake))
+                continue
+            ready_at = max(self._ready[0][0], self._next_dial_at)
+            if ready_at > now:
+                await self._wait(min(wake + [ready_at]))
+                continue
+
+            _, _, call = heapq.heappop(self._ready)
+            self._next_dial_at = now + 1.0 / self.cps
+            self._active += 1
+            self._spawn(self._dial(call))
+
+    async def _dial(self, call: CampaignCall) -> None:
+        previous = call.status
+        call.attempts += 1
+        call.status = "dialing"
+        call.dialed_at = time.time()
+        if self.store is not None:
+            # Saved before the request, so a worker taking over looks the call up instead of dialing again.
+            try:
+                await asyncio.to_thread(self.store.save, call.campaign, [call])
+            except Exception as e:
+                logger.warning("Campaign %s: saving the call to %s failed, not dialing: %s", call.campaign.id, call.number, e)
+                call.attempts -= 1
+                call.status = previous
+                self._release()
+                self._push(time.monotonic() + self.poll_interval, call)
+                return
+        try:
+            call_sid = await asyncio.wait_for(self._place_call(call.number), self.api_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            # The request may have reached Twilio; never dial the number twice on a guess.
+            self.stats["api_timeouts"] += 1
+            logger.warning("Campaign %s: placing call to %s timed out", call.campaign.id, call.number)
+            await self._resolve_unknown(call)
+            return
+        except Exception as e:
+            self.stats["api_errors"] += 1
+            logger.warning("Campaign %s: placing call to %s failed: %s", call.campaign.id, call.number, e)
+            self._release()
+            self._retry(call, str(e) or type(e).__name__)
+            return
+        self._placed(call, call_sid)
+
+    def _placed(self, call: CampaignCall, call_sid: str) -> None:
+        self.stats["placed"] += 1
+        call.call_sid = call_sid
+        call.sids.append(call_sid)
+        call.status = "in-progress"
+        call.deadline = time.monotonic() + self.call_timeout
+        self._by_sid[call_sid] = call
+        self._touch(call)
+        self._wakeup.set()
+        if call_sid in self._unmatched:
+            self.on_status(call_sid, self._unmatched.pop(call_sid)[0])
+
+    async def _resolve_unknown(self, call: CampaignCall) -> None:
+        """Settle a call whose create-call request has no known outcome (slot already held).
+
+        A call found with `find_calls` that no earlier attempt placed is tracked as
+        placed; if the lookup shows none, the attempt is retried. If it cannot be
+        looked up, the number is not dialed again.
+        """
+        if self._find_calls is not None:
+            try:
+                # Allow for clock skew between this worker and Twilio.
+                sids = await asyncio.wait_for(
+                    self._find_calls(call.number, (call.dialed_at or time.time()) - 60), self.api_timeout
+                )
+                call_sid = next((sid for sid in sids if sid not in call.sids), None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Campaign %s: looking up the call to %s failed: %s", call.campaign.id, call.number, e)
+            else:
+                if call_sid:
+                    self._placed(call, call_sid)
+                else:
+                    self._release()
+                    self._retry(call, "create-call request timed out")
+                return
+        self._release()
+        call.status = "failed"
+        call.last_error = "create-call request timed out and the call could not be looked up; not retried"
+        self._touch(call)
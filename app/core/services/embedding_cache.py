@@ -0,0 +1,188 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from app.core.providers.cache_provider import EmbeddingCacheProvider
+from config.services import EMBEDDING_CACHE
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different phrasings share a cache entry."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class MemoryEmbeddingCache(EmbeddingCacheProvider):
+    """In-process LRU cache with a size limit and a per-entry TTL."""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE.max_size, ttl: float = EMBEDDING_CACHE.ttl):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, embedding = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["evictions"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return embedding
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteEmbeddingCache(EmbeddingCacheProvider):
+    """On-disk cache that survives restarts. Vectors are stored as packed float64.
+
+    Expired rows are deleted when read, and all of them at once on open and on
+    the first write after every `prune_interval` seconds, so the file does not
+    keep growing with embeddings nobody asks for again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = EMBEDDING_CACHE.disk_ttl,
+        prune_interval: float = EMBEDDING_CACHE.disk_prune_interval,
+    ):
+        super().__init__()
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, created_at REAL, vector BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+        self._lock = threading.Lock()
+        with self._lock:
+            self._prune(time.time())
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] + self.ttl < time.time():
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self.stats["evictions"] += 1
+                row = None
+            self.stats["hits" if row is not None else "misses"] += 1
+        return None if row is None else array("d", row[1]).tolist()
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, created_at, vector) VALUES (?, ?, ?)",
+                (key, now, array("d", embedding).tobytes()),
+            )
+            if now >= self._next_prune:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Delete every expired row. Caller holds the lock."""
+        deleted = self._conn.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl,)).rowcount
+        self.stats["evictions"] += max(deleted, 0)
+        self._next_prune = now + self.prune_interval
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CachedEmbedder:
+    """Drop-in replacement for a `tokenizer(text) -> embedding` callable.
+
+    Looks up the in-memory tier, then the optional disk tier, and only calls the
+    embeddings API on a miss in both. Disk hits are promoted to memory.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], List[float]],
+        model: str,
+        memory: Optional[EmbeddingCacheProvider] = None,
+        disk: Optional[EmbeddingCacheProvider] = None,
+        embed_many: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    ) -> None:
+        self._embed = embed
+        self._embed_many = embed_many
+        self.model = model
+        self.memory = memory if memory is not None else MemoryEmbeddingCache()
+        self.disk = disk
+
+    def __call__(self, text: str) -> List[float]:
+        key = cache_key(self.model, text)
+        embedding = self._lookup(key)
+        if embedding is None:
+            embedding = self._embed(text)
+            self._store(key, embedding)
+        return embedding
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts, sending only the cache misses in one batched request."""
+        keys = [cache_key(self.model, text) for text in texts]
+        embeddings = [self._lookup(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            if self._embed_many is not None:
+                fresh = self._embed_many([texts[i] for i in missing])
+            else:
+                fresh = [self._embed(texts[i]) for i in missing]
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+                self._store(keys[i], embedding)
+        return embeddings
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = self.disk.get(key)
+            if embedding is not None:
+                self.memory.set(key, embedding)
+        return embedding
+
+    def _store(self, key: str, embedding: List[float]) -> None:
+        self.memory.set(key, embedding)
+        if self.disk is not None:
+            self.disk.set(key, embedding)
+
+    @property
+    def stats(self) -> dict:
+        stats = {"memory": dict(self.memory.stats)}
+        if hasattr(self.memory, "__len__"):
+            stats["memory"]["size"] = len(self.memory)
+        if self.disk is not None:
+            stats["disk"] = dict(self.disk.stats)
+        return stats
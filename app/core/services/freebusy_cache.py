@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from config.services import CALENDAR
+
+Range = Tuple[datetime, datetime]
+
+
+def _aware(dt: datetime) -> datetime:
+    # Naive datetimes are sent to the API as UTC (see `_to_rfc3339`), so key them the same way.
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class FreeBusyCache:
+    """Per-account cache of busy ranges over the time spans already fetched.
+
+    Each account keeps a sorted list of non-overlapping covered segments
+    `(start, end, fetched_at, busy)`. A query is answered from the segments that
+    cover it; only the uncovered gaps (see `missing`) need a FreeBusy request.
+    Segments expire after `ttl` seconds, and our own writes drop just the
+    segments overlapping the changed event via `invalidate`.
+    """
+
+    def __init__(self, ttl: float = CALENDAR.freebusy_ttl) -> None:
+        self.ttl = ttl
+        self._segments: Dict[str, List[Tuple[datetime, datetime, float, List[Range]]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "partial": 0, "misses": 0, "invalidations": 0}
+
+    def _live(self, account_id: str) -> List[Tuple[datetime, datetime, float, List[Range]]]:
+        """Drop expired segments for an account and return the rest. Caller holds the lock."""
+        cutoff = time.monotonic() - self.ttl
+        segments = [s for s in self._segments.get(account_id, []) if s[2] >= cutoff]
+        self._segments[account_id] = segments
+        return segments
+
+    def missing(self, account_id: str, start: datetime, end: datetime) -> List[Range]:
+        """Return the sub-ranges of `[start, end)` that are not cached."""
+        start, end = _aware(start), _aware(end)
+        gaps: List[Range] = []
+        with self._lock:
+            cursor = start
+            for s_start, s_end, _, _ in self._live(account_id):
+                if s_end <= cursor:
+                    continue
+                if s_start >= end:
+                    break
+                if s_start > cursor:
+                    gaps.append((cursor, s_start))
+                cursor = max(cursor, s_end)
+                if cursor >= end:
+                    break
+            if cursor < end:
+                gaps.append((cursor, end))
+
+            if not gaps:
+                self.stats["hits"] += 1
+            elif gaps == [(start, end)]:
+                self.stats["misses"] += 1
+            else:
+                self.stats["partial"] += 1
+        return gaps
+
+    def store(self, account_id: str, start: datetime, end: datetime, busy: List[Range]) -> None:
+        """Record the busy ranges fetched for `[start, end)`, replacing any overlapping coverage."""
+        start, end = _aware(start), _aware(end)
+        clipped = [(max(b_start, start), min(b_end, end)) for b_start, b_end in busy if b_start < end and b_end > start]
+        with self._lock:
+            segments = [s for s in self._live(account_id) if s[1] <= start or s[0] >= end]
+            segments.append((start, end, time.monotonic(), clipped))
+            segments.sort(key=lambda s: s[0])
+            self._segments[account_id] = segments
+
+    def busy(self, account_id: str, start: datetime, end: datetime) -> List[Range]:
+        """Return cached busy ranges overlapping `[start, end)`, sorted by start."""
+        start, end = _aware(start), _aware(end)
+        ranges: List[Range] = []
+        with self._lock:
+            for s_start, s_end, _, busy in self._live(account_id):
+                if s_end <= start or s_start >= end:
+                    continue
+                ranges.extend(r for r in busy if r[0] < end and r[1] > start)
+        ranges.sort(key=lambda r: r[0])
+        return ranges
+
+    def invalidate(self, account_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> None:
+        """Forget cached coverage overlapping `[start, end)`, or the whole account when no range is given."""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if start is None or end is None:
+                self._segments.pop(account_id, None)
+                return
+            start, end = _aware(start), _aware(end)
+            self._segments[account_id] = [
+                s for s in self._segments.get(account_id, []) if s[1] <= start or s[0] >= end
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._segments.clear()
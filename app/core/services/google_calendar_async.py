@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from google.auth.transport.requests import Request as GoogleAuthRequest
+
+from app.core.providers.calendar_provider import AsyncCalendarProvider
+from app.core.providers.state_provider import SharedStateProvider
+from app.core.services.appointment_index import AppointmentIndex
+from app.core.services.freebusy_cache import FreeBusyCache
+from app.core.services.google_calendar import (
+    SHARED_ACCOUNTS,
+    account_entry,
+    build_credentials,
+    event_range,
+    free_slots,
+    iter_credentials_files,
+    parse_busy_periods,
+    to_rfc3339,
+)
+from config.services import CALENDAR
+from config.settings import settings
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarAPIError(RuntimeError):
+    """Non-2xx response from the Calendar API."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(f"Calendar API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class AsyncGoogleCalendarService(AsyncCalendarProvider):
+    """Google Calendar provider on a shared, pooled `httpx.AsyncClient`.
+
+    All accounts share one connection pool (HTTP/2 when `h2` is installed), so
+    calls reuse warm connections instead of paying a TLS handshake each time.
+    Access tokens are refreshed on a worker thread ahead of expiry; a request only
+    waits for a refresh when its token has already expired. Scheduled events are
+    recorded in an `AppointmentIndex` so cancel/reschedule go straight to the
+    owning account.
+
+    An account may belong to a workspace. Every calendar method takes an optional
+    `workspace_id`; when given, only that workspace's accounts are used, and its
+    events are only looked up in them, so one tenant's call never reaches another
+    tenant's calendar. As with document search, None means no restriction.
+
+    With a shared `state` backend, accounts added at runtime are published there
+    and picked up by the other workers on their next lookup of an unknown account.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        credentials_dir: str = None,
+        load_accounts: bool = True,
+        appointments: Optional[AppointmentIndex] = None,
+        state: Optional[SharedStateProvider] = None,
+    ) -> None:
+        self._accounts: Dict[str, Tuple[object, str]] = {}
+        # Tuple is (google-auth credentials, default_calendar_id)
+        self._workspaces: Dict[str, Optional[str]] = {}  # account_id -> workspace_id
+        self._credentials_dir = credentials_dir or settings.GOOGLE_CREDENTIALS_DIR
+        self._refreshing: Dict[str, asyncio.Future] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.freebusy_cache = FreeBusyCache()
+        self.appointments = appointments if appointments is not None else AppointmentIndex(settings.APPOINTMENT_INDEX_PATH)
+        self.state = state
+        self._shared_seen: Dict[str, str] = {}  # account_id -> shared registry entry already applied
+        self._client = httpx.AsyncClient(
+            base_url=base_url or settings.GOOGLE_CALENDAR_API_URL,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=CALENDAR.max_connections,
+                max_keepalive_connections=CALENDAR.max_keepalive_connections,
+            ),
+            timeout=CALENDAR.timeout,
+        )
+        if load_accounts:
+            for account_id, account in iter_credentials_files(self._credentials_dir):
+                try:
+                    self.add_account(account_id, persist=False, **account)
+                except Exception as exc:
+                    logger.warning("Failed loading Google account '%s': %s", account_id, exc)
+
+    # ---------------
+    # Lifecycle and accounts
+    # ---------------
+    async def start(self) -> None:
+        """Start the background token refresher."""
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+        await self._client.aclose()
+
+    async def warm_up(self, concurrency: int = CALENDAR.warmup_concurrency) -> Dict[str, str]:
+        """Start the token refresher and fetch every account's access token, concurrently.
+
+        Returns:
+            dict: `{account_id: error}` for the accounts that failed; they are retried on first use.
+        """
+        await self.start()
+        if self.state is not None:
+            await asyncio.to_thread(self.sync_accounts)
+        slots = asyncio.Semaphore(concurrency)
+
+        async def warm(account_id: str) -> None:
+            async with slots:
+                await self._auth_headers(account_id)
+
+        accounts = list(self._accounts)
+        results = await asyncio.gather(*(warm(account_id) for account_id in accounts), return_exceptions=True)
+        failed = {account_id: str(result) for account_id, result in zip(accounts, results) if isinstance(result, Exception)}
+        for account_id, error in failed.items():
+            logger.warning("Failed warming up Google account '%s': %s", account_id, error)
+        return failed
+
+    def add_account(
+        self,
+        account_id: str,
+        credentials_info: dict,
+        calendar_id: str = "primary",
+        persist: bool = True,
+        workspace_id: Optional[str] = None,
+    ) -> None:
+        """Register a Google Calendar account, optionally owned by a workspace.
+
+        Takes OAuth user or service account credentials. Accounts added at runtime (`persist=True`) are saved to `{account_id}.json`
+        and published to the shared registry for the other workers.
+        """
+        self._accounts[account_id] = (build_credentials(credentials_info), calendar_id or "primary")
+        self._workspaces[account_id] = workspace_id
+        self.freebusy_cache.invalidate(account_id)
+        if persist:
+            account = account_entry(credentials_info, calendar_id, workspace_id)
+            path = os.path.join(self._credentials_dir, f"{account_id}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(account, f)
+            if self.state is not None:
+                entry = json.dumps(account)
+                self.state.hset(SHARED_ACCOUNTS, account_id, entry)
+                self._shared_seen[account_id] = entry
+
+    def sync_accounts(self) -> None:
+        """Apply accounts that other workers added or replaced in the shared registry. Blocking."""
+        if self.state is None:
+            return
+        for account_id, entry in self.state.hgetall(SHARED_ACCOUNTS).items():
+            if self._shared_seen.get(account_id) == entry:
+                continue
+            self.add_account(account_id, persist=False, **json.loads(entry))
+            self._shared_seen[account_id] = entry
+
+    async def _has_account(self, account_id: str, workspace_id: Optional[str] = None) -> bool:
+        if account_id not in self._accounts and self.state is not None:
+            await asyncio.to_thread(self.sync_accounts)
+        return account_id in self._accounts and (workspace_id is None or self._workspaces[account_id] == workspace_id)
+
+    async def _check_account(self, account_id: str, workspace_id: Optional[str]) -> None:
+        """Reject accounts that are unknown or, when `workspace_id` is given, owned by another workspace."""
+        if not await self._has_account(account_id, workspace_id):
+            raise ValueError(f"Unknown Google Calendar account_id: {account_id}")
+
+    def _get_credentials_and_calendar(self, account_id: str) -> Tuple[object, str]:
+        if account_id not in self._accounts:
+            raise ValueError(f"Unknown Google Calendar account_id: {account_id}")
+        return self._accounts[account_id]
+
+    # ---------------
+    # Tokens
+    # ---------------
+    @staticmethod
+    def _expires_within(creds, seconds: float) -> bool:
+        expiry = getattr(creds, "expiry", None)
+        if expiry is None:
+            return False
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return expiry - now < timedelta(seconds=seconds)
+
+    def _refresh(self, account_id: str) -> asyncio.Future:
+        """Refresh an account's token on a worker thread, sharing one refresh per account."""
+        future = self._refreshing.get(account_id)
+        if future is None:
+            creds, _ = self._get_credentials_and_calendar(account_id)
+            future = asyncio.ensure_future(asyncio.to_thread(creds.refresh, GoogleAuthRequest()))
+            self._refreshing[account_id] = future
+
+            def done(f: asyncio.Future) -> None:
+                self._refreshing.pop(account_id, None)
+                if not f.cancelled() and f.exception() is not None:
+                    logger.warning("Failed refreshing Google token for '%s': %s", account_id, f.exception())
+
+            future.add_done_callback(done)
+        return future
+
+    async def _auth_headers(self, account_id: str) -> Dict[str, str]:
+        creds, _ = self._get_credentials_and_calendar(account_id)
+        if not creds.token or self._expires_within(creds, 0):
+            await asyncio.shield(self._refresh(account_id))
+        elif self._expires_within(creds, CALENDAR.refresh_margin):
+            # Still valid: use it now and refresh in the background.
+            self._refresh(account_id)
+        return {"Authorization": f"Bearer {creds.token}"}
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(CALENDAR.refresh_interval)
+            for account_id, (creds, _) in list(self._accounts.items()):
+                if not creds.token or self._expires_within(creds, CALENDAR.refresh_margin):
+                    self._refresh(account_id)
+
+    # ---------------
+    # HTTP
+    # ---------------
+    async def _request(self, account_id: str, method: str, path: str, **kwargs) -> dict:
+        headers = await self._auth_headers(account_id)
+        resp = await self._client.request(method, path, headers=headers, **kwargs)
+        if resp.status_code == 401:
+            # Token revoked or expired early: refresh once and retry.
+            await asyncio.shield(self._refresh(account_id))
+            headers = await self._auth_headers(account_id)
+            resp = await self._client.request(method, path, headers=headers, **kwargs)
+        if resp.status_code >= 400:
+            raise CalendarAPIError(resp.status_code, resp.text)
+        return resp.json() if resp.content else {}
+
+    @staticmethod
+    def _events_path(calendar_id: str, event_id: Optional[str] = None) -> str:
+        path = f"/calendars/{quote(calendar_id, safe='')}/events"
+        return f"{path}/{quote(event_id, safe='')}" if event_id else path
+
+    async def _query_busy(self, account_id: str, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        _, calendar_id = self._get_credentials_and_calendar(account_id)
+        body = {
+            "timeMin": to_rfc3339(start),
+            "timeMax": to_rfc3339(end),
+            "items": [{"id": calendar_id}],
+        }
+        resp = await self._request(account_id, "POST", "/freeBusy", json=body)
+        return parse_busy_periods(resp.get("calendars", {}).get(calendar_id, {}).get("busy", []))
+
+    async def _busy_ranges(
+        self, account_id: str, start: datetime, end: datetime, fresh: bool = False
+    ) -> List[Tuple[datetime, datetime]]:
+        """Busy ranges in `[start, end)`, querying FreeBusy only for spans not in the cache.
+
+        `fresh` bypasses the cache (the result is still stored), for checks that guard a write.
+        """
+        self._get_credentials_and_calendar(account_id)
+        gaps = [(start, end)] if fresh else self.freebusy_cache.missing(account_id, start, end)
+        results = await asyncio.gather(*(self._query_busy(account_id, g_start, g_end) for g_start, g_end in gaps))
+        for (g_start, g_end), busy in zip(gaps, results):
+            self.freebusy_cache.store(account_id, g_start, g_end, busy)
+        return self.freebusy_cache.busy(account_id, start, end)
+
+    def _invalidate_event(self, account_id: str, *events: dict) -> None:
+        for event in events:
+            span = event_range(event)
+            if span is None:
+                self.freebusy_cache.invalidate(account_id)
+            else:
+                self.freebusy_cache.invalidate(account_id, *span)
+
+    # ---------------
+    # Event lookup
+    # ---------------
+    async def _search_event(self, appointment_id: str, workspace_id: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """Find the account holding an event by fetching it from every account concurrently.
+
+        Only the accounts of `workspace_id` are probed when it is given, at most
+        `CALENDAR.lookup_concurrency` at once. Returns None when there are no accounts;
+        raises the last `CalendarAPIError` when no account has the event.
+        """
+        if self.state is not None:
+            await asyncio.to_thread(self.sync_accounts)
+        accounts = [
+            (account_id, account) for account_id, account in list(self._accounts.items())
+            if workspace_id is None or self._workspaces[account_id] == workspace_id
+        ]
+        if not accounts:
+            return None
+        slots = asyncio.Semaphore(CALENDAR.lookup_concurrency)
+
+        async def probe(account_id: str, calendar_id: str) -> Tuple[str, str]:
+            async with slots:
+                await self._request(account_id, "GET", self._events_path(calendar_id, appointment_id))
+            return account_id, calendar_id
+
+        tasks = [asyncio.create_task(probe(account_id, calendar_id)) for account_id, (_, calendar_id) in accounts]
+        last_error: Optional[Exception] = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except CalendarAPIError as exc:
+                    last_error = exc
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        raise last_error
+
+    async def _on_event_account(
+        self, appointment_id: str, action: Callable[[str, str], Awaitable[bool]], workspace_id: Optional[str] = None
+    ) -> bool:
+        """Run `action(account_id, calendar_id)` on the account holding an event.
+
+        The appointment index is tried first; on a miss or a stale entry (404) the
+        owner is found with `_search_event` and recorded. An event the index places
+        in another workspace's account is reported as not found.
+        """
+        location = self.appointments.get(appointment_id)
+        if location and await self._has_account(location[0]):
+            if not await self._has_account(location[0], workspace_id):
+                return False
+            try:
+                return await action(*location)
+            except CalendarAPIError as exc:
+                if exc.status_code != 404:
+                    raise
+                self.appointments.delete(appointment_id)
+
+        location = await self._search_event(appointment_id, workspace_id)
+        if location is None:
+            return False
+        self.appointments.set(appointment_id, *location)
+        return await action(*location)
+
+    # ---------------
+    # AsyncCalendarProvider
+    # ---------------
+    async def check_availability(
+        self, user_id: str, start_time: datetime, end_time: datetime, workspace_id: Optional[str] = None
+    ) -> bool:
+        await self._check_account(user_id, workspace_id)
+        try:
+            return not await self._busy_ranges(user_id, start_time, end_time)
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to check availability: {exc}")
+
+    async def check_availability_many(
+        self, user_id: str, windows: List[Tuple[datetime, datetime]], workspace_id: Optional[str] = None
+    ) -> List[bool]:
+        """Check several windows with a single FreeBusy query over their combined span."""
+        await self._check_account(user_id, workspace_id)
+        if not windows:
+            return []
+        try:
+            busy = await self._busy_ranges(user_id, min(w[0] for w in windows), max(w[1] for w in windows))
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to check availability: {exc}")
+        return [not any(b_start < end and b_end > start for b_start, b_end in busy) for start, end in windows]
+
+    async def get_availability_slots(
+        self, user_id: str, start_date: datetime, end_date: datetime, workspace_id: Optional[str] = None
+    ) -> List[Dict[str, datetime]]:
+        """Return free 30-minute slots by inverting busy periods from FreeBusy API."""
+        await self._check_account(user_id, workspace_id)
+        try:
+            return free_slots(await self._busy_ranges(user_id, start_date, end_date), start_date, end_date)
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to get availability slots: {exc}")
+
+    async def schedule_appointment(
+        self,
+        user_id: str,
+        title: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        description: Optional[str] = None,
+        location: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+    ) -> str:
+        """Create an event in the user's calendar if the slot is available.
+
+        `user_id` is treated as `account_id`.
+        """
+        await self._check_account(user_id, workspace_id)
+        _, calendar_id = self._get_credentials_and_calendar(user_id)
+        end_time = end_time or start_time + timedelta(days=1)
+        try:
+            if await self._busy_ranges(user_id, start_time, end_time, fresh=True):
+                raise ValueError("Requested time slot is not available")
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to check availability: {exc}")
+
+        event_body = {
+            "summary": title,
+            "description": description or "",
+            "location": location or "",
+            "start": {"dateTime": to_rfc3339(start_time)},
+            "end": {"dateTime": to_rfc3339(end_time)},
+        }
+        try:
+            created = await self._request(user_id, "POST", self._events_path(calendar_id), json=event_body)
+            self.freebusy_cache.invalidate(user_id, start_time, end_time)
+            self.appointments.set(created.get("id"), user_id, calendar_id)
+            return created.get("id")
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to create event: {exc}")
+
+    async def cancel_appointment(self, appointment_id: str, workspace_id: Optional[str] = None) -> bool:
+        """Cancel an event by id on the account that holds it."""
+        async def cancel(account_id: str, calendar_id: str) -> bool:
+            await self._request(account_id, "DELETE", self._events_path(calendar_id, appointment_id))
+            self.appointments.delete(appointment_id)
+            # The delete response has no event times, so drop the account's cached ranges.
+            self.freebusy_cache.invalidate(account_id)
+            return True
+
+        try:
+            return await self._on_event_account(appointment_id, cancel, workspace_id)
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to cancel event across all accounts: {exc}")
+
+    async def reschedule_appointment(
+        self, appointment_id: str, new_start_time: datetime, new_end_time: datetime, workspace_id: Optional[str] = None
+    ) -> bool:
+        async def reschedule(account_id: str, calendar_id: str) -> bool:
+            path = self._events_path(calendar_id, appointment_id)
+            event = await self._request(account_id, "GET", path)
+            if await self._busy_ranges(account_id, new_start_time, new_end_time, fresh=True):
+                raise ValueError("Requested time slot is not available")
+            previous = {"start": dict(event["start"]), "end": dict(event["end"])}
+            event["start"]["dateTime"] = to_rfc3339(new_start_time)
+            event["end"]["dateTime"] = to_rfc3339(new_end_time)
+            await self._request(account_id, "PUT", path, json=event)
+            self._invalidate_event(account_id, previous, event)
+            return True
+
+        try:
+            return await self._on_event_account(appointment_id, reschedule, workspace_id)
+        except CalendarAPIError as exc:
+            raise RuntimeError(f"Failed to reschedule event across all accounts: {exc}")
@@ -0,0 +1,125 @@
+import logging
+from typing import Dict, Iterable, List
+
+from app.core.providers.db_provider import DBProvider
+from app.core.services.call_metrics import RAG_PATH, RAG_SEARCH
+from app.core.services.lexical_index import BM25Index
+from app.utils.functions import document_key, format_documents
+from config.services import HYBRID
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_SECONDS = RAG_SEARCH.labels(backend="lexical")
+LEXICAL_ONLY = RAG_PATH.labels(path="lexical")
+FUSED = RAG_PATH.labels(path="fused")
+FALLBACK = RAG_PATH.labels(path="fallback")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[tuple]], k: int, rrf_k: int = HYBRID.rrf_k) -> List[tuple]:
+    """Merge ranked lists of document keys: each scores the sum of 1 / (rrf_k + rank) over the lists it appears in."""
+    scores: Dict[tuple, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda key: -scores[key])[:k]
+
+
+class HybridRetriever(DBProvider):
+    """BM25 in front of a vector provider, fused with reciprocal-rank fusion.
+
+    When the lexical top hit names a document outright (every word of its name is
+    in the query) and no other named document scores close to it, the lexical
+    results are returned without embedding the query at all. Otherwise both
+    retrievers return `HYBRID.candidates` results and the fused top k is
+    returned. If the vector search fails, the lexical results are still served.
+
+    The lexical index only ranks document keys; the documents themselves always
+    come from the vector provider, so every worker serves the current price even
+    when another worker made the write. Writes go to the vector provider first,
+    then into the lexical index, which is rebuilt from the vector provider's
+    documents on connect.
+    """
+
+    def __init__(self, vector: DBProvider, resources: Iterable[str], lazy=False):
+        super().__init__(vector.db_config, vector.tokenizer)
+        self.vector = vector
+        self.indexes: Dict[str, BM25Index] = {resource: BM25Index() for resource in resources}
+        if not lazy:
+            self.ensure_connected()
+
+    def connect(self):
+        """Connect the vector provider and index its documents lexically."""
+        self.vector.ensure_connected()
+        for resource, index in self.indexes.items():
+            index.add_many(self.vector.iter_documents(resource))
+
+    def disconnect(self):
+        self.vector.disconnect()
+
+    def add_document(self, document, collection) -> bool:
+        self.ensure_connected()
+        if hasattr(document, "model_dump"):
+            document = document.model_dump()
+        added = self.vector.add_document(document, collection)
+        if added:
+            self._index(collection).add(document)
+        return added
+
+    def add_documents(self, documents, collection, persist=True) -> dict:
+        self.ensure_connected()
+        documents = [d.model_dump() if hasattr(d, "model_dump") else d for d in documents]
+        report = self.vector.add_documents(documents, collection, persist=persist)
+        self._index(collection).add_many(d for d in documents if isinstance(d, dict) and d.get("name"))
+        return report
+
+    def flush(self, collection):
+        self.vector.flush(collection)
+
+    def retrieve_similar(self, query, resource, k=2, workspace_id=None):
+        """
+        Retrieve top-k documents, lexically when the query names them, fused otherwise.
+
+        Args:
+            query (str): The query string to search for.
+            resource (str): 'products' or 'services'.
+            k (int): The number of documents to retrieve.
+            workspace_id (str | None): Only consider this workspace's documents.
+
+        Returns:
+            str: The matching documents, one per line.
+        """
+        return format_documents(self.search_documents(query, resource, k, workspace_id))
+
+    def search_documents(self, query, resource, k=2, workspace_id=None) -> List[dict]:
+        """Top-k documents for `query`, best first; see `retrieve_similar`."""
+        self.ensure_connected()
+        with LEXICAL_SECONDS.time():
+            hits = self._index(resource).search(query, max(k, HYBRID.candidates), workspace_id)
+        if self._confident(hits):
+            LEXICAL_ONLY.inc()
+            return self.vector.get_documents(resource, [key for key, _, _ in hits[:k]])
+
+        lexical = [key for key, _, _ in hits]
+        try:
+            semantic = self.vector.search_documents(query, resource, max(k, HYBRID.candidates), workspace_id)
+        except Exception as e:
+            logger.warning("Vector search failed, answering from the lexical index: %s", e)
+            FALLBACK.inc()
+            return self.vector.get_documents(resource, lexical[:k])
+        FUSED.inc()
+        documents = {document_key(document): document for document in semantic}
+        keys = reciprocal_rank_fusion([lexical, list(documents)], k)
+        missing = [key for key in keys if key not in documents]
+        if missing:
+            documents.update((document_key(document), document) for document in self.vector.get_documents(resource, missing))
+        return [documents[key] for key in keys if key in documents]
+
+    @staticmethod
+    def _confident(hits) -> bool:
+        if not hits or not hits[0][2]:
+            return False
+        top_score = hits[0][1]
+        return not any(named and score * HYBRID.ambiguity_ratio >= top_score for _, score, named in hits[1:])
+
+    def _index(self, resource: str) -> BM25Index:
+        return self.indexes.setdefault(resource, BM25Index())
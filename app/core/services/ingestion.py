@@ -0,0 +1,117 @@
+import asyncio
+import codecs
+import json
+import logging
+import time
+from typing import AsyncIterable, Callable, List, Optional
+
+from config.services import INGESTION
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = " \t\r\n,[]"
+
+
+async def iter_json_records(chunks: AsyncIterable) -> AsyncIterable[dict]:
+    """Yield objects from a streamed JSON array or NDJSON body.
+
+    Records are decoded as soon as they are complete, so the whole input is never
+    held in memory. Chunks may be bytes (split anywhere, even inside a UTF-8
+    character) or str.
+
+    Raises:
+        ValueError: If the input ends with an incomplete or malformed record.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+
+    def drain(final: bool):
+        nonlocal buffer
+        records, pos = [], 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if final:
+                    raise ValueError(f"Malformed JSON record: {exc}") from exc
+                break
+            records.append(record)
+        buffer = buffer[pos:]
+        return records
+
+    async for chunk in chunks:
+        buffer += utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        for record in drain(final=False):
+            yield record
+    buffer += utf8.decode(b"", final=True)
+    for record in drain(final=True):
+        yield record
+
+
+class DocumentIngestor:
+    """Streams records into a `DBProvider` in batches with bounded concurrency.
+
+    Each batch is embedded with one multi-input request and written with one bulk
+    write on a worker thread. At most `concurrency` batches are in flight, which
+    also bounds how far reading the input runs ahead of the writes. The provider
+    saves the collection once, after the last batch, rather than per batch.
+    """
+
+    def __init__(self, database, batch_size: int = INGESTION.batch_size, concurrency: int = INGESTION.concurrency) -> None:
+        self.database = database
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def ingest(
+        self,
+        records: AsyncIterable[dict],
+        collection: str,
+        progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """Ingest all records and return counts of received, upserted, modified and failed documents."""
+        report = {"received": 0, "upserted": 0, "modified": 0, "failed": 0, "batches": 0}
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+
+        async def write(batch: List[dict]) -> None:
+            try:
+                result = await asyncio.to_thread(self.database.add_documents, batch, collection, persist=False)
+            except Exception as e:
+                logger.warning("Error writing batch of %d documents: %s", len(batch), e)
+                result = {"failed": len(batch)}
+            finally:
+                slots.release()
+            for key in ("upserted", "modified", "failed"):
+                report[key] += result.get(key, 0)
+            report["batches"] += 1
+            if progress is not None:
+                progress(dict(report, elapsed=round(time.perf_counter() - started, 3)))
+
+        async def submit(batch: List[dict]) -> None:
+            await slots.acquire()
+            task = asyncio.create_task(write(batch))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        batch: List[dict] = []
+        try:
+            async for record in records:
+                report["received"] += 1
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    await submit(batch)
+                    batch = []
+            if batch:
+                await submit(batch)
+        finally:
+            await asyncio.gather(*in_flight)
+            if report["upserted"] or report["modified"]:
+                await asyncio.to_thread(self.database.flush, collection)
+        report["elapsed"] = round(time.perf_counter() - started, 3)
+        return report
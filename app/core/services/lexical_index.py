@@ -0,0 +1,127 @@
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.functions import document_key
+from config.services import HYBRID
+
+_TOKEN = re.compile(r"[^\W_]+")  # runs of Unicode letters and digits
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from have how i in is it me my of on or our please "
+    "show tell that the this to what which with you your about any".split()
+    # Hebrew, the language callers speak: question words, pronouns, particles and politeness.
+    + "של את מה כמה מי איך למה איפה מתי אם כי על עם אל יש אין לא כן גם או אבל רק זה זאת זו "
+    "אני אתה הוא היא אנחנו אתם הם הן לי לך לו לה לנו שלי שלך שלכם אותו אותה "
+    "רוצה רוצים רציתי אפשר בבקשה תודה היי שלום טוב בסדר עוד כל יותר פה כאן שם עכשיו".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded words of any script, with diacritics and Hebrew niqqud removed."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over the name, type and description of one collection's documents.
+
+    Postings map each term to `{row: term frequency}`; the name is counted
+    `name_weight` times so a spoken product name outranks a passing mention in a
+    description. Documents are upserted by `(workspace_id, id)`, or by name within
+    the workspace when they have no id.
+    Only those keys and the postings stay in memory, never the documents, so an
+    index built by one worker cannot serve another worker's stale price: callers
+    fetch the documents from their store. A lookup is a few dict reads per query
+    term with no network round trip.
+    """
+
+    def __init__(self, k1: float = HYBRID.k1, b: float = HYBRID.b, name_weight: int = HYBRID.name_weight) -> None:
+        self.k1 = k1
+        self.b = b
+        self.name_weight = name_weight
+        self.keys: List[Optional[tuple]] = []
+        self._names: List[Set[str]] = []
+        self._lengths: List[int] = []
+        self._row_terms: List[Tuple[str, ...]] = []
+        self._rows: Dict[object, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._live = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._live
+
+    key = staticmethod(document_key)
+
+    def add(self, document: dict) -> None:
+        name_terms = tokenize(str(document.get("name") or ""))
+        terms = name_terms * self.name_weight
+        terms += tokenize(str(document.get("type") or "")) + tokenize(str(document.get("description") or ""))
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        with self._lock:
+            previous = self._rows.get(self.key(document))
+            if previous is not None:
+                self._remove(previous)
+            row = len(self.keys)
+            self.keys.append(self.key(document))
+            self._names.append(set(name_terms))
+            self._lengths.append(len(terms))
+            self._row_terms.append(tuple(frequencies))
+            self._rows[self.key(document)] = row
+            for term, tf in frequencies.items():
+                self._postings.setdefault(term, {})[row] = tf
+            self._total_length += len(terms)
+            self._live += 1
+
+    def add_many(self, documents: Iterable[dict]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def _remove(self, row: int) -> None:
+        """Drop a row from the postings. Caller holds the lock."""
+        for term in self._row_terms[row]:
+            postings = self._postings[term]
+            del postings[row]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[row]
+        self._live -= 1
+        self.keys[row] = None
+
+    def search(self, query: str, k: int, workspace_id=None) -> List[Tuple[tuple, float, bool]]:
+        """Top-k `(key, score, name_match)`, best first, where `key` is `BM25Index.key` of the document.
+
+        `name_match` is True when every word of the document's name is in the query.
+        """
+        terms = set(tokenize(query))
+        if not terms or not self._live:
+            return []
+        with self._lock:
+            average = self._total_length / self._live
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (self._live - len(postings) + 0.5) / (len(postings) + 0.5))
+                for row, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[row] / average)
+                    scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / norm
+            ranked = sorted(scores.items(), key=lambda item: -item[1])
+            hits = []
+            for row, score in ranked:
+                key = self.keys[row]
+                if workspace_id is not None and key[0] != workspace_id:
+                    continue
+                hits.append((key, score, bool(self._names[row]) and self._names[row] <= terms))
+                if len(hits) == k:
+                    break
+        return hits
@@ -0,0 +1,354 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.providers.db_provider import DBProvider
+from app.core.services.call_metrics import RAG_EMBEDDING, RAG_SEARCH
+from app.utils.functions import document_key, document_text, format_documents
+
+logger = logging.getLogger(__name__)
+
+# Fields kept alongside each vector; embeddings themselves live only in the matrix.
+DOCUMENT_FIELDS = ("id", "workspace_id", "name", "description", "type", "price", "metadata")
+
+EMBEDDING_SECONDS = RAG_EMBEDDING.labels(backend="memory")
+SEARCH_SECONDS = RAG_SEARCH.labels(backend="memory")
+
+
+class VectorCollection:
+    """Contiguous float32 matrix of L2-normalized embeddings plus their documents.
+
+    The matrix grows by doubling so incremental adds are amortized O(1). A matrix
+    loaded from disk stays memory-mapped until the first add copies it. Row numbers
+    are also grouped by `workspace_id`, so a workspace-scoped search only scores
+    that workspace's rows. Documents with an id are upserted by `(workspace_id, id)`.
+    """
+
+    def __init__(self, matrix: Optional[np.ndarray] = None, documents: Optional[List[dict]] = None) -> None:
+        self.documents: List[dict] = documents or []
+        self._matrix = matrix
+        self._count = len(self.documents)
+        self._positions = {self.key(d): i for i, d in enumerate(self.documents) if d.get("id") is not None}
+        self._workspaces: Dict[object, List[int]] = {}
+        for i, d in enumerate(self.documents):
+            self._workspaces.setdefault(d.get("workspace_id"), []).append(i)
+        self._workspace_rows: Dict[object, np.ndarray] = {}  # cached index arrays, dropped on change
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def key(document: dict):
+        return document.get("workspace_id"), document.get("id")
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        return None if self._matrix is None else self._matrix[:self._count]
+
+    def add(self, vector: np.ndarray, document: dict) -> bool:
+        """Append a row, or replace the row of the workspace's document with the same id. Returns True if new."""
+        with self._lock:
+            position = self._positions.get(self.key(document)) if document.get("id") is not None else None
+            if position is not None:
+                if not self._matrix.flags.writeable:
+                    self._matrix = np.array(self._matrix, dtype=np.float32)
+                self._matrix[position] = vector
+                self.documents[position] = document
+                return False
+            if self._matrix is None:
+                self._matrix = np.empty((16, vector.shape[0]), dtype=np.float32)
+            elif self._count == self._matrix.shape[0] or not self._matrix.flags.writeable:
+                grown = np.empty((max(16, self._matrix.shape[0] * 2), self._matrix.shape[1]), dtype=np.float32)
+                grown[:self._count] = self._matrix[:self._count]
+                self._matrix = grown
+            self._matrix[self._count] = vector
+            self.documents.append(document)
+            if document.get("id") is not None:
+                self._positions[self.key(document)] = self._count
+            self._track_workspace(document.get("workspace_id"), self._count)
+            self._count += 1
+            return True
+
+    def get(self, keys) -> List[dict]:
+        """Documents by `document_key`, in the order of `keys`; missing ones are left out."""
+        with self._lock:
+            documents = self.documents[:self._count]
+            found = {key: documents[self._positions[key]] for key in keys if key in self._positions}
+        if len(found) < len(keys):
+            # Documents without an id are keyed by name and have no position; look them up by scanning.
+            unnamed = {document_key(d): d for d in documents if d.get("id") is None}
+            found.update((key, unnamed[key]) for key in keys if key not in found and key in unnamed)
+        return [found[key] for key in keys if key in found]
+
+    def snapshot(self):
+        """Copies of the matrix rows and documents, consistent with each other, for persisting."""
+        with self._lock:
+            matrix = None if self._matrix is None else np.array(self._matrix[:self._count], dtype=np.float32)
+            return matrix, self.documents[:self._count]
+
+    def _track_workspace(self, workspace_id, position: int) -> None:
+        self._workspaces.setdefault(workspace_id, []).append(position)
+        self._workspace_rows.pop(workspace_id, None)
+
+    def search(self, query: np.ndarray, k: int, workspace_id=None) -> List[dict]:
+        """Top-k documents by dot product, optionally among one workspace's rows only."""
+        # Snapshot under the lock; the dot product itself runs lock-free.
+        with self._lock:
+            count = self._count
+            matrix = None if self._matrix is None else self._matrix[:count]
+            documents = self.documents[:count]
+            rows = None
+            if workspace_id is not None:
+                rows = self._workspace_rows.get(workspace_id)
+                if rows is None:
+                    rows = np.array(sorted(self._workspaces.get(workspace_id, [])), dtype=np.intp)
+                    self._workspace_rows[workspace_id] = rows
+        if rows is not None:
+            if not len(rows):
+                return []
+            scores = matrix[rows] @ query
+        elif count:
+            scores = matrix @ query
+        else:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            top = rows[top]
+        return [documents[i] for i in top]
+
+
+class InMemoryVectorProvider(DBProvider):
+    """Vector search over small per-workspace catalogs without a database round trip.
+
+    db_config keys:
+        collection (dict): Resource names to index, e.g. {'products': ..., 'services': ...}.
+        path (str): Directory for the persisted `{resource}.npy` / `{resource}.json` files.
+        seed_dir (str): Directory with `{resource}.json` seed files (default 'data').
+        source (MongoDBProvider | None): If set, the index is loaded from Mongo instead of seed files.
+    """
+
+    def __init__(self, db_config, tokenizer=None, lazy=False):
+        super().__init__(db_config, tokenizer)
+        self.path = db_config.get("path")
+        self.collections: Dict[str, VectorCollection] = {}
+        self._persist_locks: Dict[str, threading.Lock] = {}
+        self._persist_locks_guard = threading.Lock()
+        if not lazy:
+            self.ensure_connected()
+
+    def connect(self):
+        """Load every collection from the persisted index, Mongo, or the seed files."""
+        for resource in self.db_config["collection"]:
+            collection = self._load_persisted(resource)
+            if collection is not None:
+                self.collections[resource] = collection
+                continue
+            source = self.db_config.get("source")
+            if source is not None:
+                self.collections[resource] = self._load_from_mongo(source, resource)
+            else:
+                self.collections[resource] = self._load_from_seed(resource)
+            self.persist(resource)
+
+    def disconnect(self):
+        """Persist all collections."""
+        for resource in self.collections:
+            self.persist(resource)
+
+    # ---------------
+    # Loading and persistence
+    # ---------------
+    def _files(self, resource: str):
+        return os.path.join(self.path, f"{resource}.npy"), os.path.join(self.path, f"{resource}.json")
+
+    def _load_persisted(self, resource: str) -> Optional[VectorCollection]:
+        if not self.path:
+            return None
+        matrix_file, documents_file = self._files(resource)
+        if not (os.path.exists(matrix_file) and os.path.exists(documents_file)):
+            return None
+        with open(documents_file, "r", encoding="utf-8") as f:
+            documents = json.load(f)
+        matrix = np.load(matrix_file, mmap_mode="r")
+        if matrix.shape[0] != len(documents):
+            logger.warning("Vector index for '%s' is inconsistent, rebuilding", resource)
+            return None
+        return VectorCollection(matrix, documents)
+
+    def _load_from_seed(self, resource: str) -> VectorCollection:
+        collection = VectorCollection()
+        seed_file = os.path.join(self.db_config.get("seed_dir", "data"), f"{resource}.json")
+        if not os.path.exists(seed_file):
+            return collection
+        with open(seed_file, "r", encoding="utf-8") as f:
+            for document in json.load(f):
+                vector = self.tokenizer(document_text(document, resource))
+                collection.add(self._normalize(vector), self._stored_fields(document))
+        return collection
+
+    def _load_from_mongo(self, source, resource: str) -> VectorCollection:
+        collection = VectorCollection()
+        projection = {field: 1 for field in DOCUMENT_FIELDS}
+        projection.update({"embedding": 1, "_id": 0})
+        for document in source.db[resource].find({"embedding": {"$exists": True}}, projection):
+            collection.add(self._normalize(document.pop("embedding")), self._stored_fields(document))
+        return collection
+
+    def persist(self, resource: str) -> None:
+        """Write a collection to `{path}/{resource}.npy` so restarts can mmap it.
+
+        Safe to call from several threads: writes of one collection are serialized,
+        each writes a snapshot taken under the collection lock, and files are
+        replaced atomically from unique temp files.
+        """
+        collection = self.collections.get(resource)
+        if not self.path or collection is None:
+            return
+        with self._persist_lock(resource):
+            matrix, documents = collection.snapshot()
+            if matrix is None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            matrix_file, documents_file = self._files(resource)
+            self._write_replace(matrix_file, lambda f: np.save(f, matrix))
+            self._write_replace(documents_file, lambda f: f.write(json.dumps(documents, default=str).encode("utf-8")))
+
+    def flush(self, collection) -> None:
+        self.persist(collection)
+
+    def _persist_lock(self, resource: str) -> threading.Lock:
+        with self._persist_locks_guard:
+            return self._persist_locks.setdefault(resource, threading.Lock())
+
+    def _write_replace(self, target: str, write) -> None:
+        fd, temp = tempfile.mkstemp(dir=self.path, prefix=os.path.basename(target) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp, target)
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+            raise
+
+    # ---------------
+    # DBProvider
+    # ---------------
+    def add_document(self, document, collection, persist: bool = True) -> bool:
+        """
+        Embed a document and append it to the in-memory index.
+
+        Args:
+            document (dict | pydantic.BaseModel): The document to add.
+            collection (str): 'products' or 'services'.
+            persist (bool): Rewrite the on-disk index; disable while loading in bulk.
+
+        Returns:
+            bool: True if the document was added successfully, False otherwise.
+        """
+        try:
+            self.ensure_connected()
+            if hasattr(document, "model_dump"):
+                document = document.model_dump()
+            if not document.get("name"):
+                raise ValueError("Document is missing required 'name' field")
+            vector = self.tokenizer(document_text(document, collection))
+            self.collections.setdefault(collection, VectorCollection()).add(
+                self._normalize(vector), self._stored_fields(document)
+            )
+            if persist:
+                self.persist(collection)
+            return True
+        except Exception as e:
+            logger.warning("Error adding document: %s", e)
+            return False
+
+    def add_documents(self, documents, collection, persist: bool = True) -> dict:
+        """
+        Upsert several documents by `id` with one batched embedding request.
+
+        Args:
+            documents (list[dict]): The documents to add.
+            collection (str): 'products' or 'services'.
+            persist (bool): Rewrite the on-disk index; bulk loads pass False and call `flush` once.
+
+        Returns:
+            dict: Counts of `upserted`, `modified` and `failed` documents.
+        """
+        self.ensure_connected()
+        documents = [d.model_dump() if hasattr(d, "model_dump") else d for d in documents]
+        valid = [d for d in documents if isinstance(d, dict) and d.get("name")]
+        report = {"upserted": 0, "modified": 0, "failed": len(documents) - len(valid)}
+        if not valid:
+            return report
+        vectors = self.embed_many([document_text(d, collection) for d in valid])
+        target = self.collections.setdefault(collection, VectorCollection())
+        for document, vector in zip(valid, vectors):
+            is_new = target.add(self._normalize(vector), self._stored_fields(document))
+            report["upserted" if is_new else "modified"] += 1
+        if persist:
+            self.persist(collection)
+        return report
+
+    def retrieve_similar(self, query, resource, k=2, workspace_id=None):
+        """
+        Retrieve top-k documents by cosine similarity.
+
+        Args:
+            query (str): The query string to search for.
+            resource (str): 'products' or 'services'.
+            k (int): The number of similar documents to retrieve.
+            workspace_id (str | None): Only score this workspace's documents.
+
+        Returns:
+            str: The matching documents, one per line.
+        """
+        try:
+            return format_documents(self.search_documents(query, resource, k, workspace_id))
+        except Exception as e:
+            logger.warning("Error retrieving similar documents: %s", e)
+            return []
+
+    def search_documents(self, query, resource, k=2, workspace_id=None) -> List[dict]:
+        """Top-k documents by cosine similarity, best first; raises on embedding errors."""
+        self.ensure_connected()
+        collection = self.collections.get(resource)
+        if collection is None:
+            return []
+        with EMBEDDING_SECONDS.time():
+            query_vector = self._normalize(self.tokenizer(query))
+        with SEARCH_SECONDS.time():
+            return collection.search(query_vector, k, workspace_id)
+
+    def get_documents(self, resource, keys) -> List[dict]:
+        """Documents by `document_key`, in the order of `keys`; missing ones are left out."""
+        self.ensure_connected()
+        collection = self.collections.get(resource)
+        return [] if collection is None else collection.get(list(keys))
+
+    def iter_documents(self, resource):
+        """Yield every indexed document of a collection."""
+        self.ensure_connected()
+        collection = self.collections.get(resource)
+        if collection is not None:
+            yield from collection.documents[:len(collection)]
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _stored_fields(document: dict) -> dict:
+        return {field: document[field] for field in DOCUMENT_FIELDS if document.get(field) is not None}
@@ -1,27 +1,57 @@
+import logging
+
 from app.core.providers.db_provider import DBProvider
-from pymongo import MongoClient
+from app.core.services.call_metrics import RAG_EMBEDDING, RAG_SEARCH
+from app.utils.functions import document_key, document_text, format_documents
+from config.services import MONGO
+from pymongo import ASCENDING, MongoClient, InsertOne, UpdateOne
+from pymongo.operations import SearchIndexModel
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Fields returned by searches; embeddings are never sent back.
+DOCUMENT_FIELDS = ("id", "workspace_id", "name", "description", "type", "price")
+
+EMBEDDING_SECONDS = RAG_EMBEDDING.labels(backend="mongo")
+SEARCH_SECONDS = RAG_SEARCH.labels(backend="mongo")
 
 class MongoDBProvider(DBProvider):
-    def __init__(self, db_config, tokenizer=None):
-        self.db_config = db_config
-        self.tokenizer = tokenizer
-        self.connect()
+    def __init__(self, db_config, tokenizer=None, lazy=False):
+        super().__init__(db_config, tokenizer)
+        self.client = None
+        self._db = None
+        if not lazy:
+            self.ensure_connected()
+
+    @property
+    def db(self):
+        """The database handle, connecting on first access when built with `lazy=True`."""
+        self.ensure_connected()
+        return self._db
 
     def connect(self):
         """Connect to the MongoDB database."""
         self.client = MongoClient(self.db_config['uri'])
-        self.db = self.client[self.db_config['database']]
+        self._db = self.client[self.db_config['database']]
         # self.collections = []
         # for collection_name, collection in self.db_config['collection'].items():
         #     self.collections['collection_name'] = self.db[collection]
 
+    def ping(self):
+        """Round-trip to the server; warms the connection pool and surfaces a bad URI early."""
+        self.db.client.admin.command("ping")
+
     def disconnect(self):   
         """Disconnect from the MongoDB database."""
-        self.client.close()
+        if self.client is not None:
+            self.client.close()
 
     def add_document(self, document, collection) -> bool:
         """
-        Add a document to the MongoDB collection.
+        Add a document to the MongoDB collection, or replace the fields of the stored one.
+
+        Like `add_documents`, a document with an `id` is upserted by `(workspace_id, id)`.
         
         Args:
             document (dict | pydantic.BaseModel): The document to add.
@@ -30,84 +60,232 @@ class MongoDBProvider(DBProvider):
             bool: True if the document was added successfully, False otherwise.
         """
         try:
-            # Allow passing in a Pydantic model or a plain dict
-            if hasattr(document, "model_dump"):
-                document = document.model_dump()
-            elif hasattr(document, "dict"):
-                document = document.dict()
-
-            if not isinstance(document, dict):
-                raise TypeError("Document must be a dict or a Pydantic model")
-            name = document.get("name")
-            if not name:
-                raise ValueError("Document is missing required 'name' field")
-
-            text_to_embed = f'Name: {document["name"]} \n Description: {document["description"]} \n Price: {document["price"]}'
-            if collection == 'services':
-                del document["type"]
-            else:
-                text_to_embed += f'\n Type: {document["type"]}'
-                
+            document = self._prepare_document(document, collection)
+            text_to_embed = document_text(document, collection)
+
             if self.tokenizer is not None:
                 embedding = self.tokenizer(text_to_embed)
                 document["embedding"] = embedding
 
-            print(f"Adding document with embedding: {document}")
-            self.db[collection].insert_one(document)
+            if document.get("id") is not None:
+                self.db[collection].update_one(upsert_filter(document), {"$set": document}, upsert=True)
+            else:
+                self.db[collection].insert_one(document)
             return True
         except Exception as e:
-            print(f"Error adding document: {e}")
+            logger.warning("Error adding document: %s", e)
             return False
-        
-    def retrieve_similar(self, query, resource, k=2):
+
+    def add_documents(self, documents, collection, persist=True) -> dict:
+        """
+        Upsert several documents with one batched embedding request and one bulk write.
+
+        Documents with an `id` are upserted by `(workspace_id, id)`, so re-running an
+        import is idempotent and two workspaces may use the same ids.
+
+        Args:
+            documents (list[dict | pydantic.BaseModel]): The documents to add.
+            collection (str): The target collection.
+            persist (bool): Ignored; the bulk write is durable when it returns.
+
+        Returns:
+            dict: Counts of `upserted`, `modified` and `failed` documents.
+        """
+        prepared, failed = [], 0
+        for document in documents:
+            try:
+                prepared.append(self._prepare_document(document, collection))
+            except (TypeError, ValueError) as e:
+                logger.warning("Skipping document: %s", e)
+                failed += 1
+        if not prepared:
+            return {"upserted": 0, "modified": 0, "failed": failed}
+
+        if self.tokenizer is not None:
+            embeddings = self.embed_many([document_text(document, collection) for document in prepared])
+            for document, embedding in zip(prepared, embeddings):
+                document["embedding"] = embedding
+
+        operations = [
+            UpdateOne(upsert_filter(document), {"$set": document}, upsert=True)
+            if document.get("id") is not None else InsertOne(document)
+            for document in prepared
+        ]
+        try:
+            result = self.db[collection].bulk_write(operations, ordered=False)
+            return {
+                "upserted": result.upserted_count + result.inserted_count,
+                "modified": result.modified_count,
+                "failed": failed,
+            }
+        except BulkWriteError as e:
+            details = e.details
+            return {
+                "upserted": details.get("nUpserted", 0) + details.get("nInserted", 0),
+                "modified": details.get("nModified", 0),
+                "failed": failed + len(details.get("writeErrors", [])),
+            }
+
+    def _prepare_document(self, document, collection) -> dict:
+        # Allow passing in a Pydantic model or a plain dict
+        if hasattr(document, "model_dump"):
+            document = document.model_dump()
+        elif hasattr(document, "dict"):
+            document = document.dict()
+
+        if not isinstance(document, dict):
+            raise TypeError("Document must be a dict or a Pydantic model")
+        name = document.get("name")
+        if not name:
+            raise ValueError("Document is missing required 'name' field")
+
+        if collection == 'services':
+            document.pop("type", None)
+        if document.get("id") is None:
+            # Left out rather than stored as null, which the unique (workspace_id, id) index would count.
+            document.pop("id", None)
+        return document
+
+    def retrieve_similar(self, query, resource, k=2, workspace_id=None):
         """
         Retrieve top-k similar documents based on a query.
         
         Args:
             query (str): The query string to search for.
+            resource (str): 'products' or 'services'.
             k (int): The number of similar documents to retrieve.
+            workspace_id (str | None): Only search this workspace's documents (Atlas pre-filter).
         
         Returns:
-            list: A list of similar documents.
+            str: The matching documents, one per line.
         """
         try:
-            query_embedding = self.tokenizer(query)
-            # results = self.collection.aggregate([
-            #     {
-            #         "$vectorSearch": {
-            #             "queryVector": query_embedding,
-            #             "path": "embedding",
-            #             "numCandidates": k,
-            #             "limit": k,
-            #             "index": "vector_index"  
-            #         }
-            #     }
-            # ])
-            
-            results = self.db[resource].aggregate([
-                {
-                    "$vectorSearch": {
-                        "queryVector": query_embedding,
-                        "path": "embedding",
-                        "numCandidates": k,
-                        "limit": k,
-                        "index": "vector_index"  
-                    }
-                },
-                {
-                    "$project": {
-                        "name": 1,
-                        "description": 1,
-                        "price": 1,
-                        "_id": 0
-                    }
-                }
-            ])
-
-            documents = ""
-            for result in results:
-                documents += f"Name: {result.get('name')}, Description: {result.get('description')}, Price: {result.get('price')}\n"
-            return documents.strip()
+            return format_documents(self.search_documents(query, resource, k, workspace_id))
         except Exception as e:
-            print(f"Error retrieving similar documents: {e}")
-            return []
\ No newline at end of file
+            logger.warning("Error retrieving similar documents: %s", e)
+            return []
+
+    def search_documents(self, query, resource, k=2, workspace_id=None):
+        """
+        Top-k documents by vector similarity, best first, as dicts with `id` and `name`.
+
+        Raises on database or embedding errors; `retrieve_similar` is the forgiving wrapper.
+        """
+        with EMBEDDING_SECONDS.time():
+            query_embedding = self.tokenizer(query)
+
+        search = {
+            "queryVector": query_embedding,
+            "path": "embedding",
+            "numCandidates": num_candidates(k),
+            "limit": k,
+            "index": MONGO.vector_index
+        }
+        if workspace_id is not None:
+            # Pre-filter: candidates are drawn from this workspace only, so cost
+            # follows the tenant's catalog size rather than the whole collection.
+            search["filter"] = {"workspace_id": workspace_id}
+
+        with SEARCH_SECONDS.time():
+            return list(self.db[resource].aggregate([
+                {"$vectorSearch": search},
+                {"$project": {field: 1 for field in DOCUMENT_FIELDS} | {"_id": 0}}
+            ]))
+
+    def get_documents(self, resource, keys):
+        """Documents by `document_key`, in the order of `keys`, in one query; missing ones are left out."""
+        keys = list(keys)
+        if not keys:
+            return []
+        clauses = [
+            {"workspace_id": workspace_id, "$or": [{"id": local}, {"id": {"$exists": False}, "name": local}]}
+            for workspace_id, local in keys
+        ]
+        projection = {field: 1 for field in DOCUMENT_FIELDS} | {"_id": 0}
+        found = {document_key(document): document for document in self.db[resource].find({"$or": clauses}, projection)}
+        return [found[key] for key in keys if key in found]
+
+    def iter_documents(self, resource):
+        """Yield every document of a collection without its embedding."""
+        yield from self.db[resource].find({}, {field: 1 for field in DOCUMENT_FIELDS} | {"_id": 0})
+
+    def ensure_vector_index(self, collection, apply=True) -> str:
+        """
+        Create or update the Atlas Vector Search index of a collection.
+
+        Args:
+            collection (str): The collection name.
+            apply (bool): Only report what would change when False.
+
+        Returns:
+            str: 'created', 'updated', 'unchanged', or 'would create' / 'would update'.
+        """
+        definition = vector_index_definition()
+        existing = list(self.db[collection].list_search_indexes(MONGO.vector_index))
+        if not existing:
+            action = "create"
+        elif existing[0].get("latestDefinition") != definition:
+            action = "update"
+        else:
+            return "unchanged"
+        if not apply:
+            return f"would {action}"
+        if action == "create":
+            self.db[collection].create_search_index(
+                SearchIndexModel(definition=definition, name=MONGO.vector_index, type="vectorSearch")
+            )
+        else:
+            self.db[collection].update_search_index(MONGO.vector_index, definition)
+        return f"{action}d"
+
+    def ensure_document_index(self, collection, apply=True) -> str:
+        """
+        Create the unique `(workspace_id, id)` index that `add_documents` upserts by.
+
+        Documents without an `id` are left out of it. Ids stored as null by earlier
+        versions are unset first, as they would otherwise collide.
+
+        Args:
+            collection (str): The collection name.
+            apply (bool): Only report what would change when False.
+
+        Returns:
+            str: 'created', 'unchanged' or 'would create'.
+        """
+        if MONGO.document_index in self.db[collection].index_information():
+            return "unchanged"
+        if not apply:
+            return "would create"
+        self.db[collection].update_many({"id": {"$type": "null"}}, {"$unset": {"id": ""}})
+        self.db[collection].create_index(
+            [("workspace_id", ASCENDING), ("id", ASCENDING)],
+            name=MONGO.document_index,
+            unique=True,
+            partialFilterExpression={"id": {"$exists": True}},
+        )
+        return "created"
+
+
+def upsert_filter(document: dict) -> dict:
+    """The `(workspace_id, id)` match a document with an id is upserted by."""
+    return {"workspace_id": document.get("workspace_id"), "id": document["id"]}
+
+
+def num_candidates(k: int) -> int:
+    """Candidates Atlas scores before keeping the top k; more means better recall, more latency."""
+    return min(MONGO.max_candidates, max(k * MONGO.candidates_per_result, MONGO.min_candidates, k))
+
+
+def vector_index_definition() -> dict:
+    """Atlas Vector Search index: the embedding plus `workspace_id` as a pre-filter field."""
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": "embedding",
+                "numDimensions": MONGO.embedding_dimensions,
+                "similarity": MONGO.similarity
+            },
+            {"type": "filter", "path": "workspace_id"}
+        ]
+    }
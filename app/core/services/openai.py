@@ -1,43 +1,77 @@
 import json
+import logging
 import websockets
 from openai import OpenAI
 
+from app.utils import frames
+from app.utils.payloads import payloads
 from config.settings import settings
-from config.services import OPENAI_SESSION_UPDATE, OPENAI
+from config.services import OPENAI_SESSION_UPDATE, OPENAI, RAG_PREFETCH
 
+logger = logging.getLogger(__name__)
+
+RESPONSE_CREATE = frames.dumps({"type": "response.create"})
 
 class OpenaiService:
-    def __init__(self) -> None:
+    def __init__(self, tools=None) -> None:
         self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.tools = tools  # ToolRegistry whose schema fills session.tools
 
     async def initialize_session(self, openai_ws):
         """Control initial session with OpenAI."""
-        session_update = OPENAI_SESSION_UPDATE
-        print('Sending session update:', json.dumps(session_update))
-        await openai_ws.send(json.dumps(session_update))
+        await self.update_session(openai_ws)
         await self.send_initial_conversation_item(openai_ws)
 
-    async def send_initial_conversation_item(self, openai_ws):
+    async def update_session(self, openai_ws, wait: bool = False, tenant: str | None = None):
+        """Send the session configuration, optionally waiting for `session.updated`."""
+        session_update = self.session_update_frame(tenant)
+        logger.info("Sending session update: %s", session_update)
+        await openai_ws.send(session_update)
+        if wait:
+            async for message in openai_ws:
+                event = json.loads(message)
+                if event.get('type') == 'session.updated':
+                    return
+                if event.get('type') == 'error':
+                    raise RuntimeError(f"Session update failed: {event.get('error')}")
+
+    async def send_initial_conversation_item(self, openai_ws, tenant: str | None = None):
         """Send initial conversation item if AI talks first."""
-        initial_conversation_item = {
-            "type": "conversation.item.create",
-            "item": {
-                "type": "message",
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_text",
-                        "text": OPENAI.initial_conversation_item
-                    }
-                ]
-            }
-        }
-        await openai_ws.send(json.dumps(initial_conversation_item))
-        await openai_ws.send(json.dumps({"type": "response.create"}))
+        await openai_ws.send(self.initial_conversation_frame(tenant))
+        await openai_ws.send(RESPONSE_CREATE)
+
+    def session_update_frame(self, tenant: str | None = None) -> str:
+        """`session.update` text frame, serialized once per tenant (see `payloads.invalidate`)."""
+        def build() -> str:
+            session = dict(OPENAI_SESSION_UPDATE["session"])
+            if self.tools is not None:
+                session["tools"] = self.tools.schema()
+            if RAG_PREFETCH.enabled:
+                # Transcription is billed per call; only the prefetcher consumes it.
+                session["input_audio_transcription"] = {"model": OPENAI.transcription_model}
+            return frames.dumps({**OPENAI_SESSION_UPDATE, "session": session})
+        return payloads.get(("session.update", tenant), build)
+
+    def initial_conversation_frame(self, tenant: str | None = None) -> str:
+        def build() -> str:
+            return frames.dumps({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "input_text",
+                            "text": OPENAI.initial_conversation_item
+                        }
+                    ]
+                }
+            })
+        return payloads.get(("initial_item", tenant), build)
 
     async def websocket(self):
         return await websockets.connect(
-            f'wss://api.openai.com/v1/realtime?model={OPENAI.model}',
+            f'{settings.OPENAI_REALTIME_URL}?model={OPENAI.model}',
             extra_headers={
                 "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
                 "OpenAI-Beta": "realtime=v1"
@@ -47,8 +81,17 @@ class OpenaiService:
     def embed(self, text):
         """Create an embedding for the given text."""
         resp = self.client.embeddings.create(
-            model="text-embedding-3-small",
+            model=OPENAI.embedding_model,
             input=text
         )
 
-        return resp.data[0].embedding
\ No newline at end of file
+        return resp.data[0].embedding
+
+    def embed_many(self, texts):
+        """Create embeddings for several texts in a single request, in input order."""
+        resp = self.client.embeddings.create(
+            model=OPENAI.embedding_model,
+            input=list(texts)
+        )
+
+        return [item.embedding for item in sorted(resp.data, key=lambda item: item.index)]
\ No newline at end of file
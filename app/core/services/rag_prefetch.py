@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.services.call_metrics import RAG_PREFETCH
+from app.core.services.tool_executor import ToolExecutor
+from app.core.services.lexical_index import tokenize
+from config.services import RAG_PREFETCH as PREFETCH
+
+# Hebrew prepositions and articles written as part of the next word: "הכיסא" is "the chair".
+HEBREW_PREFIXES = frozenset("והבכלמש")
+
+STARTED = RAG_PREFETCH.labels(outcome="started")
+SKIPPED = RAG_PREFETCH.labels(outcome="skipped")
+HITS = RAG_PREFETCH.labels(outcome="hit")
+MISSES = RAG_PREFETCH.labels(outcome="miss")
+
+
+def bare_form(term: str) -> str:
+    """The word without a leading Hebrew prefix letter; unchanged for other words."""
+    return term[1:] if len(term) > 3 and term[0] in HEBREW_PREFIXES else term
+
+
+def with_bare_forms(terms) -> frozenset:
+    return frozenset(terms) | {bare_form(term) for term in terms}
+
+
+class PrefetchEntry:
+    __slots__ = ("item_id", "terms", "resource", "task", "created")
+
+    def __init__(self, item_id: str, terms: frozenset, resource: str, task: asyncio.Task) -> None:
+        self.item_id = item_id
+        self.terms = terms
+        self.resource = resource
+        self.task = task
+        self.created = time.monotonic()
+
+
+class RagPrefetcher:
+    """Searches the knowledge base from the caller's transcript while they are still talking.
+
+    Fed with `conversation.item.input_audio_transcription.delta` / `.completed`
+    events. Once a caller turn has `min_words` content words it is searched in
+    every resource, and again each time it grows by `step_words`; while a search
+    for the turn is in flight only the latest text is kept for the next one.
+    Searches run on `executor`, a small pool shared by every call's prefetcher and
+    kept apart from the tool threads, so speculative work never delays a real tool
+    call. When it has no free thread for a prefetch, the prefetch is skipped and
+    retried with the next transcript event.
+
+    `lookup` answers a `rag_search` call from a prefetch of the same resource
+    whose transcript contains at least `min_overlap` of the query's words (the
+    closest, then the newest), waiting for it if it is still running. Anything else is a miss and the
+    caller searches the database as before. One instance serves one phone call.
+    """
+
+    def __init__(
+        self,
+        search: Callable[..., List[dict]],
+        executor: ToolExecutor,
+        spawn: Callable[[Awaitable], asyncio.Task],
+        workspace_id: Optional[str] = None,
+        resources=PREFETCH.resources,
+        k: int = PREFETCH.top_k,
+    ) -> None:
+        self.search = search
+        self.executor = executor
+        self.spawn = spawn
+        self.workspace_id = workspace_id
+        self.resources = tuple(resources)
+        self.k = k
+        self._entries: "deque[PrefetchEntry]" = deque(maxlen=PREFETCH.max_entries)
+        self._partials: Dict[str, str] = {}
+        self._searched_words: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._queued: Dict[str, str] = {}
+        self.stats = {"prefetches": 0, "skipped": 0, "hits": 0, "misses": 0}
+
+    def on_transcript_delta(self, item_id: str, delta: str) -> None:
+        text = self._partials.get(item_id, "") + delta
+        self._partials[item_id] = text
+        words = len(tokenize(text))
+        searched = self._searched_words.get(item_id)
+        if searched is None:
+            if words >= PREFETCH.min_words:
+                self._prefetch(item_id, text)
+        elif words - searched >= PREFETCH.step_words:
+            self._prefetch(item_id, text)
+
+    def on_transcript_done(self, item_id: str, transcript: str) -> None:
+        self._partials.pop(item_id, None)
+        if len(tokenize(transcript)) > self._searched_words.get(item_id, 0):
+            self._prefetch(item_id, transcript)
+
+    def _prefetch(self, item_id: str, text: str) -> None:
+        if self._in_flight.get(item_id):
+            self._searched_words[item_id] = len(tokenize(text))
+            self._queued[item_id] = text
+            return
+        if self.executor.available() < len(self.resources):
+            # Speculative work yields to a busy worker; the turn's word count is left as it was.
+            self.stats["skipped"] += 1
+            SKIPPED.inc()
+            return
+
+        self._searched_words[item_id] = len(tokenize(text))
+        terms = with_bare_forms(tokenize(text))
+        self._in_flight[item_id] = len(self.resources)
+        for resource in self.resources:
+            search = self.executor.submit(self.search, text, resource, self.k, workspace_id=self.workspace_id)
+            task = self.spawn(asyncio.wait_for(search, self.executor.timeout))
+            task.add_done_callback(lambda task, item_id=item_id: self._finished(item_id, task))
+            self._entries.append(PrefetchEntry(item_id, terms, resource, task))
+        self.stats["prefetches"] += 1
+        STARTED.inc()
+
+    def _finished(self, item_id: str, task: asyncio.Task) -> None:
+        if not task.cancelled():
+            # Failures only turn into misses in `lookup`; retrieve them so asyncio does not log them.
+            task.exception()
+        self._in_flight[item_id] -= 1
+        if self._in_flight[item_id]:
+            return
+        del self._in_flight[item_id]
+        text = self._queued.pop(item_id, None)
+        # A cancelled search means the call is over.
+        if text is not None and not task.cancelled():
+            self._prefetch(item_id, text)
+
+    async def lookup(self, query: str, resource: str, k: int) -> Optional[List[dict]]:
+        """Prefetched documents for a `rag_search` call, or None to search the database."""
+        terms = set(tokenize(query))
+        if terms and k <= self.k:
+            # A query word also counts when it appears without its prefix letter, or vice versa.
+            forms = [{term, bare_form(term)} for term in terms]
+            expired = time.monotonic() - PREFETCH.ttl
+            candidates = []
+            for age, entry in enumerate(reversed(self._entries)):
+                if entry.resource != resource or entry.created < expired or entry.task.cancelled():
+                    continue
+                overlap = sum(1 for variants in forms if variants & entry.terms) / len(terms)
+                if overlap >= PREFETCH.min_overlap:
+                    candidates.append((-overlap, age, entry))
+            # Best word overlap first, the newest prefetch among equals.
+            for _, _, entry in sorted(candidates, key=lambda candidate: candidate[:2]):
+                try:
+                    documents = await asyncio.shield(entry.task)
+                except Exception:
+                    continue
+                self.stats["hits"] += 1
+                HITS.inc()
+                return documents[:k]
+        self.stats["misses"] += 1
+        MISSES.inc()
+        return None
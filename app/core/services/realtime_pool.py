@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from config.services import REALTIME_POOL
+
+logger = logging.getLogger(__name__)
+
+
+class RealtimeSession:
+    """An OpenAI Realtime websocket that has already been configured."""
+
+    def __init__(self, ws) -> None:
+        self.ws = ws
+        self.created_at = time.monotonic()
+        self.reserved_at: Optional[float] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class RealtimeSessionPool:
+    """Pool of pre-connected, pre-initialized OpenAI Realtime sessions.
+
+    Idle sessions have finished the TLS handshake and `session.update`, so a call
+    only pays for them when the pool is empty. `/incoming-call` reserves a session
+    and immediately triggers the greeting, which is generated while Twilio plays
+    the welcome message; `/media-stream` claims it by the reservation token.
+
+    Args:
+        connect: Coroutine returning a new websocket connection.
+        prepare: Coroutine configuring a fresh connection (session.update).
+        activate: Coroutine run when a session is handed to a caller (greeting).
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable],
+        prepare: Callable[[object], Awaitable],
+        activate: Callable[[object], Awaitable],
+        size: int = REALTIME_POOL.size,
+        idle_ttl: float = REALTIME_POOL.idle_ttl,
+        reservation_ttl: float = REALTIME_POOL.reservation_ttl,
+        health_interval: float = REALTIME_POOL.health_interval,
+        ping_timeout: float = REALTIME_POOL.ping_timeout,
+    ) -> None:
+        self._connect = connect
+        self._prepare = prepare
+        self._activate = activate
+        self.size = size
+        self.idle_ttl = idle_ttl
+        self.reservation_ttl = reservation_ttl
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+
+        self._idle: List[RealtimeSession] = []
+        self._reserved: Dict[str, RealtimeSession] = {}
+        self._connecting = 0
+        self._maintenance: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {"warm": 0, "cold": 0, "expired": 0, "unhealthy": 0, "connect_errors": 0, "unknown_tokens": 0}
+
+    # ---------------
+    # Lifecycle
+    # ---------------
+    async def start(self, wait: bool = False) -> None:
+        """Start health checks and fill the pool, in the background unless `wait` is set."""
+        if self._maintenance is None and self.size > 0:
+            self._maintenance = asyncio.create_task(self._maintain())
+        if wait:
+            await self._fill()
+        else:
+            self._schedule_fill()
+
+    async def close(self) -> None:
+        if self._maintenance:
+            self._maintenance.cancel()
+            await asyncio.gather(self._maintenance, return_exceptions=True)
+            self._maintenance = None
+        sessions = self._idle + list(self._reserved.values())
+        self._idle, self._reserved = [], {}
+        await asyncio.gather(*(s.ws.close() for s in sessions), return_exceptions=True)
+
+    # ---------------
+    # Checkout
+    # ---------------
+    async def reserve(self) -> Optional[str]:
+        """Take an idle session for an incoming call and start its greeting.
+
+        Returns:
+            str | None: A token to pass to `claim`, or None if the pool is empty.
+        """
+        session = self._pop_idle()
+        if session is None:
+            return None
+        try:
+            await self._activate(session.ws)
+        except Exception as exc:
+            logger.warning("Realtime pool: failed activating reserved session: %s", exc)
+            await session.ws.close()
+            return None
+        token = secrets.token_urlsafe(16)
+        session.reserved_at = time.monotonic()
+        self._reserved[token] = session
+        return token
+
+    async def claim(self, token: Optional[str] = None):
+        """Return the session reserved under `token`, or an activated one otherwise."""
+        session = self._reserved.pop(token, None) if token else None
+        if session is not None and session.ws.open:
+            self.stats["warm"] += 1
+            return session.ws
+        if token and session is None:
+            # Reserved by another worker (or expired): that session is wasted until its reservation_ttl.
+            self.stats["unknown_tokens"] += 1
+            logger.warning("Realtime pool: no session reserved under the stream's token in this worker")
+        return await self.acquire()
+
+    async def acquire(self):
+        """Return an activated session, connecting a new one when no idle session exists."""
+        session = self._pop_idle()
+        if session is not None:
+            self.stats["warm"] += 1
+        else:
+            self.stats["cold"] += 1
+            session = RealtimeSession(await self._new_connection())
+        await self._activate(session.ws)
+        return session.ws
+
+    @asynccontextmanager
+    async def session(self, token: Optional[str] = None):
+        """Async context manager around `claim` that closes the socket afterwards."""
+        ws = await self.claim(token)
+        try:
+            yield ws
+        finally:
+            await ws.close()
+
+    def _pop_idle(self) -> Optional[RealtimeSession]:
+        while self._idle:
+            session = self._idle.pop()
+            if session.ws.open and session.age < self.idle_ttl:
+                self._schedule_fill()
+                return session
+            self._spawn(session.ws.close())
+        self._schedule_fill()
+        return None
+
+    # ---------------
+    # Maintenance
+    # ---------------
+    async def _new_connection(self):
+        ws = await self._connect()
+        try:
+            await self._prepare(ws)
+        except Exception:
+            await ws.close()
+            raise
+        return ws
+
+    async def _open_one(self) -> None:
+        try:
+            ws = await self._new_connection()
+            self._idle.append(RealtimeSession(ws))
+        except Exception as exc:
+            self.stats["connect_errors"] += 1
+            logger.warning("Realtime pool: failed opening session: %s", exc)
+        finally:
+            self._connecting -= 1
+
+    async def _fill(self) -> None:
+        missing = self.size - len(self._idle) - self._connecting
+        if missing > 0:
+            self._connecting += missing
+            await asyncio.gather(*(self._open_one() for _ in range(missing)))
+
+    def _schedule_fill(self) -> None:
+        if self._maintenance is not None:
+            self._spawn(self._fill())
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _is_healthy(self, session: RealtimeSession) -> bool:
+        if not session.ws.open:
+            return False
+        try:
+            pong = await session.ws.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _evict(self) -> None:
+        now = time.monotonic()
+        for token, session in list(self._reserved.items()):
+            if now - session.reserved_at > self.reservation_ttl:
+                # The caller never reached /media-stream (hung up during the welcome message).
+                del self._reserved[token]
+                self.stats["expired"] += 1
+                await session.ws.close()
+
+        idle = list(self._idle)
+        checks = await asyncio.gather(*(self._is_healthy(s) for s in idle))
+        for session, healthy in zip(idle, checks):
+            if (healthy and session.age < self.idle_ttl) or session not in self._idle:
+                continue
+            self._idle.remove(session)
+            self.stats["unhealthy" if not healthy else "expired"] += 1
+            await session.ws.close()
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._evict()
+                await self._fill()
+            except Exception as exc:
+                logger.warning("Realtime pool maintenance failed: %s", exc)
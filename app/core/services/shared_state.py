@@ -0,0 +1,149 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.providers.state_provider import SharedStateProvider
+from config.services import SHARED_STATE
+from config.settings import settings
+
+# Drop expired members, then add or refresh one unless the set is already full.
+# KEYS[1] set; ARGV: now, expiry, member, limit
+_ADD_MEMBER_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local limit = tonumber(ARGV[4])
+if limit > 0 and not redis.call('ZSCORE', KEYS[1], ARGV[3]) and redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+return 1
+"""
+
+
+class InMemoryStateProvider(SharedStateProvider):
+    """Process-local state: consistent within one worker only.
+
+    The default for a single uvicorn worker; use `RedisStateProvider` once the
+    app runs as several workers or nodes.
+    """
+
+    def __init__(self) -> None:
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._counters: Dict[str, Tuple[int, Optional[float]]] = {}  # key -> (value, expires_at)
+        self._sets: Dict[str, Dict[str, float]] = {}  # key -> {member: expires_at}
+        self._lock = threading.Lock()
+
+    def hset(self, name: str, field: str, value: str) -> None:
+        with self._lock:
+            self._hashes.setdefault(name, {})[field] = value
+
+    def hdel(self, name: str, field: str) -> None:
+        with self._lock:
+            self._hashes.get(name, {}).pop(field, None)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._hashes.get(name, {}))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._lock:
+            value, expires_at = self._counters.get(key, (0, None))
+            if expires_at is not None and expires_at <= now:
+                value, expires_at = 0, None
+            if ttl is not None:
+                expires_at = now + ttl
+            self._counters[key] = (value + amount, expires_at)
+            return value + amount
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._counters.get(key, (0, None))
+        return 0 if expires_at is not None and expires_at <= time.time() else value
+
+    def add_member(self, name: str, member: str, ttl: float, limit: int = 0) -> bool:
+        now = time.time()
+        with self._lock:
+            live = self._live(name, now)
+            if limit > 0 and member not in live and len(live) >= limit:
+                return False
+            live[member] = now + ttl
+            return True
+
+    def remove_member(self, name: str, member: str) -> None:
+        with self._lock:
+            self._sets.get(name, {}).pop(member, None)
+
+    def members(self, name: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._live(name, time.time()))
+
+    def _live(self, name: str, now: float) -> Dict[str, float]:
+        """Drop expired members and return the set. Caller holds the lock."""
+        live = {m: exp for m, exp in self._sets.get(name, {}).items() if exp > now}
+        self._sets[name] = live
+        return live
+
+
+class RedisStateProvider(SharedStateProvider):
+    """State kept in Redis (or any server speaking its protocol, e.g. Valkey or KeyDB).
+
+    Needs the `redis` package. Every key is prefixed with `namespace`, so several
+    deployments can share one server. Expiring sets are sorted sets scored by
+    expiry time, which assumes worker clocks are kept in sync (NTP).
+    """
+
+    def __init__(self, url: str = settings.REDIS_URL, namespace: str = SHARED_STATE.namespace) -> None:
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)") from exc
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._add_member = self._client.register_script(_ADD_MEMBER_SCRIPT)
+        self.namespace = namespace
+
+    def _key(self, name: str) -> str:
+        return f"{self.namespace}:{name}"
+
+    def hset(self, name: str, field: str, value: str) -> None:
+        self._client.hset(self._key(name), field, value)
+
+    def hdel(self, name: str, field: str) -> None:
+        self._client.hdel(self._key(name), field)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        return self._client.hgetall(self._key(name))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipe = self._client.pipeline()
+        pipe.incrby(self._key(key), amount)
+        if ttl is not None:
+            pipe.pexpire(self._key(key), int(ttl * 1000))
+        return pipe.execute()[0]
+
+    def get_counter(self, key: str) -> int:
+        return int(self._client.get(self._key(key)) or 0)
+
+    def add_member(self, name: str, member: str, ttl: float, limit: int = 0) -> bool:
+        now = time.time()
+        return bool(self._add_member(keys=[self._key(name)], args=[now, now + ttl, member, limit]))
+
+    def remove_member(self, name: str, member: str) -> None:
+        self._client.zrem(self._key(name), member)
+
+    def members(self, name: str) -> Dict[str, float]:
+        return dict(self._client.zrangebyscore(self._key(name), time.time(), "+inf", withscores=True))
+
+    def ping(self) -> None:
+        self._client.ping()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_state_provider(backend: str = settings.STATE_BACKEND) -> SharedStateProvider:
+    """Build the shared-state backend named by `STATE_BACKEND`."""
+    if backend == "memory":
+        return InMemoryStateProvider()
+    if backend == "redis":
+        return RedisStateProvider()
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
@@ -0,0 +1,98 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Set
+
+from config.services import TOOLS
+
+
+class ToolExecutor:
+    """Runs tool handlers without blocking the event loop.
+
+    Synchronous handlers (pymongo, the OpenAI embeddings client)
+    run on a bounded thread pool; coroutine handlers are awaited directly. Every
+    call is bounded by a timeout so a slow backend only delays its own caller.
+    """
+
+    def __init__(
+        self, max_workers: int = TOOLS.max_workers, timeout: float = TOOLS.timeout, thread_name_prefix: str = "tool"
+    ) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.in_flight = 0  # blocking calls submitted and not returned yet, queued ones included
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+    def available(self) -> int:
+        """Threads not taken by a running or queued call."""
+        return max(0, self.max_workers - self.in_flight)
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` off the loop.
+
+        Raises:
+            asyncio.TimeoutError: If the handler does not finish within `timeout` seconds.
+        """
+        if inspect.iscoroutinefunction(func):
+            awaitable = func(*args, **kwargs)
+        else:
+            awaitable = self.submit(func, *args, **kwargs)
+        return await asyncio.wait_for(awaitable, timeout or self.timeout)
+
+    def submit(self, func: Callable, *args, **kwargs) -> asyncio.Future:
+        """Queue blocking `func(*args, **kwargs)` on the pool right away, without a timeout.
+
+        The call counts in `in_flight` until it returns on its thread, even if the
+        returned future was cancelled or timed out before that.
+        """
+        loop = asyncio.get_running_loop()
+
+        def call():
+            try:
+                return func(*args, **kwargs)
+            finally:
+                try:
+                    loop.call_soon_threadsafe(self._returned)
+                except RuntimeError:
+                    pass  # the loop is closed: shutting down
+
+        future = loop.run_in_executor(self._pool, call)
+        self.in_flight += 1
+        return future
+
+    def _returned(self) -> None:
+        self.in_flight -= 1
+
+    def scope(self) -> "ToolCallScope":
+        """Create a task scope bound to a single phone call."""
+        return ToolCallScope()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ToolCallScope:
+    """Tracks the tool tasks started for one call so they can be cancelled on hang-up.
+
+    A handler already running on a worker thread cannot be interrupted, but its
+    result is dropped and the waiting task is released immediately.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def cancel(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
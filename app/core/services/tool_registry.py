@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core.services.tool_executor import ToolExecutor
+from app.utils.payloads import payloads
+from config.services import TOOLS
+
+
+class Tool:
+    """One function the model can call, with its own limits.
+
+    `handler(arguments, context)` gets the parsed JSON arguments and the calling
+    relay's context (workspace, prefetch cache); it may be a coroutine function or
+    a blocking one, which runs on the executor's thread pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        parameters: dict,
+        handler: Callable,
+        concurrency: int = TOOLS.concurrency,
+        timeout: float = TOOLS.timeout,
+        max_result_chars: int = TOOLS.max_result_chars,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_result_chars = max_result_chars
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"calls": 0, "in_flight": 0, "errors": 0, "timeouts": 0, "truncated": 0}
+
+    def schema(self) -> dict:
+        return {
+            "type": "function",
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters,
+        }
+
+
+class ToolRegistry:
+    """Maps tool names to handlers; the session `tools` list is generated from it.
+
+    Calls share one `ToolExecutor`. Each tool caps its calls in flight across all
+    phone calls in the worker, and the wait for a slot counts against its timeout.
+    Handler results are rendered to text (JSON for structured results) and cut at
+    `max_result_chars` so a large result cannot blow up the conversation.
+    The schema's required arguments are checked before the handler runs.
+    Failures become an output the model can apologize for rather than a turn that
+    never completes.
+    """
+
+    def __init__(self, executor: ToolExecutor, limits: Optional[Dict[str, dict]] = None) -> None:
+        self.executor = executor
+        self.limits = TOOLS.limits if limits is None else limits
+        self.tools: Dict[str, Tool] = {}
+        self._schema: Optional[List[dict]] = None
+
+    def register(self, name: str, description: str, parameters: dict, handler: Callable, **limits) -> Tool:
+        """Add or replace a tool; `TOOLS.limits[name]` overrides the keyword limits."""
+        limits.update(self.limits.get(name, {}))
+        tool = Tool(name, description, parameters, handler, **limits)
+        self.tools[name] = tool
+        self._schema = None
+        # Sessions configured from here on announce the new tool list.
+        payloads.invalidate("session.update")
+        return tool
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def schema(self) -> List[dict]:
+        """The session.update `tools` list, built once per registry change."""
+        if self._schema is None:
+            self._schema = [tool.schema() for tool in self.tools.values()]
+        return self._schema
+
+    async def call(self, name: str, arguments, context: Optional[dict] = None) -> str:
+        """Run a tool and return the `function_call_output` text; never raises for tool errors."""
+        tool = self.tools.get(name)
+        if tool is None:
+            return f"The tool {name} is not available."
+        tool.stats["calls"] += 1
+        deadline = time.monotonic() + tool.timeout
+        try:
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments or "{}")
+            arguments = arguments or {}
+            missing = [key for key in tool.parameters.get("required", ()) if key not in arguments]
+            if missing:
+                tool.stats["errors"] += 1
+                return f"The {name} tool is missing the required argument {', '.join(repr(key) for key in missing)}."
+            await asyncio.wait_for(tool.semaphore.acquire(), tool.timeout)
+            tool.stats["in_flight"] += 1
+            try:
+                result = await self.executor.run(
+                    tool.handler, arguments, context or {}, timeout=max(deadline - time.monotonic(), 0.001)
+                )
+            finally:
+                tool.stats["in_flight"] -= 1
+                tool.semaphore.release()
+        except asyncio.TimeoutError:
+            tool.stats["timeouts"] += 1
+            return f"The {name} tool did not respond in time. Apologize and offer to follow up."
+        except Exception as e:
+            tool.stats["errors"] += 1
+            return f"The {name} tool failed: {e}"
+        return self._render(tool, result)
+
+    @staticmethod
+    def _render(tool: Tool, result) -> str:
+        text = result if isinstance(result, str) else json.dumps(result, default=str, ensure_ascii=False)
+        if len(text) > tool.max_result_chars:
+            tool.stats["truncated"] += 1
+            text = text[:tool.max_result_chars] + " ... (truncated)"
+        return text
+
+    @property
+    def stats(self) -> Dict[str, dict]:
+        return {name: dict(tool.stats, concurrency=tool.concurrency) for name, tool in self.tools.items()}
@@ -1,17 +1,51 @@
-from fastapi.responses import Response
+from urllib.parse import urlencode
+
 from twilio.twiml.voice_response import VoiceResponse, Start, Stream, Say, Connect
 from twilio.rest import Client
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.request_validator import RequestValidator
 
-from config.services import TWILIO
+from app.utils.payloads import payloads
+from config.services import ADMISSION, TWILIO
 from config.settings import settings
 
+TOKEN_PLACEHOLDER = "__SESSION_TOKEN__"
+
 class TwilioService:
     def __init__(self):
         self.twilio_account_sid = settings.TWILIO_ACCOUNT_SID
         self.twilio_auth_token = settings.TWILIO_AUTH_TOKEN
         self.client = Client(self.twilio_account_sid, self.twilio_auth_token)
+        self._async_client = None
+        self.validator = RequestValidator(self.twilio_auth_token)
+
+    @property
+    def async_client(self) -> Client:
+        # Built on first use: the aiohttp session must be created inside the event loop.
+        if self._async_client is None:
+            self._async_client = Client(
+                self.twilio_account_sid,
+                self.twilio_auth_token,
+                http_client=AsyncTwilioHttpClient(),
+            )
+        return self._async_client
+
+    def build_twiml_response(self, host: str, session_token: str | None = None, workspace_id: str | None = None) -> bytes:
+        """Return the `/incoming-call` TwiML as UTF-8 bytes.
 
-    def build_twiml_response(self, host: str) -> Response:
+        The document is built once per host and workspace; only the session token
+        differs per call.
+        """
+        prefix, suffix = payloads.get(
+            ("twiml", host, workspace_id, bool(session_token)),
+            lambda: self._twiml_template(host, bool(session_token), workspace_id)
+        )
+        if not session_token:
+            return prefix
+        # Tokens come from secrets.token_urlsafe, so they need no XML escaping.
+        return prefix + session_token.encode("ascii") + suffix
+
+    def _twiml_template(self, host: str, with_session: bool, workspace_id: str | None = None) -> tuple[bytes, bytes]:
         response = VoiceResponse()
         
         response.say(TWILIO.welcome_message)
@@ -19,19 +53,73 @@ class TwilioService:
         response.say(TWILIO.ready_message)
         
         connect = Connect()
-        connect.stream(url=f'wss://{host}/media-stream')
+        stream = connect.stream(url=f'wss://{host}/media-stream')
+        if with_session:
+            # Handed back in the `start` event so /media-stream can claim the pre-warmed session.
+            stream.parameter(name='session', value=TOKEN_PLACEHOLDER)
+        if workspace_id:
+            # Scopes the call's knowledge-base lookups to one tenant.
+            stream.parameter(name='workspace', value=workspace_id)
         response.append(connect)
 
-        return str(response)
+        prefix, _, suffix = str(response).encode("utf-8").partition(TOKEN_PLACEHOLDER.encode("ascii"))
+        return prefix, suffix
     
-    # def outgoing_call(self, number: str, calendar_user: str) -> None:
-    def outgoing_call(self, number: str) -> None:
-        try:
-            self.client.calls.create(
-                url=TWILIO.incomming_call_url,
-                to=number,
-                from_=settings.TWILIO_PHONE_NUMBER
-            )
-        except Exception as e:
-            print(f"Error making outgoing call: {e}")
-            raise e
+    def build_overload_twiml(self, workspace_id: str | None = None, redirect: bool = True) -> bytes:
+        """Return the TwiML for a call this node cannot take, as UTF-8 bytes.
+
+        With `ADMISSION.overflow_url` set the call is redirected to that node
+        (once: the redirected request carries `overflow=1` and is not redirected
+        again); otherwise the caller hears `TWILIO.busy_message` and the call ends.
+        """
+        redirect = redirect and bool(ADMISSION.overflow_url)
+        return payloads.get(
+            ("twiml", "overload", workspace_id, redirect),
+            lambda: self._overload_template(workspace_id, redirect)
+        )
+
+    def _overload_template(self, workspace_id: str | None, redirect: bool) -> bytes:
+        response = VoiceResponse()
+        if redirect:
+            query = {"overflow": 1, **({"workspace": workspace_id} if workspace_id else {})}
+            separator = "&" if "?" in ADMISSION.overflow_url else "?"
+            response.redirect(f"{ADMISSION.overflow_url}{separator}{urlencode(query)}")
+        else:
+            response.say(TWILIO.busy_message)
+            response.hangup()
+        return str(response).encode("utf-8")
+
+    async def place_call(self, number: str, status_callback: str | None = None) -> str:
+        """Start an outbound call without blocking the event loop.
+
+        Twilio posts the call's final status to `status_callback` when given.
+
+        Returns:
+            str: The call SID.
+        """
+        options = {}
+        if status_callback:
+            options = {"status_callback": status_callback, "status_callback_method": "POST"}
+        call = await self.async_client.calls.create_async(
+            url=TWILIO.incomming_call_url,
+            to=number,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            **options
+        )
+        return call.sid
+
+    async def find_calls(self, number: str, since: float) -> list[str]:
+        """Return the SIDs of calls from our number to `number` created at or after `since` (epoch seconds).
+
+        Used after a `place_call` request timed out, to learn whether Twilio placed the call anyway.
+        """
+        calls = await self.async_client.calls.list_async(to=number, from_=settings.TWILIO_PHONE_NUMBER, limit=20)
+        return [call.sid for call in calls if call.date_created and call.date_created.timestamp() >= since]
+
+    def is_valid_request(self, url: str, params: dict, signature: str) -> bool:
+        """Check the `X-Twilio-Signature` of a webhook request."""
+        return self.validator.validate(url, params, signature)
+
+    async def close(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.http_client.close()
@@ -1,199 +1,468 @@
 import json
-import base64
+import time
 import asyncio
-import websockets
+import logging
+from urllib.parse import parse_qs
 
-from fastapi import APIRouter, WebSocket, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, WebSocket, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.websockets import WebSocketDisconnect
 
-from app.core.services.openai import OpenaiService as Openai
+from app.core.services.openai import OpenaiService as Openai, RESPONSE_CREATE
 #initialize_session, send_initial_conversation_item, openai_websocket
 from app.core.services.twilio import TwilioService as Twilio
 from app.core.services.mongo_db import MongoDBProvider as MongoDB
-from app.core.services.google_calendar import GoogleCalendarService as GoogleCalendar
+from app.core.services.memory_vector_db import InMemoryVectorProvider as InMemoryVectorDB
+from app.core.services.google_calendar_async import AsyncGoogleCalendarService
+from app.core.services.tool_executor import ToolExecutor
+from app.core.services.tool_registry import ToolRegistry
+from app.core.services.call_tools import register_rag_tools, register_calendar_tools
+from app.core.services.realtime_pool import RealtimeSessionPool
+from app.core.services.embedding_cache import CachedEmbedder, SQLiteEmbeddingCache
+from app.core.services.ingestion import DocumentIngestor, iter_json_records
+from app.core.services.hybrid_retriever import HybridRetriever
+from app.core.services.rag_prefetch import RagPrefetcher
+from app.core.services.shared_state import create_state_provider
+from app.core.services.call_registry import CallRegistry
+from app.core.services.admission import AdmissionController
+from app.core.services.campaign import CampaignDialer, CampaignStore
 from config.events import LOG_EVENT_TYPES
 from config.settings import SHOW_TIMING_MATH, settings
 from config.requests import (
     OutgoingCallRequest,
+    CampaignCreateRequest,
     DocumentsAddRequest,
     CalendarAccountAddRequest,
+    Collections,
 )
-from app.utils.functions import is_function_call
-from config.services import OPENAI
+from app.utils.functions import function_calls
+from app.utils import frames
+from app.utils.audio import InboundAudioBatcher, PlaybackTracker
+from app.utils.queues import AUDIO, FLUSH, FRAME, CoalescingAudioQueue, DropOldestQueue
+from app.utils.startup import startup
+from app.utils.metrics import REGISTRY
+from app.core.services import call_metrics as metrics
+from config.services import OPENAI, RAG_PREFETCH, REALTIME_POOL, RELAY
+
+logger = logging.getLogger(__name__)
+
+# Construction here must stay cheap: network and per-tenant work is deferred to
+# first use or to the warm-up run by the lifespan hook in main.py.
+with startup.measure("twilio"):
+    twilio = Twilio()
+tools = ToolExecutor()
+# Prefetch searches get their own threads so they never hold up rag_search or calendar calls.
+prefetch_executor = ToolExecutor(max_workers=RAG_PREFETCH.max_workers, thread_name_prefix="prefetch")
+tool_registry = ToolRegistry(tools)
+with startup.measure("openai"):
+    openai = Openai(tools=tool_registry)
+with startup.measure("shared state"):
+    state = create_state_provider()
+    calls = CallRegistry(state)
+admission = AdmissionController()
+# Relay queues of the calls in this worker, by stream SID, for GET /calls.
+relay_queues = {}
+with startup.measure("calendar accounts"):
+    calendar = AsyncGoogleCalendarService(state=state)
+incoming_call_url = f"{settings.APP_URL}/incoming-call"
+campaign_status_url = f"{settings.APP_URL}/campaigns/call-status"
+# One worker at a time dials; campaigns and status callbacks go through the shared state.
+dialer = CampaignDialer(
+    lambda number: twilio.place_call(number, status_callback=campaign_status_url),
+    find_calls=twilio.find_calls,
+    store=CampaignStore(state),
+)
+realtime_pool = RealtimeSessionPool(
+    connect=openai.websocket,
+    prepare=lambda ws: openai.update_session(ws, wait=True),
+    activate=openai.send_initial_conversation_item,
+)
+# A session reserved by /incoming-call can only be claimed by the same worker's /media-stream,
+# which the load balancer does not guarantee once several workers share the state in Redis.
+preactivate_sessions = (
+    REALTIME_POOL.preactivate if REALTIME_POOL.preactivate is not None else settings.STATE_BACKEND == "memory"
+)
+with startup.measure("embedding cache"):
+    embedder = CachedEmbedder(
+        openai.embed,
+        OPENAI.embedding_model,
+        embed_many=openai.embed_many,
+        disk=SQLiteEmbeddingCache(settings.EMBEDDING_CACHE_PATH) if settings.EMBEDDING_CACHE_PATH else None,
+    )
+
+collections = {
+    'products': settings.MONGO_COLLECTION_NAME_PRODUCTS,
+    'services': settings.MONGO_COLLECTION_NAME_SERVICES
+}
+mongo = MongoDB({
+    "uri": settings.MONGO_URI,
+    "database": settings.MONGO_DATABASE_NAME,
+    "collection": collections
+}, embedder, lazy=True)
 
-twilio = Twilio()
-openai = Openai()
-calendar = GoogleCalendar()
+if settings.VECTOR_BACKEND == "memory":
+    database = InMemoryVectorDB({
+        "collection": collections,
+        "path": settings.VECTOR_INDEX_PATH,
+        "seed_dir": "data",
+        "source": mongo if settings.VECTOR_INDEX_SOURCE == "mongo" else None
+    }, embedder, lazy=True)
+else:
+    database = mongo
 
+if settings.RETRIEVAL_MODE == "hybrid":
+    database = HybridRetriever(database, collections, lazy=True)
 
-database = MongoDB({
-    "uri": settings.MONGO_URI,
-    "database": settings.MONGO_DATABASE_NAME,
-    "collection": {
-        'products': settings.MONGO_COLLECTION_NAME_PRODUCTS,
-        'services': settings.MONGO_COLLECTION_NAME_SERVICES
-    }
-}, openai.embed)
+ingestor = DocumentIngestor(database)
+
+register_rag_tools(tool_registry, database)
+register_calendar_tools(tool_registry, calendar)
 
 router = APIRouter()
 
+async def warm_up():
+    """Prepare I/O-bound dependencies concurrently; called from the lifespan hook."""
+    async def warm_calendar():
+        failed = await calendar.warm_up()
+        if failed:
+            raise RuntimeError(f"{len(failed)} account(s) failed: {', '.join(sorted(failed))}")
+
+    steps = {
+        "shared state": asyncio.to_thread(state.ping),
+        "realtime pool": realtime_pool.start(),
+        "calendar clients": warm_calendar(),
+        "mongo": asyncio.to_thread(mongo.ping),
+    }
+    if database is not mongo:
+        steps["retrieval index"] = asyncio.to_thread(database.ensure_connected)
+    await startup.warm_up(steps)
+    startup.print_report()
+
 @router.get("/", response_class=JSONResponse)
 async def index_page():
     return {"message": "Twilio Media Stream Server is running!"}
 
+@router.get("/startup", response_class=JSONResponse)
+async def startup_report():
+    return startup.as_dict()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=REGISTRY.content_type)
+
+@router.get("/calls", response_class=JSONResponse)
+async def active_calls():
+    """Calls being relayed by any worker sharing this state backend."""
+    active = await asyncio.to_thread(calls.active)
+    started = await asyncio.to_thread(calls.rate, "calls")
+    return {
+        "active": len(active),
+        "max_active": calls.max_active,
+        "started_last_window": started,
+        "window_seconds": calls.rate_window,
+        "admission": admission.snapshot(),
+        "calls": active,
+        # Queue depths of the calls relayed by this worker: inbound frames, outbound audio.
+        "queues": {
+            sid: {"inbound_frames": len(inbound), "outbound_ms": int(outbound.buffered_ms)}
+            for sid, (inbound, outbound) in relay_queues.items()
+        },
+    }
+
 @router.api_route("/incoming-call", methods=["GET", "POST"])
 # async def handle_incoming_call(request: Request, google_user_id: str = None):
 async def handle_incoming_call(request: Request):
+    # Reject forged webhooks before they can hold a Realtime session. Twilio signs the full
+    # URL it requested, query string included, plus the POST form fields.
+    url = f"{incoming_call_url}?{request.url.query}" if request.url.query else incoming_call_url
+    params = {}
+    if request.method == "POST":
+        # Twilio signs empty fields (FromCity, CallerZip, ...) too, so they must be kept.
+        form = parse_qs((await request.body()).decode(), keep_blank_values=True)
+        params = {key: values[-1] for key, values in form.items()}
+    if not twilio.is_valid_request(url, params, request.headers.get("X-Twilio-Signature", "")):
+        return JSONResponse(status_code=403, content={"error": "Invalid signature."})
     host = request.url.hostname
-    twiml = twilio.build_twiml_response(host)
-    return HTMLResponse(content=twiml, media_type="application/xml")
+    # Numbers of different tenants point their webhook at /incoming-call?workspace=<id>.
+    workspace_id = request.query_params.get('workspace') or settings.DEFAULT_WORKSPACE_ID
+    active = await asyncio.to_thread(calls.active_count) if calls.max_active else None
+    rejected = admission.check(active, calls.max_active)
+    metrics.ADMISSIONS.labels(outcome=rejected or "admitted").inc()
+    if rejected:
+        logger.warning("Rejecting incoming call (%s): %s", rejected, admission.snapshot())
+        # A call another node redirected here is not bounced back.
+        redirect = not request.query_params.get('overflow')
+        twiml = twilio.build_overload_twiml(request.query_params.get('workspace'), redirect=redirect)
+        return Response(content=twiml, media_type="application/xml")
+    session_token = await realtime_pool.reserve() if preactivate_sessions else None
+    twiml = twilio.build_twiml_response(host, session_token, workspace_id)
+    return Response(content=twiml, media_type="application/xml")
 
 @router.websocket("/media-stream")
 async def handle_media_stream(websocket: WebSocket):
-    print("Client connected")
+    logger.info("Client connected")
     await websocket.accept()
-
-    async with websockets.connect(
-        f'wss://api.openai.com/v1/realtime?model={OPENAI.model}',
-        extra_headers={
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-            "OpenAI-Beta": "realtime=v1"
-        }
-    ) as openai_ws:
-        await openai.initialize_session(openai_ws)
-
-        stream_sid = None
-        latest_media_timestamp = 0
-        last_assistant_item = None
-        mark_queue = []
-        response_start_timestamp_twilio = None
+    connected_at = time.perf_counter()
+    metrics.CALLS.inc()
+    metrics.CALLS_ACTIVE.inc()
+    try:
+        # Twilio sends `connected` then `start`; the start event carries the token of
+        # the Realtime session reserved by /incoming-call.
+        try:
+            while True:
+                data = frames.loads(await websocket.receive_text())
+                if data['event'] == 'start':
+                    break
+        except WebSocketDisconnect:
+            logger.info("Client disconnected before the stream started.")
+            return
+        stream_sid = data['start']['streamSid']
+        if not await asyncio.to_thread(calls.register, stream_sid, call_sid=data['start'].get('callSid')):
+            logger.warning("Active call limit of %s reached; closing stream %s", calls.max_active, stream_sid)
+            await websocket.close(code=1013)
+            return
+        admission.stream_started()
+        try:
+            await relay_media_stream(websocket, connected_at, data['start'])
+        finally:
+            admission.stream_ended()
+            await asyncio.to_thread(calls.unregister, stream_sid)
+    finally:
+        metrics.CALLS_ACTIVE.dec()
+
+async def relay_media_stream(websocket: WebSocket, connected_at: float, start: dict):
+    stream_sid = start['streamSid']
+    session_token = start.get('customParameters', {}).get('session')
+    workspace_id = start.get('customParameters', {}).get('workspace') or settings.DEFAULT_WORKSPACE_ID
+    logger.info("Incoming stream has started %s", stream_sid)
+
+    async with realtime_pool.session(session_token) as openai_ws:
+        metrics.SESSION_READY.observe(time.perf_counter() - connected_at)
+        first_audio_pending = True
+        media_frame = frames.MediaFrameTemplate(stream_sid)
+        playback = PlaybackTracker()
+        pending_tools = tools.scope()
+        # Function calls dispatched per model response: response_id -> {call_id: task}.
+        tool_rounds = {}
+        # `response.function_call_arguments.done` carries no tool name, only ids: names come
+        # from `response.output_item.added` (item_id -> name), and argument events that arrive
+        # before their name wait for it (item_id -> event).
+        function_names = {}
+        awaiting_names = {}
+        prefetch = RagPrefetcher(database.search_documents, prefetch_executor, pending_tools.spawn, workspace_id)
+        tool_context = {"workspace_id": workspace_id, "prefetch": prefetch}
+        audio_batcher = InboundAudioBatcher(openai_ws.send)
+        # Each socket has its own reader and writer task joined by a bounded queue, so a
+        # stalled socket only fills its queue: the oldest caller audio is dropped on the way
+        # to OpenAI, and assistant audio waiting for Twilio is merged into larger frames.
+        inbound = DropOldestQueue(
+            RELAY.inbound_max_ms // 20, depth=metrics.QUEUE_IN_DEPTH, dropped=metrics.QUEUE_IN_DROPPED
+        )
+        outbound = CoalescingAudioQueue(depth=metrics.QUEUE_OUT_DEPTH, coalesced=metrics.QUEUE_OUT_COALESCED)
+        relay_queues[stream_sid] = (inbound, outbound)
 
         async def receive_from_twilio():
-            nonlocal stream_sid, latest_media_timestamp
+            nonlocal stream_sid, media_frame
             try:
                 async for message in websocket.iter_text():
-                    data = json.loads(message)
-                    if data['event'] == 'media' and openai_ws.open:
-                        latest_media_timestamp = int(data['media']['timestamp'])
-                        audio_append = {
-                            "type": "input_audio_buffer.append",
-                            "audio": data['media']['payload']
-                        }
-                        await openai_ws.send(json.dumps(audio_append))
+                    data = frames.loads(message)
+                    if data['event'] == 'media':
+                        metrics.FRAMES_IN.inc()
+                        inbound.put_nowait(data['media']['payload'])
                     elif data['event'] == 'start':
                         stream_sid = data['start']['streamSid']
-                        print(f"Incoming stream has started {stream_sid}")
-                        latest_media_timestamp = 0
-                    elif data['event'] == 'mark':
-                        if mark_queue:
-                            mark_queue.pop(0)
+                        media_frame = frames.MediaFrameTemplate(stream_sid)
+                        logger.info("Incoming stream has started %s", stream_sid)
+                    elif data['event'] in ('mark', 'stop'):
+                        # Don't hold back the tail of the caller's audio at a boundary.
+                        inbound.put_nowait(FLUSH)
+                        if data['event'] == 'mark':
+                            playback.on_mark(data['mark']['name'])
             except WebSocketDisconnect:
-                print("Client disconnected.")
+                pass
+            logger.info("Client disconnected.")
+            inbound.close()
+            # Nobody is left to hear queued assistant audio.
+            outbound.close()
+            outbound.clear()
+
+        async def send_to_openai():
+            try:
+                while (payload := await inbound.get()) is not None:
+                    if not openai_ws.open:
+                        continue
+                    if payload is FLUSH:
+                        await audio_batcher.flush()
+                    else:
+                        await audio_batcher.add(payload)
+                if openai_ws.open:
+                    await audio_batcher.flush()
+            except Exception as e:
+                logger.exception("Error in send_to_openai: %s", e)
+            finally:
+                logger.info("Inbound audio for %s: %s, queue %s", stream_sid, audio_batcher.stats, inbound.stats)
+                # iter_text() ends quietly on disconnect, so close OpenAI here to stop receive_from_openai.
                 if openai_ws.open:
                     await openai_ws.close()
 
-        async def send_to_twilio():
-            nonlocal stream_sid, last_assistant_item, response_start_timestamp_twilio
+        async def receive_from_openai():
             try:
                 async for openai_message in openai_ws:
-                    response = json.loads(openai_message)
+                    response = frames.loads(openai_message)
                     if response['type'] in LOG_EVENT_TYPES:
-                        print(f"Received event: {response['type']}", response)
+                        logger.info("Received event: %s %s", response['type'], response, extra={"event_type": response['type']})
 
                     if response.get('type') == 'response.audio.delta' and 'delta' in response:
-                        audio_payload = base64.b64encode(base64.b64decode(response['delta'])).decode('utf-8')
-                        audio_delta = {
-                            "event": "media",
-                            "streamSid": stream_sid,
-                            "media": {
-                                "payload": audio_payload
-                            }
-                        }
-                        await websocket.send_json(audio_delta)
-
-                        if response_start_timestamp_twilio is None:
-                            response_start_timestamp_twilio = latest_media_timestamp
-                            if SHOW_TIMING_MATH:
-                                print(f"Setting start timestamp for new response: {response_start_timestamp_twilio}ms")
-
-                        if response.get('item_id'):
-                            last_assistant_item = response['item_id']
-
-                        await send_mark(websocket, stream_sid)
-
-                    if response.get('type') == 'input_audio_buffer.speech_started':
-                        print("Speech started detected.")
-                        if last_assistant_item:
-                            print(f"Interrupting response with id: {last_assistant_item}")
+                        # The delta is already base64 μ-law; forward it as-is.
+                        await outbound.put_audio(response.get('item_id'), response['delta'])
+
+                    elif response.get('type') == 'response.audio.done':
+                        # Mark the tail so the tracker knows when playback has finished.
+                        outbound.put(FLUSH)
+
+                    if response.get('type') == 'conversation.item.input_audio_transcription.delta':
+                        if RAG_PREFETCH.enabled:
+                            prefetch.on_transcript_delta(response.get('item_id'), response.get('delta', ''))
+                    elif response.get('type') == 'conversation.item.input_audio_transcription.completed':
+                        if RAG_PREFETCH.enabled:
+                            prefetch.on_transcript_done(response.get('item_id'), response.get('transcript', ''))
+                    elif response.get('type') == 'rate_limits.updated':
+                        admission.on_rate_limits(response.get('rate_limits'))
+                    elif response.get('type') == 'input_audio_buffer.speech_started':
+                        logger.info("Speech started detected.")
+                        if playback.playing or outbound.buffered_ms:
                             await handle_speech_started_event()
-                    elif is_function_call(response):
-                        output = response.get('response').get('output')
-                        if output[0].get('name') == 'rag_search':
-                            arguments = output[0].get('arguments')
-                            
-                            if isinstance(arguments, str):
-                                arguments = json.loads(arguments)
-                            response = database.retrieve_similar(arguments['query'], arguments['resource'], k=arguments.get('top_k', 2))
-                            context = f"Context from Database:\n {response}"
-                            
-                            data = {
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "function_call_output",
-                                    "call_id": f"{output[0].get('call_id')}",
-                                    "output": context
-                                }
-                            }
-                            print('=' * 40)
-                            print(f"Sending context to OpenAI: {context}")
-                            print('=' * 40)
-                            
-                            await openai_ws.send(json.dumps(data))
-                            await openai_ws.send(json.dumps({"type": "response.create"}))
+                    elif response.get('type') == 'response.output_item.added':
+                        item = response.get('item') or {}
+                        if item.get('type') == 'function_call':
+                            function_names[item.get('id')] = item.get('name')
+                            arguments_done = awaiting_names.pop(item.get('id'), None)
+                            if arguments_done:
+                                dispatch_function_call(arguments_done.get('response_id'), {**arguments_done, 'name': item.get('name')})
+                    elif response.get('type') == 'response.function_call_arguments.done':
+                        # Start the tool now rather than when the whole response is done.
+                        name = function_names.get(response.get('item_id'))
+                        if name:
+                            dispatch_function_call(response.get('response_id'), {**response, 'name': name})
+                        else:
+                            awaiting_names[response.get('item_id')] = response
+                    elif response.get('type') == 'response.done':
+                        response_id = response['response'].get('id')
+                        for function_call in function_calls(response):
+                            function_names.pop(function_call.get('id'), None)
+                            awaiting_names.pop(function_call.get('id'), None)
+                            dispatch_function_call(response_id, function_call)
+                        calls_in_response = tool_rounds.pop(response_id, None)
+                        if calls_in_response:
+                            pending_tools.spawn(send_function_call_outputs(calls_in_response))
+            except Exception as e:
+                logger.exception("Error in receive_from_openai: %s", e)
+            finally:
+                outbound.close()
+
+        async def send_to_twilio():
+            nonlocal first_audio_pending
+            try:
+                while (entry := await outbound.get()) is not None:
+                    kind, item_id, payload = entry
+                    mark = None
+                    if kind == AUDIO:
+                        # Counted before the send, so an interruption meanwhile sees this audio.
+                        mark = playback.on_audio(item_id, payload)
+                        await websocket.send_text(media_frame.render(payload))
+                        metrics.FRAMES_OUT.inc()
+                        if first_audio_pending:
+                            metrics.FIRST_AUDIO.observe(time.perf_counter() - connected_at)
+                            first_audio_pending = False
+                    elif kind == FLUSH:
+                        mark = playback.flush()
+                    elif kind == FRAME:
+                        await websocket.send_text(payload)
+                    if mark:
+                        await websocket.send_text(media_frame.mark(mark))
             except Exception as e:
-                print(f"Error in send_to_twilio: {e}")
+                logger.exception("Error in send_to_twilio: %s", e)
+            finally:
+                # Stop receive_from_openai waiting for room in a queue nobody drains.
+                outbound.close()
+                logger.info("Outbound audio for %s: %s", stream_sid, outbound.stats)
+
+        def dispatch_function_call(response_id, function_call):
+            calls_in_response = tool_rounds.setdefault(response_id, {})
+            call_id = function_call.get('call_id')
+            if call_id not in calls_in_response:
+                calls_in_response[call_id] = pending_tools.spawn(run_function_call(function_call))
+
+        async def run_function_call(function_call):
+            started = time.perf_counter()
+            name = function_call.get('name')
+            output = await tool_registry.call(name, function_call.get('arguments'), tool_context)
+            item = {
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "function_call_output",
+                    "call_id": f"{function_call.get('call_id')}",
+                    "output": output
+                }
+            }
+            return name, started, item
+
+        async def send_function_call_outputs(calls_in_response):
+            """Send every output of one response, then a single response.create."""
+            results = await asyncio.gather(*calls_in_response.values())
+            if not openai_ws.open:
+                return
+            for name, _, item in results:
+                logger.info("Sending %s output to OpenAI: %s", name, item['item']['output'], extra={"event_type": "function_call_output"})
+                await openai_ws.send(frames.dumps(item))
+            await openai_ws.send(RESPONSE_CREATE)
+            sent = time.perf_counter()
+            for name, started, _ in results:
+                metrics.TOOL_CALL.labels(tool=name if name in tool_registry else 'unknown').observe(sent - started)
 
         async def handle_speech_started_event():
-            nonlocal response_start_timestamp_twilio, last_assistant_item
-            print("Handling speech started event.")
-            if mark_queue and response_start_timestamp_twilio is not None:
-                elapsed_time = latest_media_timestamp - response_start_timestamp_twilio
+            logger.debug("Handling speech started event.")
+            started = time.perf_counter()
+            # Audio still queued for Twilio was never heard; drop it with the rest of the response.
+            outbound.clear()
+            interrupted = playback.interrupt()
+            if interrupted:
+                item_id, audio_end_ms = interrupted
+                logger.info("Interrupting response with id: %s", item_id)
                 if SHOW_TIMING_MATH:
-                    print(f"Calculating elapsed time for truncation: {latest_media_timestamp} - {response_start_timestamp_twilio} = {elapsed_time}ms")
-
-                if last_assistant_item:
-                    if SHOW_TIMING_MATH:
-                        print(f"Truncating item with ID: {last_assistant_item}, Truncated at: {elapsed_time}ms")
+                    logger.debug("Truncating item with ID: %s, Truncated at: %sms", item_id, audio_end_ms)
 
-                    truncate_event = {
-                        "type": "conversation.item.truncate",
-                        "item_id": last_assistant_item,
-                        "content_index": 0,
-                        "audio_end_ms": elapsed_time
-                    }
-                    await openai_ws.send(json.dumps(truncate_event))
+                truncate_event = {
+                    "type": "conversation.item.truncate",
+                    "item_id": item_id,
+                    "content_index": 0,
+                    "audio_end_ms": audio_end_ms
+                }
+                await openai_ws.send(json.dumps(truncate_event))
 
-                await websocket.send_json({
+                outbound.put(FRAME, frames.dumps({
                     "event": "clear",
                     "streamSid": stream_sid
-                })
-
-                mark_queue.clear()
-                last_assistant_item = None
-                response_start_timestamp_twilio = None
-
-        async def send_mark(connection, stream_sid):
-            if stream_sid:
-                mark_event = {
-                    "event": "mark",
-                    "streamSid": stream_sid,
-                    "mark": {"name": "responsePart"}
-                }
-                await connection.send_json(mark_event)
-                mark_queue.append('responsePart')
-
-        await asyncio.gather(receive_from_twilio(), send_to_twilio())
+                }))
+                metrics.INTERRUPTION.observe(time.perf_counter() - started)
+
+        try:
+            await asyncio.gather(receive_from_twilio(), send_to_openai(), receive_from_openai(), send_to_twilio())
+        finally:
+            relay_queues.pop(start['streamSid'], None)
+            inbound.clear()
+            outbound.clear()
+            # The caller hung up; drop any lookups still in flight for this call.
+            await pending_tools.cancel()
+            logger.info("RAG prefetch for %s: %s", stream_sid, prefetch.stats)
+
+@router.get("/tools", response_class=JSONResponse)
+async def tool_stats():
+    return tool_registry.stats
+
+@router.get("/embeddings/cache", response_class=JSONResponse)
+async def embedding_cache_stats():
+    return embedder.stats
 
 @router.post("/documents/add")
 def add_document(request: DocumentsAddRequest):
@@ -203,20 +472,40 @@ def add_document(request: DocumentsAddRequest):
     try:
         data = {
             'id': request.id,
-            'workspace_id': request.id,
+            'workspace_id': request.workspace_id,
             'name': request.name,
             'description': request.description,
             'type': request.type,
             'price': request.price,
             'metadata': request.metadata or {}
         }
-        database.add_document(data, request.collection.value)
+        if not database.add_document(data, request.collection.value):
+            return JSONResponse(status_code=500, content={"error": "Document could not be added."})
         return JSONResponse(status_code=200, content={"message": "Document added successfully."})
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+@router.post("/documents/bulk")
+async def add_documents_bulk(request: Request, collection: Collections):
+    """
+    Endpoint to upsert many documents from a JSON array or NDJSON request body.
+    """
+    try:
+        report = await ingestor.ingest(
+            iter_json_records(request.stream()),
+            collection.value,
+            progress=lambda progress: logger.info("Bulk import into %s: %s", collection.value, progress)
+        )
+        return JSONResponse(status_code=200, content=report)
+
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
 @router.post("/outgoing-call")
 async def outgoing_call(request: OutgoingCallRequest):
     """
@@ -226,13 +515,55 @@ async def outgoing_call(request: OutgoingCallRequest):
         if not request.number:
             return JSONResponse(status_code=400, content={"error": "Phone number is required."})
 
-        twilio.outgoing_call(request.number)
+        await twilio.place_call(request.number)
         return JSONResponse(status_code=200, content={"message": "Call initiated successfully."})
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+@router.post("/campaigns")
+async def create_campaign(request: CampaignCreateRequest):
+    """
+    Queue outbound calls to a list of numbers, paced and retried by the dialer.
+    """
+    numbers = [number.strip() for number in request.numbers if number.strip()]
+    if not numbers:
+        return JSONResponse(status_code=400, content={"error": "At least one phone number is required."})
+    campaign = await dialer.create(numbers)
+    return JSONResponse(status_code=202, content=campaign.as_dict(details=False))
+
+
+@router.get("/campaigns/{campaign_id}")
+async def campaign_status(campaign_id: str):
+    campaign = await dialer.get(campaign_id)
+    if campaign is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown campaign."})
+    return JSONResponse(status_code=200, content=campaign.as_dict())
+
+
+@router.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    campaign = await dialer.cancel(campaign_id)
+    if campaign is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown campaign."})
+    return JSONResponse(status_code=200, content=campaign.as_dict(details=False))
+
+
+@router.post("/campaigns/call-status")
+async def campaign_call_status(request: Request):
+    """
+    Twilio status callback for campaign calls; frees the call's slot or schedules a retry.
+    """
+    # Empty fields are signed too; dropping them would fail validation and hold the slot until call_timeout.
+    form = parse_qs((await request.body()).decode(), keep_blank_values=True)
+    params = {key: values[-1] for key, values in form.items()}
+    if not twilio.is_valid_request(campaign_status_url, params, request.headers.get("X-Twilio-Signature", "")):
+        return JSONResponse(status_code=403, content={"error": "Invalid signature."})
+    await dialer.report_status(params.get("CallSid", ""), params.get("CallStatus", ""))
+    return Response(status_code=204)
+
+
 @router.post("/calendar/accounts")
 def add_calendar_account(request: CalendarAccountAddRequest):
     try:
@@ -240,7 +571,8 @@ def add_calendar_account(request: CalendarAccountAddRequest):
             account_id=request.account_id,
             credentials_info=request.credentials_info,
             calendar_id=request.calendar_id or "primary",
-            persist=True
+            persist=True,
+            workspace_id=request.workspace_id,
         )
         return JSONResponse(status_code=200, content={"message": "Account added"})
     except Exception as e:
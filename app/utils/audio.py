@@ -0,0 +1,171 @@
+import base64
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+from app.utils import frames
+from config.services import AUDIO
+
+# Twilio and OpenAI exchange 8 kHz, 8-bit G.711 μ-law: one byte per sample.
+MULAW_BYTES_PER_MS = 8
+
+
+def decoded_length(payload: str) -> int:
+    """Byte length of a base64 payload without decoding it."""
+    padding = 2 if payload.endswith("==") else 1 if payload.endswith("=") else 0
+    return len(payload) * 3 // 4 - padding
+
+
+class InboundAudioBatcher:
+    """Coalesces Twilio's 20 ms media frames into fewer `input_audio_buffer.append` messages.
+
+    Frames are buffered until `window_ms` of audio is collected and then sent as
+    one append. The window is adaptive between `min_window_ms` and `max_window_ms`:
+    it widens while sends to OpenAI are slow (socket backpressure) and narrows
+    back once they are fast again. A window of 20 ms or less disables batching.
+
+    Args:
+        send: Coroutine sending a text frame to the OpenAI socket.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable],
+        window_ms: int = AUDIO.batch_window_ms,
+        max_window_ms: int = AUDIO.batch_max_window_ms,
+        slow_send_ms: float = AUDIO.slow_send_ms,
+    ) -> None:
+        self._send = send
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self.window_ms = window_ms
+        self.min_window_ms = window_ms
+        self.max_window_ms = max(window_ms, max_window_ms)
+        self.slow_send_ms = slow_send_ms
+        self.stats = {"frames": 0, "appends": 0, "coalesced": 0}
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._buffered / MULAW_BYTES_PER_MS
+
+    async def add(self, payload: str) -> None:
+        """Queue one base64 μ-law frame, sending when the window is full."""
+        self.stats["frames"] += 1
+        if self.min_window_ms <= 20:
+            self.stats["appends"] += 1
+            await self._send(frames.audio_append_frame(payload))
+            return
+        chunk = base64.b64decode(payload)
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        if self.buffered_ms >= self.window_ms:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send whatever is buffered, e.g. on Twilio `mark`/`stop` events or hang-up."""
+        if not self._chunks:
+            return
+        chunks, self._chunks, self._buffered = self._chunks, [], 0
+        self.stats["appends"] += 1
+        self.stats["coalesced"] += len(chunks) - 1
+        payload = base64.b64encode(b"".join(chunks)).decode("ascii")
+
+        started = time.perf_counter()
+        await self._send(frames.audio_append_frame(payload))
+        self._adapt((time.perf_counter() - started) * 1000)
+
+    def _adapt(self, send_ms: float) -> None:
+        if send_ms > self.slow_send_ms:
+            self.window_ms = min(self.window_ms * 2, self.max_window_ms)
+        elif send_ms < self.slow_send_ms / 4 and self.window_ms > self.min_window_ms:
+            self.window_ms = max(self.window_ms - 20, self.min_window_ms)
+
+
+class PlaybackTracker:
+    """Tracks how much outbound audio the caller has actually heard.
+
+    Every audio delta forwarded to Twilio is counted in μ-law bytes. A mark is
+    requested once `mark_interval_ms` of audio has accumulated since the last
+    one (and at the end of each response via `flush`), rather than after every
+    delta. Twilio echoes a mark when playback reaches it, which pins the played
+    position to an exact byte offset; between echoes the position advances with
+    wall-clock time, capped at what was sent. `interrupt` turns that position
+    into the `audio_end_ms` of the item being played.
+    """
+
+    def __init__(self, mark_interval_ms: int = AUDIO.mark_interval_ms) -> None:
+        self.mark_interval_bytes = max(1, mark_interval_ms) * MULAW_BYTES_PER_MS
+        self._marks: Deque[Tuple[int, int]] = deque()  # (mark number, stream byte offset)
+        self._items: Deque[Tuple[str, int]] = deque()  # (item id, stream byte offset of its first byte)
+        self._sent = 0
+        self._unmarked = 0
+        self._played = 0
+        self._played_at = time.monotonic()
+        self._seq = 0
+
+    @property
+    def playing(self) -> bool:
+        """Whether audio has been sent that Twilio has not confirmed as played."""
+        return bool(self._marks) or self._unmarked > 0
+
+    def on_audio(self, item_id: str, payload: str) -> Optional[str]:
+        """Count one base64 μ-law delta; return a mark name to send after it, if due."""
+        if not self.playing:
+            # Twilio's buffer was empty, so this delta starts playing now.
+            self._played, self._played_at = self._sent, time.monotonic()
+            self._items.clear()
+        if not self._items or self._items[-1][0] != item_id:
+            self._items.append((item_id, self._sent))
+        size = decoded_length(payload)
+        self._sent += size
+        self._unmarked += size
+        if self._unmarked >= self.mark_interval_bytes:
+            return self._next_mark()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """Return a mark name covering any audio sent since the last mark."""
+        return self._next_mark() if self._unmarked else None
+
+    def on_mark(self, name: str) -> None:
+        """Advance the played position to the mark Twilio echoed back."""
+        try:
+            seq = int(name)
+        except (TypeError, ValueError):
+            return
+        # Marks are echoed in order; names from before a `clear` are already gone.
+        while self._marks and self._marks[0][0] <= seq:
+            _, self._played = self._marks.popleft()
+            self._played_at = time.monotonic()
+        while len(self._items) > 1 and self._items[1][1] <= self._played:
+            self._items.popleft()
+
+    def played_bytes(self) -> int:
+        """Stream byte offset the caller has heard up to."""
+        elapsed = int((time.monotonic() - self._played_at) * 1000) * MULAW_BYTES_PER_MS
+        return min(self._sent, self._played + elapsed)
+
+    def interrupt(self) -> Optional[Tuple[str, int]]:
+        """Forget unplayed audio and return `(item_id, audio_end_ms)` for the item cut off.
+
+        Returns None when nothing is playing. Call it together with Twilio `clear`.
+        """
+        if not self.playing or not self._items:
+            return None
+        played = self.played_bytes()
+        item_id, start = self._items[0]
+        for candidate, offset in reversed(self._items):
+            if offset <= played:
+                item_id, start = candidate, offset
+                break
+        self._marks.clear()
+        self._items.clear()
+        self._unmarked = 0
+        self._played = self._sent
+        return item_id, (played - start) // MULAW_BYTES_PER_MS
+
+    def _next_mark(self) -> str:
+        self._seq += 1
+        self._marks.append((self._seq, self._sent))
+        self._unmarked = 0
+        return str(self._seq)
@@ -0,0 +1,39 @@
+"""Fast encoders for the frames relayed between Twilio and OpenAI Realtime.
+
+Audio payloads are already base64 on both sockets, and the base64 alphabet needs
+no JSON escaping, so audio frames are built by splicing the payload string into
+a pre-serialized template instead of decoding, re-encoding and dumping a dict.
+"""
+import orjson
+
+
+def loads(message):
+    """Parse a JSON frame (str or bytes)."""
+    return orjson.loads(message)
+
+
+def dumps(payload: dict) -> str:
+    """Serialize a JSON frame to text, ready for a websocket text message."""
+    return orjson.dumps(payload).decode("utf-8")
+
+
+def audio_append_frame(payload: str) -> str:
+    """OpenAI `input_audio_buffer.append` frame for a base64 μ-law payload."""
+    return '{"type":"input_audio_buffer.append","audio":"' + payload + '"}'
+
+
+class MediaFrameTemplate:
+    """Twilio `media` frame with the stream SID serialized once per call."""
+
+    def __init__(self, stream_sid: str | None) -> None:
+        self.stream_sid = stream_sid
+        self._prefix = '{"event":"media","streamSid":' + dumps(stream_sid) + ',"media":{"payload":"'
+        self._mark_prefix = '{"event":"mark","streamSid":' + dumps(stream_sid) + ',"mark":{"name":'
+
+    def render(self, payload: str) -> str:
+        """Return the frame for a base64 payload, forwarded untouched."""
+        return self._prefix + payload + '"}}'
+
+    def mark(self, name: str) -> str:
+        """Return a `mark` frame; Twilio echoes it back once playback reaches it."""
+        return self._mark_prefix + dumps(name) + '}}'
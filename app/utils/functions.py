@@ -6,16 +6,71 @@ def is_function_call(response: dict) -> bool:
         request (dict): The request dictionary to check.
 
     Returns:
-        bool: True if the request is a function call, False otherwise.
+        bool: True if the response contains at least one function call, False otherwise.
+    """
+    return bool(function_calls(response))
+
+def function_calls(response: dict) -> list:
+    """
+    Collect every function call of a `response.done` event; the model may call several tools at once.
+
+    Args:
+        response (dict): The OpenAI Realtime server event.
+
+    Returns:
+        list[dict]: The `function_call` output items, in output order.
     """
     if response.get('type') != 'response.done' or not response.get('response'):
-        return False
+        return []
+
+    output = response['response'].get('output')
+    if not output or not isinstance(output, list):
+        return []
+
+    return [item for item in output if item.get('type') == 'function_call']
+
+def document_text(document: dict, collection: str) -> str:
+    """
+    Build the text that is embedded for a catalog document.
+
+    Args:
+        document (dict): The product or service document.
+        collection (str): 'products' or 'services'. Services have no type.
+
+    Returns:
+        str: The text to embed.
+    """
+    text = f'Name: {document.get("name")} \n Description: {document.get("description")} \n Price: {document.get("price")}'
+    if collection != 'services':
+        text += f'\n Type: {document.get("type")}'
+    return text
+
+
+def document_key(document: dict) -> tuple:
+    """
+    Identify a catalog document across stores.
 
-    response = response.get('response')
-    if not response.get('output') or not isinstance(response['output'], list):
-        return False
-    
-    output = response.get('output')
+    Args:
+        document (dict): The product or service document.
+
+    Returns:
+        tuple: `(workspace_id, id)`, or `(workspace_id, name)` for documents without an id.
+    """
+    local = document.get("id") if document.get("id") is not None else document.get("name")
+    return document.get("workspace_id"), local
 
-    if output[0].get('type') == 'function_call':
-        return True
\ No newline at end of file
+
+def format_documents(documents) -> str:
+    """
+    Render retrieved documents as the context string sent back to the model.
+
+    Args:
+        documents (Iterable[dict]): Documents with name, description and price.
+
+    Returns:
+        str: One line per document.
+    """
+    lines = ""
+    for document in documents:
+        lines += f"Name: {document.get('name')}, Description: {document.get('description')}, Price: {document.get('price')}\n"
+    return lines.strip()
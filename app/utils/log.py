@@ -0,0 +1,123 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.utils.metrics import REGISTRY
+from config.services import LOGGING
+from config.settings import settings
+
+DROPPED = REGISTRY.counter("log_records_dropped", "Log records dropped because the writer queue was full.")
+
+
+class EventSampler(logging.Filter):
+    """Keep one record in every N per event type (`extra={"event_type": ...}`).
+
+    Records without an event type, and warnings or worse, always pass. Runs in
+    the caller's thread, so it only bumps a counter.
+    """
+
+    def __init__(self, sample_every: Dict[str, int]) -> None:
+        super().__init__()
+        self.sample_every = sample_every
+        self._seen: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event_type = getattr(record, "event_type", None)
+        every = self.sample_every.get(event_type, 1) if event_type else 1
+        if every <= 1 or record.levelno >= logging.WARNING:
+            return True
+        seen = self._seen.get(event_type, 0)
+        self._seen[event_type] = seen + 1
+        return seen % every == 0
+
+
+class JSONLineFormatter(logging.Formatter):
+    """One JSON object per line; the message is truncated to `max_chars`."""
+
+    def __init__(self, max_chars: int = LOGGING.max_message_chars) -> None:
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} chars truncated]"
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": message,
+        }
+        event_type = getattr(record, "event_type", None)
+        if event_type:
+            entry["event"] = event_type
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks and never formats in the caller's thread.
+
+    The stock handler formats each record before enqueueing it. This one enqueues
+    the record with its arguments untouched, so `%`-formatting, JSON encoding and
+    truncation all happen on the writer thread. Arguments must not be mutated
+    after they are logged. When the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging(log_file: str = settings.LOG_FILE) -> None:
+    """Route the root logger through a bounded queue to a background writer.
+
+    The writer thread appends JSON lines to `log_file` and, when `LOGGING.console`
+    is set, mirrors plain lines to stderr. Safe to call more than once.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JSONLineFormatter())
+        handlers = [file_handler]
+        if LOGGING.console:
+            console = logging.StreamHandler(sys.stderr)
+            console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message).500s"))
+            handlers.append(console)
+
+        queue_handler = DroppingQueueHandler(queue.Queue(LOGGING.queue_size))
+        queue_handler.addFilter(EventSampler(LOGGING.sample_every))
+        root = logging.getLogger()
+        root.setLevel(LOGGING.level)
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
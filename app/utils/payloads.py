@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class PayloadCache:
+    """Serialized payloads built once per key and then served as-is.
+
+    Keys are tuples like `("twiml", host)` or `("session.update", tenant)`. The
+    cache is bounded, least recently used entries dropped first, because some keys
+    (the webhook host) come from request headers: a burst of unknown hosts then
+    evicts each other instead of the payloads every call uses. Call `invalidate`
+    after changing the configuration a payload is built from; the next request
+    rebuilds it.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0, "invalidations": 0}
+
+    def get(self, key: Hashable, build: Callable[[], T]) -> T:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return payload
+        payload = build()
+        with self._lock:
+            self.stats["builds"] += 1
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def invalidate(self, prefix: Hashable = None) -> None:
+        """Drop every payload, or only those whose key tuple starts with `prefix`."""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == prefix]:
+                del self._entries[key]
+
+
+payloads = PayloadCache()
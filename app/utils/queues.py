@@ -0,0 +1,179 @@
+import asyncio
+import base64
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from app.utils.audio import MULAW_BYTES_PER_MS, decoded_length
+from config.services import RELAY
+
+# Entry kinds of the Twilio-bound queue; FLUSH also marks a boundary in the OpenAI-bound one.
+AUDIO = "audio"
+FRAME = "frame"
+FLUSH = "flush"
+
+
+class DropOldestQueue:
+    """Bounded FIFO whose producer never waits: when full, the oldest item is dropped.
+
+    Carries the caller's audio to OpenAI. While the OpenAI socket is stalled the
+    backlog stays at `maxsize` frames of the most recent audio, so Twilio reads are
+    never held up. `close()` ends the stream; `get()` drains what is left and then
+    returns None.
+
+    Args:
+        depth: Gauge child tracking the queued items, shared by every call in the worker.
+        dropped: Counter child incremented per item dropped.
+    """
+
+    def __init__(self, maxsize: int, depth=None, dropped=None) -> None:
+        self.maxsize = max(1, maxsize)
+        self._items: Deque = deque()
+        self._ready = asyncio.Event()
+        self._depth = depth
+        self._dropped = dropped
+        self.closed = False
+        self.stats = {"queued": 0, "dropped": 0, "max_depth": 0}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put_nowait(self, item) -> None:
+        if self.closed:
+            return
+        if len(self._items) >= self.maxsize:
+            self._items.popleft()
+            self.stats["dropped"] += 1
+            if self._dropped:
+                self._dropped.inc()
+        elif self._depth:
+            self._depth.inc()
+        self._items.append(item)
+        self.stats["queued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._items))
+        self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        if self._depth:
+            self._depth.dec()
+        return self._items.popleft()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    def clear(self) -> None:
+        if self._depth:
+            self._depth.dec(len(self._items))
+        self._items.clear()
+
+
+class CoalescingAudioQueue:
+    """Twilio-bound queue in which audio deltas waiting behind a slow send are merged.
+
+    A delta for the same item as the queued tail is appended to it, up to
+    `frame_ms` per media frame, so a slow Twilio socket gets fewer, larger frames
+    instead of a growing backlog of small ones. Audio is never dropped here: once
+    `max_ms` of it is queued, `put_audio` waits, which stops reading from OpenAI
+    until Twilio catches up. Marks and `clear` go through the queue too, to keep
+    their order relative to the audio.
+
+    Args:
+        depth: Gauge child tracking the queued entries, shared by every call in the worker.
+        coalesced: Counter child incremented per delta merged into a queued frame.
+    """
+
+    def __init__(
+        self,
+        max_ms: int = RELAY.outbound_max_ms,
+        frame_ms: int = RELAY.outbound_frame_ms,
+        depth=None,
+        coalesced=None,
+    ) -> None:
+        self.max_bytes = max(1, max_ms) * MULAW_BYTES_PER_MS
+        self.frame_bytes = max(1, frame_ms) * MULAW_BYTES_PER_MS
+        self._items: Deque[list] = deque()  # [kind, item id, deltas or text, audio bytes]
+        self._audio_bytes = 0
+        self._ready = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._depth = depth
+        self._coalesced = coalesced
+        self.closed = False
+        self.stats = {"deltas": 0, "frames": 0, "coalesced": 0, "dropped_ms": 0, "max_buffered_ms": 0}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._audio_bytes / MULAW_BYTES_PER_MS
+
+    async def put_audio(self, item_id: Optional[str], delta: str) -> None:
+        while self._audio_bytes >= self.max_bytes and not self.closed:
+            self._not_full.clear()
+            await self._not_full.wait()
+        if self.closed:
+            return
+        size = decoded_length(delta)
+        self.stats["deltas"] += 1
+        tail = self._items[-1] if self._items else None
+        if tail and tail[0] == AUDIO and tail[1] == item_id and tail[3] + size <= self.frame_bytes:
+            tail[2].append(delta)
+            tail[3] += size
+            self.stats["coalesced"] += 1
+            if self._coalesced:
+                self._coalesced.inc()
+        else:
+            self._append([AUDIO, item_id, [delta], size])
+        self._audio_bytes += size
+        self.stats["max_buffered_ms"] = max(self.stats["max_buffered_ms"], int(self.buffered_ms))
+
+    def put(self, kind: str, text: Optional[str] = None) -> None:
+        """Queue a pre-rendered frame (`FRAME`) or a playback boundary (`FLUSH`)."""
+        if not self.closed:
+            self._append([kind, None, text, 0])
+
+    async def get(self) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        """Next `(kind, item_id, payload)`, with merged deltas re-encoded as one payload."""
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        kind, item_id, payload, size = self._items.popleft()
+        if self._depth:
+            self._depth.dec()
+        if kind == AUDIO:
+            self.stats["frames"] += 1
+            self._audio_bytes -= size
+            self._not_full.set()
+            if len(payload) > 1:
+                payload = base64.b64encode(b"".join(base64.b64decode(delta) for delta in payload)).decode("ascii")
+            else:
+                payload = payload[0]
+        return kind, item_id, payload
+
+    def clear(self) -> None:
+        """Drop everything queued, e.g. audio of a response the caller talked over."""
+        self.stats["dropped_ms"] += int(self.buffered_ms)
+        if self._depth:
+            self._depth.dec(len(self._items))
+        self._items.clear()
+        self._audio_bytes = 0
+        self._not_full.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+        self._not_full.set()
+
+    def _append(self, entry: list) -> None:
+        self._items.append(entry)
+        if self._depth:
+            self._depth.inc()
+        self._ready.set()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict
+
+from config.services import STARTUP
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Wall-clock cost of each startup component.
+
+    Construction at import is timed with `measure`; I/O-bound preparation runs
+    concurrently through `warm_up` from the lifespan hook. `as_dict` is served at
+    `GET /startup` and `print_report` logs it once the worker is ready.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.ready_ms = None
+        self.timings: Dict[str, float] = {}  # component -> ms
+        self.errors: Dict[str, str] = {}
+        self._pending: Dict[asyncio.Task, str] = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - began) * 1000, 1)
+
+    async def warm_up(self, steps: Dict[str, Awaitable], timeout: float = STARTUP.warmup_timeout) -> None:
+        """Run warm-up steps concurrently and time each one.
+
+        A failing step is logged and recorded, never raised, so one bad dependency
+        cannot block boot. Steps still running after `timeout` finish in the background.
+        """
+        async def run(name: str, step: Awaitable) -> None:
+            began = time.perf_counter()
+            try:
+                await step
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.warning("Warm-up step '%s' failed: %s", name, e)
+            finally:
+                self.timings[name] = round((time.perf_counter() - began) * 1000, 1)
+
+        tasks = {asyncio.create_task(run(name, step)): name for name, step in steps.items()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                self._pending[task] = tasks[task]
+                task.add_done_callback(lambda t: self._pending.pop(t, None))
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+
+    async def cancel_pending(self) -> None:
+        for task in list(self._pending):
+            task.cancel()
+        await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def as_dict(self) -> dict:
+        return {
+            "ready_ms": self.ready_ms,
+            "components_ms": dict(sorted(self.timings.items(), key=lambda item: -item[1])),
+            "errors": self.errors,
+            "pending": sorted(self._pending.values()),
+        }
+
+    def print_report(self) -> None:
+        lines = [f"Startup ready in {self.ready_ms} ms"]
+        for name, ms in self.as_dict()["components_ms"].items():
+            status = " (failed)" if name in self.errors else ""
+            lines.append(f"  {name:<24} {ms:>9.1f} ms{status}")
+        for name in sorted(self._pending.values()):
+            lines.append(f"  {name:<24}   still warming up in the background")
+        logger.info("\n".join(lines))
+
+
+startup = StartupReport()
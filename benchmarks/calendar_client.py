@@ -0,0 +1,123 @@
+"""Exercise the async Calendar client against `FakeCalendarServer`.
+
+Compares N availability checks made serially through the synchronous
+googleapiclient stack with the same checks made concurrently through
+`AsyncGoogleCalendarService`, counts FreeBusy queries for overlapping checks
+with and without the free/busy cache, runs a schedule / reschedule / cancel
+round trip, and times reschedules found through the appointment index against
+the concurrent fan-out over all accounts. Reports requests, TCP connections
+and token refreshes.
+
+    python -m benchmarks.calendar_client [--accounts 5] [--checks 50] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from googleapiclient.discovery import build
+
+from benchmarks.fake_calendar import FakeCalendarServer
+
+
+async def run(args) -> None:
+    from app.core.services.appointment_index import AppointmentIndex
+    from app.core.services.google_calendar import build_credentials
+    from app.core.services.google_calendar_async import HTTP2_AVAILABLE, AsyncGoogleCalendarService
+
+    server = FakeCalendarServer(port=args.port, latency=args.latency)
+    await server.start()
+    accounts = [f"acct{i}" for i in range(args.accounts)]
+    start = datetime(2030, 1, 7, 9, tzinfo=timezone.utc)
+    windows = [(start + timedelta(minutes=30 * i), start + timedelta(minutes=30 * (i + 1))) for i in range(args.checks)]
+
+    # Synchronous baseline: one googleapiclient service per account, calls made one after another.
+    services = {}
+    for account in accounts:
+        creds = build_credentials(server.credentials_info(account))
+        services[account] = build("calendar", "v3", credentials=creds, cache_discovery=False,
+                                  static_discovery=True, client_options={"api_endpoint": server.api_url + "/"})
+
+    def sync_checks() -> None:
+        for i, (w_start, w_end) in enumerate(windows):
+            services[accounts[i % len(accounts)]].freebusy().query(body={
+                "timeMin": w_start.isoformat(), "timeMax": w_end.isoformat(), "items": [{"id": "primary"}]
+            }).execute()
+
+    # Runs on a thread only because the fake server shares this event loop.
+    began = time.perf_counter()
+    await asyncio.to_thread(sync_checks)
+    sync_ms = (time.perf_counter() - began) * 1000
+    print(f"sync  {args.checks} checks (serial)     {sync_ms:8.1f} ms")
+
+    server.connections.clear()
+    server.stats.update(requests=0, token_refreshes=0)
+    calendar = AsyncGoogleCalendarService(base_url=server.api_url, load_accounts=False, appointments=AppointmentIndex(":memory:"))
+    for account in accounts:
+        calendar.add_account(account, server.credentials_info(account), persist=False)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(
+        calendar.check_availability(accounts[i % len(accounts)], w_start, w_end)
+        for i, (w_start, w_end) in enumerate(windows)
+    ))
+    async_ms = (time.perf_counter() - began) * 1000
+    print(f"async {args.checks} checks (concurrent) {async_ms:8.1f} ms   http2={HTTP2_AVAILABLE}")
+    print(f"      requests {server.stats['requests']}, connections {len(server.connections)}, "
+          f"token refreshes {server.stats['token_refreshes']} for {len(accounts)} accounts")
+
+    began = time.perf_counter()
+    free = await calendar.check_availability_many(accounts[0], windows)
+    print(f"batched {len(windows)} windows in one FreeBusy query {(time.perf_counter() - began) * 1000:6.1f} ms, all free: {all(free)}")
+
+    # A call's worth of overlapping checks: a day's slots, then hourly windows inside it.
+    day = start + timedelta(days=1)
+    hours = [(day + timedelta(minutes=30 * i), day + timedelta(minutes=30 * i + 60)) for i in range(16)]
+    for cached in (False, True):
+        calendar.freebusy_cache.clear()
+        server.stats["freebusy"] = 0
+        began = time.perf_counter()
+        await calendar.get_availability_slots(accounts[2], day, day + timedelta(hours=9))
+        for w_start, w_end in hours + [(day - timedelta(hours=1), day + timedelta(hours=10))]:
+            if not cached:
+                calendar.freebusy_cache.clear()
+            await calendar.check_availability(accounts[2], w_start, w_end)
+        print(f"{len(hours) + 2} overlapping checks {'with' if cached else 'without'} free/busy cache "
+              f"{(time.perf_counter() - began) * 1000:8.1f} ms, FreeBusy queries {server.stats['freebusy']}")
+
+    event_id = await calendar.schedule_appointment(accounts[1], "Demo", windows[0][0], windows[0][1])
+    assert not await calendar.check_availability(accounts[1], *windows[0])
+    await calendar.reschedule_appointment(event_id, *windows[2])
+    assert await calendar.check_availability(accounts[1], *windows[0])
+    assert not await calendar.check_availability(accounts[1], *windows[2])
+    await calendar.cancel_appointment(event_id)
+    assert await calendar.check_availability(accounts[1], *windows[2])
+    print("schedule / reschedule / cancel round trip ok")
+
+    # Event on the last account: found via the index, then with the index emptied.
+    event_id = await calendar.schedule_appointment(accounts[-1], "Lookup", *windows[4])
+    for indexed in (True, False):
+        if not indexed:
+            calendar.appointments.delete(event_id)
+        server.stats["requests"] = 0
+        began = time.perf_counter()
+        await calendar.reschedule_appointment(event_id, *windows[5 if indexed else 6])
+        print(f"reschedule {'via appointment index' if indexed else 'via concurrent fan-out'} "
+              f"{(time.perf_counter() - began) * 1000:8.1f} ms, requests {server.stats['requests']}")
+    await calendar.cancel_appointment(event_id)
+
+    await calendar.close()
+    await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--checks", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=9060)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Offline check of the outbound campaign dialer against a stubbed Twilio client.
+
+`StubTwilio.place_call` answers after a simulated API latency, fails a share of
+requests, lets a share time out after placing the call anyway, and reports each
+call's final status (completed, busy, no-answer) after a simulated call
+duration, the way Twilio's status callback would. With `--workers` above 1,
+that many dialers share one in-memory `CampaignStore` like uvicorn workers
+sharing Redis: one holds the dialer lease, and status callbacks land on random
+workers. The run prints the achieved calls per second, the peak number of calls
+in progress, retries, final statuses and placed calls the dialer lost track of.
+
+    python -m benchmarks.campaign_dialer [--numbers 40] [--cps 10] [--max-concurrent 5] [--workers 1]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.core.services.campaign import CampaignDialer, CampaignStore
+from app.core.services.shared_state import InMemoryStateProvider
+
+
+class StubTwilio:
+    def __init__(self, args) -> None:
+        self.args = args
+        self.dialers: list = []
+        self.placed_at = []
+        self.calls = []  # (number, created_at epoch seconds, call_sid)
+        self.in_progress = 0
+        self.peak = 0
+        self._seq = 0
+
+    async def place_call(self, number: str) -> str:
+        await asyncio.sleep(self.args.api_latency)
+        roll = random.random()
+        if roll < self.args.api_error_rate:
+            raise RuntimeError("HTTP 503 from the stubbed Twilio API")
+        self._seq += 1
+        call_sid = f"CA{self._seq:032d}"
+        self.placed_at.append(time.monotonic())
+        self.calls.append((number, time.time(), call_sid))
+        self.in_progress += 1
+        self.peak = max(self.peak, self.in_progress)
+        asyncio.get_running_loop().call_later(self.args.call_seconds * random.uniform(0.5, 1.5), self.finish, call_sid)
+        if roll < self.args.api_error_rate + self.args.api_timeout_rate:
+            # Placed, but the response never makes it back in time.
+            await asyncio.sleep(self.args.api_timeout * 2)
+        return call_sid
+
+    async def find_calls(self, number: str, since: float) -> list:
+        await asyncio.sleep(self.args.api_latency)
+        return [sid for to, created_at, sid in reversed(self.calls) if to == number and created_at >= since]
+
+    def finish(self, call_sid: str) -> None:
+        self.in_progress -= 1
+        roll = random.random()
+        status = "busy" if roll < self.args.busy_rate else "no-answer" if roll < 2 * self.args.busy_rate else "completed"
+        asyncio.create_task(random.choice(self.dialers).report_status(call_sid, status))
+
+
+async def run(args) -> None:
+    random.seed(args.seed)
+    stub = StubTwilio(args)
+    state = InMemoryStateProvider() if args.workers > 1 else None
+    stub.dialers = [
+        CampaignDialer(
+            stub.place_call,
+            find_calls=stub.find_calls,
+            store=CampaignStore(state) if state else None,
+            cps=args.cps,
+            max_concurrent=args.max_concurrent,
+            backoff_base=args.backoff,
+            backoff_max=args.backoff * 8,
+            api_timeout=args.api_timeout,
+            call_timeout=args.call_seconds * 10,
+            poll_interval=0.05,
+        )
+        for _ in range(args.workers)
+    ]
+    for n, dialer in enumerate(stub.dialers):
+        dialer.worker = f"worker-{n}"
+        dialer.start()
+
+    started = time.monotonic()
+    # Created through the last worker, which does not hold the lease when there are several.
+    campaign = await stub.dialers[-1].create([f"+1555{n:07d}" for n in range(args.numbers)])
+    while not campaign.done:
+        await asyncio.sleep(0.05)
+        campaign = await stub.dialers[-1].get(campaign.id)
+    elapsed = time.monotonic() - started
+    for dialer in stub.dialers:
+        await dialer.close()
+
+    gaps = [b - a for a, b in zip(stub.placed_at, stub.placed_at[1:])]
+    report = campaign.as_dict(details=False)
+    tracked = sum(dialer.stats["placed"] for dialer in stub.dialers)
+    print(f"numbers {args.numbers}, cps limit {args.cps}, concurrency limit {args.max_concurrent}, workers {args.workers}")
+    print(f"   finished in {elapsed:.2f}s, final statuses {report['counts']}")
+    print(f"   calls placed {len(stub.placed_at)}, min gap {min(gaps, default=0) * 1000:.0f} ms "
+          f"(limit {1000 / args.cps:.0f} ms), peak in progress {stub.peak}")
+    print(f"   calls the dialer lost track of (a retry would dial them twice) {len(stub.calls) - tracked}")
+    for n, dialer in enumerate(stub.dialers):
+        print(f"   worker {n} dialer stats {dialer.stats}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--numbers", type=int, default=40)
+    parser.add_argument("--cps", type=float, default=10.0)
+    parser.add_argument("--max-concurrent", type=int, default=5)
+    parser.add_argument("--call-seconds", type=float, default=0.5, help="mean simulated call duration")
+    parser.add_argument("--api-latency", type=float, default=0.15)
+    parser.add_argument("--api-error-rate", type=float, default=0.1)
+    parser.add_argument("--api-timeout-rate", type=float, default=0.05, help="share of requests placing the call but timing out")
+    parser.add_argument("--api-timeout", type=float, default=0.5)
+    parser.add_argument("--busy-rate", type=float, default=0.1, help="share of calls ending busy (same again for no-answer)")
+    parser.add_argument("--backoff", type=float, default=0.2, help="seconds before the first retry")
+    parser.add_argument("--workers", type=int, default=1, help="dialers sharing one campaign store")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Local stand-in for the Google Calendar v3 REST API and the OAuth token endpoint.
+
+Implements `POST /calendar/v3/freeBusy`, event insert/get/update/delete and
+`POST /token`, stores events in memory per account (the service account that
+obtained the access token) and counts requests, TCP connections and token
+refreshes. Every request can be delayed to mimic network latency.
+
+    python -m benchmarks.fake_calendar --port 9060
+    GOOGLE_CALENDAR_API_URL=http://127.0.0.1:9060/calendar/v3 python main.py
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import rsa
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+def _parse(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class FakeCalendarServer:
+    """In-process fake Calendar API served by uvicorn on localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9060, latency: float = 0.0, token_ttl: int = 3600) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_ttl = token_ttl
+        self.events = {}  # (account, calendar_id, event_id) -> event
+        self.tokens = {}  # access token -> account (service account email)
+        self.connections = set()
+        self.stats = {"requests": 0, "freebusy": 0, "token_refreshes": 0}
+        self._ids = itertools.count(1)
+        self._server = None
+        self._task = None
+        self._private_key = rsa.newkeys(1024)[1].save_pkcs1().decode("utf-8")
+        self.app = self._build_app()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/calendar/v3"
+
+    @property
+    def token_uri(self) -> str:
+        return f"{self.url}/token"
+
+    def credentials_info(self, account: str) -> dict:
+        """Service account credentials whose token exchange goes to this server.
+
+        (OAuth user credentials always use Google's token endpoint, so they cannot be faked.)
+        """
+        return {
+            "type": "service_account",
+            "project_id": "fake-project",
+            "private_key_id": "fake-key",
+            "private_key": self._private_key,
+            "client_email": f"{account}@fake-project.iam.gserviceaccount.com",
+            "client_id": account,
+            "token_uri": self.token_uri,
+        }
+
+    async def start(self) -> str:
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+        return self.api_url
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.should_exit = True
+            await self._task
+
+    def busy(self, account: str, calendar_id: str, start: datetime, end: datetime) -> list:
+        periods = []
+        for (owner, cal, _), event in self.events.items():
+            e_start, e_end = _parse(event["start"]["dateTime"]), _parse(event["end"]["dateTime"])
+            if (owner, cal) == (account, calendar_id) and e_start < end and e_end > start:
+                periods.append({"start": event["start"]["dateTime"], "end": event["end"]["dateTime"]})
+        return periods
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def count(request: Request, call_next):
+            self.stats["requests"] += 1
+            self.connections.add(request.scope.get("client"))
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if request.url.path.startswith("/calendar/"):
+                token = request.headers.get("authorization", "").removeprefix("Bearer ")
+                if token not in self.tokens:
+                    return JSONResponse(status_code=401, content={"error": {"code": 401, "message": "Invalid Credentials"}})
+                request.state.account = self.tokens[token]
+            return await call_next(request)
+
+        @app.post("/token")
+        async def token(request: Request):
+            self.stats["token_refreshes"] += 1
+            # The JWT assertion is not verified, only read for the issuing service account.
+            assertion = parse_qs((await request.body()).decode())["assertion"][0].split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(assertion + "=" * (-len(assertion) % 4)))
+            access_token = f"token-{next(self._ids)}"
+            self.tokens[access_token] = claims["iss"]
+            return {"access_token": access_token, "expires_in": self.token_ttl, "token_type": "Bearer"}
+
+        @app.post("/calendar/v3/freeBusy")
+        async def freebusy(request: Request):
+            self.stats["freebusy"] += 1
+            body = await request.json()
+            start, end = _parse(body["timeMin"]), _parse(body["timeMax"])
+            account = request.state.account
+            return {"calendars": {item["id"]: {"busy": self.busy(account, item["id"], start, end)} for item in body["items"]}}
+
+        @app.post("/calendar/v3/calendars/{calendar_id}/events")
+        async def insert(calendar_id: str, request: Request):
+            event = await request.json()
+            event["id"] = f"evt{next(self._ids)}"
+            self.events[(request.state.account, calendar_id, event["id"])] = event
+            return event
+
+        @app.get("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def get(calendar_id: str, event_id: str, request: Request):
+            event = self.events.get((request.state.account, calendar_id, event_id))
+            if event is None:
+                return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+            return event
+
+        @app.put("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def update(calendar_id: str, event_id: str, request: Request):
+            key = (request.state.account, calendar_id, event_id)
+            if key not in self.events:
+                return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+            event = await request.json()
+            self.events[key] = event
+            return event
+
+        @app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+        async def delete(calendar_id: str, event_id: str, request: Request):
+            if self.events.pop((request.state.account, calendar_id, event_id), None) is None:
+                return JSONResponse(status_code=410, content={"error": {"code": 410, "message": "Resource has been deleted"}})
+            return Response(status_code=204)
+
+        return app
+
+
+async def serve(args) -> None:
+    server = FakeCalendarServer(host=args.host, port=args.port, latency=args.latency)
+    print(f"Fake Calendar API listening on {await server.start()}")
+    await asyncio.Future()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9060)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
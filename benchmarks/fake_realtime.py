@@ -0,0 +1,440 @@
+"""Local stand-in for the OpenAI Realtime websocket API.
+
+Speaks just enough of the protocol for the relay: `session.created` on connect,
+`session.updated` after `session.update`, and a stream of μ-law silence
+`response.audio.delta` events followed by `response.done` after each
+`response.create`. Latencies are configurable so connection setup and
+time-to-first-audio can be measured offline.
+
+For load tests it can also play the caller's side of a conversation: every
+`turn_ms` of inbound audio it sends `speech_started` (cancelling the response in
+progress), then after `utterance_ms` the transcript and either a spoken reply or,
+on the first and every `function_call_every`th turn, a `rag_search` function
+call whose reply follows the relay's `response.create`. With `stamp=True` each audio delta starts
+with a send timestamp (see `stamp`), and timestamps in inbound audio are read
+back; `GET /stats` on the same port returns the counters and latency samples.
+`FakeEmbeddingsServer` fakes the embeddings REST endpoint next to it.
+
+    python -m benchmarks.fake_realtime --port 9050 [--embeddings-port 9051]
+    OPENAI_REALTIME_URL=ws://127.0.0.1:9050/v1/realtime python main.py
+"""
+import argparse
+import asyncio
+import base64
+import http
+import itertools
+import json
+import statistics
+import struct
+import time
+import zlib
+from typing import List, Optional
+
+import numpy as np
+import websockets
+
+# ---------------
+# Audio timestamps
+# ---------------
+
+STAMP_MAGIC = b"LTS1"
+STAMP = struct.Struct("<4sd")
+FRAME_BYTES = 160  # one 20 ms μ-law frame, as sent by Twilio
+
+
+def stamp(audio: bytes, at: Optional[float] = None) -> bytes:
+    """Overwrite the start of `audio` with a wall-clock timestamp (shared by processes on one host)."""
+    return STAMP.pack(STAMP_MAGIC, time.time() if at is None else at) + audio[STAMP.size:]
+
+
+def read_stamp(audio: bytes, offset: int = 0) -> Optional[float]:
+    """Seconds since the timestamp at `offset` was written, or None if there is none."""
+    if len(audio) < offset + STAMP.size:
+        return None
+    magic, sent = STAMP.unpack_from(audio, offset)
+    if magic != STAMP_MAGIC:
+        return None
+    return time.time() - sent
+
+
+def percentiles(samples: List[float]) -> dict:
+    """p50 / p99 / max of `samples` in milliseconds."""
+    if not samples:
+        return {"n": 0, "p50": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50": round(statistics.median(ordered) * 1000, 2),
+        "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Deterministic stand-in embedding: equal texts get equal vectors, others are unrelated."""
+    return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(dimensions).tolist()
+
+
+class FakeEmbeddingsServer:
+    """`POST /v1/embeddings` on a plain asyncio HTTP/1.1 server, for `OPENAI_BASE_URL`.
+
+    Answers after `latency` seconds with `fake_embedding` vectors, batched inputs
+    included, so retrieval runs through the real OpenAI client offline.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05, dimensions: int = 1536) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.dimensions = dimensions
+        self.stats = {"requests": 0, "inputs": 0}
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                headers = dict(line.split(":", 1) for line in lines[1:] if ":" in line)
+                length = int({k.strip().lower(): v for k, v in headers.items()}.get("content-length", 0))
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                texts = body.get("input", [])
+                texts = [texts] if isinstance(texts, str) else texts
+                self.stats["requests"] += 1
+                self.stats["inputs"] += len(texts)
+                await asyncio.sleep(self.latency)
+                payload = json.dumps({
+                    "object": "list",
+                    "model": body.get("model", ""),
+                    "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text, self.dimensions)}
+                             for i, text in enumerate(texts)],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                }).encode("utf-8")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class FakeRealtimeServer:
+    """In-process fake Realtime server.
+
+    Args:
+        handshake_delay: Seconds added before accepting a connection (TLS + session creation).
+        first_audio_delay: Seconds between `response.create` and the first audio delta.
+        delta_bytes: Decoded μ-law bytes per audio delta (8000 bytes = 1 s of audio).
+        deltas_per_response: Number of audio deltas in each response.
+        turn_ms: Inbound audio per simulated caller turn; 0 disables caller turns.
+        utterance_ms: Time between `speech_started` and the end of the caller's turn.
+        function_call_every: The first and every Nth caller turn after it end in a `rag_search` call; 0 disables them.
+        queries: Queries used for the `rag_search` calls and transcripts, in rotation.
+        stamp: Timestamp outbound deltas and read timestamps from inbound audio.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        handshake_delay: float = 0.0,
+        first_audio_delay: float = 0.3,
+        delta_bytes: int = 800,
+        deltas_per_response: int = 20,
+        realtime_pace: bool = True,
+        turn_ms: int = 0,
+        utterance_ms: int = 1500,
+        function_call_every: int = 0,
+        queries: Optional[List[str]] = None,
+        stamp: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.handshake_delay = handshake_delay
+        self.first_audio_delay = first_audio_delay
+        self.delta_bytes = delta_bytes
+        self.deltas_per_response = deltas_per_response
+        self.realtime_pace = realtime_pace
+        self.turn_ms = turn_ms
+        self.utterance_ms = utterance_ms
+        self.function_call_every = function_call_every
+        self.queries = queries or ["opening hours"]
+        self.stamp = stamp
+        self.connections = set()
+        self.stats = {
+            "connections": 0, "appends": 0, "responses": 0, "cancelled": 0,
+            "turns": 0, "function_calls": 0, "function_outputs": 0, "truncates": 0,
+        }
+        self.inbound_latency: List[float] = []
+        self.tool_round_trip: List[float] = []
+        self.embeddings: Optional[FakeEmbeddingsServer] = None  # reported with the stats when set
+        self._server = None
+        self._ids = itertools.count(1)
+        self._silence = b"\xff" * delta_bytes
+        self._delta = base64.b64encode(self._silence).decode("utf-8")
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/v1/realtime"
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(
+            self._handler, self.host, self.port, process_request=self._process_request
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def drop_all(self) -> None:
+        """Abruptly close every open connection, as a network failure would."""
+        for ws in list(self.connections):
+            ws.transport.abort()
+
+    def report(self, reset: bool = False) -> dict:
+        """Counters and latency percentiles; `reset` starts a new inbound latency window."""
+        report = dict(
+            self.stats,
+            open=len(self.connections),
+            inbound_latency_ms=percentiles(self.inbound_latency),
+            tool_round_trip_ms=percentiles(self.tool_round_trip),
+        )
+        if self.embeddings is not None:
+            report["embeddings"] = dict(self.embeddings.stats)
+        if reset:
+            self.inbound_latency = []
+        return report
+
+    async def _process_request(self, path, headers):
+        if path.startswith("/stats"):
+            body = json.dumps(self.report(reset="reset" in path)).encode("utf-8")
+            return http.HTTPStatus.OK, [("Content-Type", "application/json")], body
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        return None
+
+    def _event_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    async def _handler(self, ws, path=None) -> None:
+        self.connections.add(ws)
+        self.stats["connections"] += 1
+        responses = set()
+        pending_calls = {}  # call_id -> time the function call was sent
+        inbound_ms = 0.0
+        turn = 0
+
+        def respond() -> None:
+            task = asyncio.create_task(self._quietly(self._respond(ws)))
+            responses.add(task)
+            task.add_done_callback(responses.discard)
+
+        async def caller_turn(number: int) -> None:
+            # The caller talks over the assistant: the relay should truncate and clear.
+            for task in list(responses):
+                if task is not asyncio.current_task():
+                    task.cancel()
+            await ws.send(json.dumps({"type": "input_audio_buffer.speech_started", "audio_start_ms": int(inbound_ms)}))
+            item_id = self._event_id("item")
+            query = self.queries[number % len(self.queries)]
+            words = query.split()
+            step = self.utterance_ms / 1000 / (len(words) + 1)
+            for word in words:
+                await asyncio.sleep(step)
+                await ws.send(json.dumps({
+                    "type": "conversation.item.input_audio_transcription.delta",
+                    "item_id": item_id, "content_index": 0, "delta": word + " ",
+                }))
+            await asyncio.sleep(step)
+            await ws.send(json.dumps({"type": "input_audio_buffer.speech_stopped", "item_id": item_id}))
+            await ws.send(json.dumps({"type": "input_audio_buffer.committed", "item_id": item_id}))
+            await ws.send(json.dumps({
+                "type": "conversation.item.input_audio_transcription.completed",
+                "item_id": item_id, "content_index": 0, "transcript": query,
+            }))
+            if self.function_call_every and (number - 1) % self.function_call_every == 0:
+                await self._function_call(ws, query, pending_calls)
+            else:
+                respond()
+
+        try:
+            await ws.send(json.dumps({"type": "session.created", "session": {"id": self._event_id("sess")}}))
+            async for message in ws:
+                event = json.loads(message)
+                kind = event.get("type")
+                if kind == "input_audio_buffer.append":
+                    self.stats["appends"] += 1
+                    if self.stamp or self.turn_ms:
+                        audio = base64.b64decode(event.get("audio", ""))
+                        inbound_ms += len(audio) / 8
+                        if self.stamp:
+                            self._read_inbound(audio)
+                        if self.turn_ms and inbound_ms >= (turn + 1) * self.turn_ms:
+                            turn += 1
+                            self.stats["turns"] += 1
+                            task = asyncio.create_task(self._quietly(caller_turn(turn)))
+                            responses.add(task)
+                            task.add_done_callback(responses.discard)
+                elif kind == "session.update":
+                    await ws.send(json.dumps({"type": "session.updated", "session": event.get("session", {})}))
+                elif kind == "conversation.item.create":
+                    item = event.get("item", {})
+                    if item.get("type") == "function_call_output":
+                        self.stats["function_outputs"] += 1
+                    await ws.send(json.dumps({"type": "conversation.item.created", "item": item}))
+                elif kind == "conversation.item.truncate":
+                    self.stats["truncates"] += 1
+                elif kind == "response.create":
+                    for sent in pending_calls.values():
+                        self.tool_round_trip.append(time.perf_counter() - sent)
+                    pending_calls.clear()
+                    respond()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in responses:
+                task.cancel()
+            self.connections.discard(ws)
+
+    @staticmethod
+    async def _quietly(coro) -> None:
+        """Run a sender task that may outlive its connection."""
+        try:
+            await coro
+        except websockets.ConnectionClosed:
+            pass
+
+    def _read_inbound(self, audio: bytes) -> None:
+        # The relay batches whole 20 ms frames, each stamped by the fake Twilio client.
+        for offset in range(0, len(audio), FRAME_BYTES):
+            latency = read_stamp(audio, offset)
+            if latency is not None:
+                self.inbound_latency.append(latency)
+
+    async def _function_call(self, ws, query: str, pending_calls: dict) -> None:
+        self.stats["function_calls"] += 1
+        response_id = self._event_id("resp")
+        item_id = self._event_id("item")
+        call_id = self._event_id("call")
+        arguments = json.dumps({"query": query, "resource": "products", "top_k": 2})
+        item = {"type": "function_call", "id": item_id, "call_id": call_id, "name": "rag_search"}
+        await ws.send(json.dumps({"type": "response.created", "response": {"id": response_id}}))
+        # As in the real API, only the output item names the tool; argument events carry ids.
+        await ws.send(json.dumps({
+            "type": "response.output_item.added", "response_id": response_id, "output_index": 0,
+            "item": {**item, "status": "in_progress", "arguments": ""},
+        }))
+        await ws.send(json.dumps({
+            "type": "response.function_call_arguments.done",
+            "response_id": response_id, "item_id": item_id, "output_index": 0,
+            "call_id": call_id, "arguments": arguments,
+        }))
+        pending_calls[call_id] = time.perf_counter()
+        await ws.send(json.dumps({
+            "type": "response.done",
+            "response": {"id": response_id, "status": "completed", "output": [
+                {**item, "status": "completed", "arguments": arguments},
+            ]},
+        }))
+
+    async def _respond(self, ws) -> None:
+        self.stats["responses"] += 1
+        response_id = self._event_id("resp")
+        item_id = self._event_id("item")
+        pace = self.delta_bytes / 8000 if self.realtime_pace else 0
+        await ws.send(json.dumps({"type": "response.created", "response": {"id": response_id}}))
+        try:
+            await asyncio.sleep(self.first_audio_delay)
+            for _ in range(self.deltas_per_response):
+                delta = base64.b64encode(stamp(self._silence)).decode("utf-8") if self.stamp else self._delta
+                await ws.send(json.dumps({
+                    "type": "response.audio.delta",
+                    "response_id": response_id,
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": delta,
+                }))
+                await asyncio.sleep(pace)
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            if ws.open:
+                await ws.send(json.dumps({
+                    "type": "response.done",
+                    "response": {"id": response_id, "status": "cancelled", "output": []},
+                }))
+            raise
+        await ws.send(json.dumps({
+            "type": "response.audio.done",
+            "response_id": response_id,
+            "item_id": item_id,
+            "output_index": 0,
+            "content_index": 0,
+        }))
+        await ws.send(json.dumps({
+            "type": "response.done",
+            "response": {"id": response_id, "status": "completed", "output": []},
+        }))
+
+
+async def serve(args) -> None:
+    queries = None
+    if args.queries_from:
+        with open(args.queries_from, "r", encoding="utf-8") as f:
+            queries = [document["name"] for document in json.load(f) if document.get("name")]
+    server = FakeRealtimeServer(
+        host=args.host,
+        port=args.port,
+        handshake_delay=args.handshake_delay,
+        first_audio_delay=args.first_audio_delay,
+        deltas_per_response=args.deltas_per_response,
+        turn_ms=args.turn_ms,
+        utterance_ms=args.utterance_ms,
+        function_call_every=args.function_call_every,
+        queries=queries,
+        stamp=args.stamp,
+    )
+    print(f"Fake Realtime server listening on {await server.start()}", flush=True)
+    if args.embeddings_port is not None:
+        server.embeddings = FakeEmbeddingsServer(args.host, args.embeddings_port, latency=args.embedding_latency)
+        print(f"Fake embeddings API at OPENAI_BASE_URL={await server.embeddings.start()}", flush=True)
+    await asyncio.Future()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9050)
+    parser.add_argument("--handshake-delay", type=float, default=0.3)
+    parser.add_argument("--first-audio-delay", type=float, default=0.3)
+    parser.add_argument("--deltas-per-response", type=int, default=20)
+    parser.add_argument("--turn-ms", type=int, default=0, help="inbound audio per caller turn; 0 disables turns")
+    parser.add_argument("--utterance-ms", type=int, default=1500)
+    parser.add_argument("--function-call-every", type=int, default=0, help="the first and every Nth turn after it call rag_search; 0 disables")
+    parser.add_argument("--queries-from", help="JSON documents whose names are used as queries, e.g. data/products.json")
+    parser.add_argument("--stamp", action="store_true", help="timestamp audio to measure relay latency")
+    parser.add_argument("--embeddings-port", type=int, help="also serve a fake embeddings API on this port")
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Fake Twilio Voice client for offline load tests.
+
+`FakeTwilioCall` does what Twilio does for one inbound call: it POSTs the
+`/incoming-call` webhook (signed like Twilio's when given the auth token), connects to the `<Stream>` URL from the TwiML, sends
+`connected` and `start` (with the TwiML parameters as `customParameters`), and
+then streams μ-law audio in 20 ms `media` frames at real-time pace. Marks are
+echoed back once the audio sent before them would have finished playing, and a
+`clear` echoes every pending mark at once, as Twilio does.
+
+The audio comes from a recording (raw 8 kHz μ-law, or a μ-law WAV file) or a
+generated tone. Each frame starts with a send timestamp so the fake Realtime
+server can measure inbound relay latency; timestamps in the audio deltas coming
+back measure the outbound direction.
+
+    python -m benchmarks.fake_twilio --url http://127.0.0.1:5050 [--seconds 10] [--audio call.ulaw]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import re
+import struct
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import websockets
+from twilio.request_validator import RequestValidator
+
+from benchmarks.fake_realtime import FRAME_BYTES, percentiles, read_stamp, stamp
+
+FRAME_SECONDS = 0.02
+BYTES_PER_SECOND = 8000
+
+
+# ---------------
+# Audio
+# ---------------
+
+def linear_to_ulaw(sample: int) -> int:
+    """G.711 μ-law encoding of one 16-bit linear sample."""
+    bias, clip = 0x84, 32635
+    sign = 0x80 if sample < 0 else 0
+    sample = min(abs(sample), clip) + bias
+    exponent = max(0, int(math.log2(sample)) - 7)
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def tone(seconds: float = 1.0, frequency: float = 440.0, amplitude: int = 8000) -> bytes:
+    samples = int(seconds * BYTES_PER_SECOND)
+    return bytes(
+        linear_to_ulaw(int(amplitude * math.sin(2 * math.pi * frequency * n / BYTES_PER_SECOND)))
+        for n in range(samples)
+    )
+
+
+def load_audio(path: Optional[str]) -> bytes:
+    """8 kHz μ-law bytes from a raw file or the `data` chunk of a WAV file; a tone if no path."""
+    if not path:
+        return tone()
+    with open(path, "rb") as f:
+        audio = f.read()
+    if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+        offset = 12
+        while offset + 8 <= len(audio):
+            chunk, size = struct.unpack_from("<4sI", audio, offset)
+            if chunk == b"fmt ":
+                audio_format, _, rate = struct.unpack_from("<HHI", audio, offset + 8)
+                if audio_format != 7 or rate != BYTES_PER_SECOND:
+                    raise ValueError(f"{path}: expected 8 kHz μ-law (format 7), got format {audio_format} at {rate} Hz")
+            elif chunk == b"data":
+                return audio[offset + 8:offset + 8 + size]
+            offset += 8 + size + (size & 1)
+        raise ValueError(f"{path}: no data chunk")
+    return audio
+
+
+# ---------------
+# One call
+# ---------------
+
+class FakeTwilioCall:
+    """One simulated inbound phone call against the relay at `base_url`."""
+
+    def __init__(
+        self, base_url: str, audio: bytes, seconds: float, name: str = "call", auth_token: Optional[str] = None
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.validator = RequestValidator(auth_token) if auth_token else None
+        self.audio = audio
+        self.seconds = seconds
+        self.name = name
+        self.outbound_latency: List[float] = []
+        self.stats = {"frames_sent": 0, "media_received": 0, "marks": 0, "clears": 0, "late_frames": 0}
+        self.error: Optional[str] = None
+        self.rejected = False  # turned away by admission control: TwiML without a <Stream>
+        self.connected_at: Optional[float] = None
+        self.first_audio: Optional[float] = None
+        self._playback_end = 0.0
+        self._pending_marks: Dict[str, tuple] = {}  # mark name -> (timer, mark event)
+
+    def _stream_url(self, twiml: str) -> str:
+        url = re.search(r'<Stream url="([^"]+)"', twiml).group(1)
+        # The TwiML names the public wss:// host; the test server is plain ws:// on localhost.
+        return f"ws://{urlsplit(self.base_url).netloc}{urlsplit(url).path}"
+
+    async def run(self, http: httpx.AsyncClient) -> None:
+        try:
+            url, form = f"{self.base_url}/incoming-call", {"CallSid": self.name}
+            headers = {"X-Twilio-Signature": self.validator.compute_signature(url, form)} if self.validator else {}
+            response = await http.post(url, data=form, headers=headers)
+            response.raise_for_status()
+            twiml = response.text
+            if "<Stream" not in twiml:
+                self.rejected = True
+                return
+            parameters = dict(re.findall(r'<Parameter name="([^"]+)" value="([^"]*)"', twiml))
+            async with websockets.connect(self._stream_url(twiml), max_size=None) as ws:
+                self.connected_at = time.perf_counter()
+                stream_sid = f"MZ{self.name}"
+                await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+                await ws.send(json.dumps({"event": "start", "start": {
+                    "streamSid": stream_sid, "callSid": f"CA{self.name}", "customParameters": parameters,
+                    "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+                }}))
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    await self._stream(ws, stream_sid)
+                    await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+                finally:
+                    receiver.cancel()
+                    for handle, _ in self._pending_marks.values():
+                        handle.cancel()
+        except websockets.ConnectionClosed as e:
+            self.error = f"closed by server ({e.code})"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _stream(self, ws, stream_sid: str) -> None:
+        frames = int(self.seconds / FRAME_SECONDS)
+        started = time.perf_counter()
+        for n in range(frames):
+            # Absolute schedule: a late frame is sent at once rather than shifting the rest.
+            delay = started + n * FRAME_SECONDS - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -FRAME_SECONDS:
+                self.stats["late_frames"] += 1
+            offset = (n * FRAME_BYTES) % max(len(self.audio) - FRAME_BYTES, 1)
+            payload = stamp(self.audio[offset:offset + FRAME_BYTES])
+            await ws.send(json.dumps({"event": "media", "streamSid": stream_sid, "media": {
+                "track": "inbound", "chunk": str(n + 1), "timestamp": str(n * 20),
+                "payload": base64.b64encode(payload).decode("ascii"),
+            }}))
+            self.stats["frames_sent"] += 1
+
+    async def _receive(self, ws) -> None:
+        loop = asyncio.get_running_loop()
+        async for message in ws:
+            data = json.loads(message)
+            event = data.get("event")
+            if event == "media":
+                audio = base64.b64decode(data["media"]["payload"])
+                latency = read_stamp(audio)
+                if latency is not None:
+                    self.outbound_latency.append(latency)
+                if self.first_audio is None:
+                    self.first_audio = time.perf_counter() - self.connected_at
+                self.stats["media_received"] += 1
+                now = loop.time()
+                self._playback_end = max(self._playback_end, now) + len(audio) / BYTES_PER_SECOND
+            elif event == "mark":
+                self.stats["marks"] += 1
+                name = data["mark"]["name"]
+                delay = max(self._playback_end - loop.time(), 0)
+                self._pending_marks[name] = (loop.call_later(delay, self._echo_mark, ws, data), data)
+            elif event == "clear":
+                self.stats["clears"] += 1
+                self._playback_end = loop.time()
+                for handle, mark in list(self._pending_marks.values()):
+                    handle.cancel()
+                    self._echo_mark(ws, mark)
+
+    def _echo_mark(self, ws, mark: dict) -> None:
+        self._pending_marks.pop(mark["mark"]["name"], None)
+        if ws.open:
+            asyncio.ensure_future(ws.send(json.dumps(mark)))
+
+
+async def run(args) -> None:
+    call = FakeTwilioCall(args.url, load_audio(args.audio), args.seconds, auth_token=args.auth_token)
+    async with httpx.AsyncClient() as http:
+        await call.run(http)
+    print(f"error: {call.error}" if call.error else "rejected" if call.rejected else "completed")
+    print(f"   {call.stats}")
+    print(f"   outbound relay latency {percentiles(call.outbound_latency)}")
+    if call.first_audio is not None:
+        print(f"   first audio after {call.first_audio * 1000:.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5050", help="base URL of the relay")
+    parser.add_argument("--seconds", type=float, default=10.0, help="call duration")
+    parser.add_argument("--audio", help="8 kHz μ-law recording (raw or WAV); a tone by default")
+    parser.add_argument("--auth-token", help="the relay's TWILIO_AUTH_TOKEN, to sign the webhook request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
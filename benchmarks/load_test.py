@@ -0,0 +1,301 @@
+"""Offline load test: how many concurrent calls one uvicorn worker can relay.
+
+Runs three processes on localhost: the app in a single uvicorn worker
+(`--worker`, started by this script), `benchmarks.fake_realtime` playing OpenAI
+with caller turns, interruptions and `rag_search` calls, and this driver, which
+starts a `FakeTwilioCall` every 1/`--ramp` seconds until `--calls` are up, holds
+them for `--hold` seconds and hangs up.
+
+Every second it prints the active calls, the worker's event-loop lag (a 10 ms
+timer's overshoot), CPU and RSS, and the relay latency in both directions
+(timestamps carried in the audio itself). The summary gives per-call p50/p99
+outbound latency, inbound latency (which includes the batching window), tool
+round trips, and failed calls.
+
+Nothing leaves the machine: the worker gets dummy credentials, an unreachable
+MongoDB, an in-memory vector index built from `data/*.json`, and an OpenAI base
+URL pointing at the fake embeddings API served by the fake Realtime process.
+
+    python -m benchmarks.load_test [--calls 50] [--ramp 5] [--hold 20] [--audio call.ulaw]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_realtime import fake_embedding, percentiles
+from benchmarks.fake_twilio import FakeTwilioCall, load_audio
+
+LAG_INTERVAL = 0.01
+AUTH_TOKEN = "loadtest"  # the worker's TWILIO_AUTH_TOKEN, used to sign the fake webhooks
+
+
+# ---------------
+# Worker side (python -m benchmarks.load_test --worker)
+# ---------------
+
+class WorkerProbe:
+    """Event-loop lag, CPU and RSS of the worker process, reset on every read."""
+
+    def __init__(self) -> None:
+        self.lag = []
+        self._cpu = self._cpu_seconds()
+        self._at = time.perf_counter()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lag.append(max(loop.time() - started - LAG_INTERVAL, 0.0))
+
+    @staticmethod
+    def _cpu_seconds() -> float:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def _rss_mb() -> float:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, KiB on Linux
+
+    def read(self) -> dict:
+        now, cpu = time.perf_counter(), self._cpu_seconds()
+        report = {
+            "loop_lag_ms": percentiles(self.lag),
+            "cpu_percent": round(100 * (cpu - self._cpu) / max(now - self._at, 1e-6), 1),
+            "rss_mb": round(self._rss_mb(), 1),
+        }
+        self.lag, self._cpu, self._at = [], cpu, now
+        return report
+
+
+async def serve_worker(port: int) -> None:
+    import uvicorn
+    from config.services import LOGGING
+
+    # Keep the production log level, but spare the terminal.
+    LOGGING.console = False
+    import main
+
+    probe = WorkerProbe()
+    main.app.add_api_route("/loadtest/stats", probe.read, methods=["GET"])
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    lag = asyncio.create_task(probe.run())
+    try:
+        await server.serve()
+    finally:
+        lag.cancel()
+
+
+# ---------------
+# Driver side
+# ---------------
+
+def offline_environment(args, workdir: str) -> dict:
+    """Environment for the worker: every dependency on localhost or disabled."""
+    env = dict(os.environ)
+    env.update({
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": AUTH_TOKEN,
+        "TWILIO_PHONE_NUMBER": "+15550000000",
+        "GOOGLE_API_KEY": "loadtest",
+        "GOOGLE_CREDENTIALS_DIR": os.path.join(workdir, "google_credentials"),
+        "APPOINTMENT_INDEX_PATH": os.path.join(workdir, "appointments.sqlite"),
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_REALTIME_URL": f"ws://127.0.0.1:{args.realtime_port}/v1/realtime",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.embeddings_port}/v1",
+        "MONGO_URI": "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=200",
+        "MONGO_DATABASE_NAME": "loadtest",
+        "MONGO_COLLECTION_NAME_PRODUCTS": "products",
+        "MONGO_COLLECTION_NAME_SERVICES": "services",
+        "VECTOR_BACKEND": "memory",
+        "VECTOR_INDEX_PATH": os.path.join(workdir, "vector_index"),
+        "RETRIEVAL_MODE": "hybrid",
+        "STATE_BACKEND": "memory",
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "APP_URL": f"http://127.0.0.1:{args.port}",
+    })
+    env.pop("EMBEDDING_CACHE_PATH", None)
+    return env
+
+
+def build_vector_index(workdir: str) -> None:
+    """Persist the seed catalog with the fake embeddings API's vectors, so startup embeds nothing."""
+    from app.core.services.memory_vector_db import InMemoryVectorProvider
+
+    InMemoryVectorProvider({
+        "collection": {"products": "products", "services": "services"},
+        "path": os.path.join(workdir, "vector_index"),
+        "seed_dir": "data",
+    }, fake_embedding)
+
+
+async def wait_until_up(http: httpx.AsyncClient, url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            if (await http.get(url)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def format_ms(stats: dict) -> str:
+    if not stats["n"]:
+        return "      -       -"
+    return f"{stats['p50']:7.1f} {stats['p99']:7.1f}"
+
+
+async def drive(args, worker: subprocess.Popen, realtime: subprocess.Popen) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    stats_url = f"http://127.0.0.1:{args.realtime_port}/stats?reset"
+    audio = load_audio(args.audio)
+    async with httpx.AsyncClient(timeout=30) as http:
+        await wait_until_up(http, f"http://127.0.0.1:{args.realtime_port}/stats", realtime)
+        await wait_until_up(http, f"{base_url}/", worker)
+        await http.get(f"{base_url}/loadtest/stats")
+        await http.get(stats_url)
+
+        ramp_seconds = args.calls / args.ramp
+        call_seconds = ramp_seconds + args.hold
+        calls, tasks = [], []
+        peak = {"lag_p99": 0.0, "cpu": 0.0, "rss": 0.0}
+        seen = {}  # outbound samples already reported, per call
+
+        async def ramp() -> None:
+            for n in range(args.calls):
+                # Later calls are shorter so every call hangs up at the end of the hold.
+                call = FakeTwilioCall(
+                    base_url, audio, call_seconds - n / args.ramp, name=f"{n:06d}", auth_token=AUTH_TOKEN
+                )
+                calls.append(call)
+                tasks.append(asyncio.create_task(call.run(http)))
+                await asyncio.sleep(1 / args.ramp)
+
+        print(f"ramping to {args.calls} calls at {args.ramp:g}/s, holding {args.hold:g}s")
+        print("     t  calls  lag p50  lag p99  cpu %   rss MB   out p50 out p99    in p50  in p99  failed")
+        started = time.perf_counter()
+        ramper = asyncio.create_task(ramp())
+        while not ramper.done() or any(not task.done() for task in tasks):
+            await asyncio.sleep(1.0)
+            worker_stats = (await http.get(f"{base_url}/loadtest/stats")).json()
+            realtime_stats = (await http.get(stats_url)).json()
+            outbound = []
+            for call in calls:
+                outbound.extend(call.outbound_latency[seen.get(call.name, 0):])
+                seen[call.name] = len(call.outbound_latency)
+            lag = worker_stats["loop_lag_ms"]
+            peak["lag_p99"] = max(peak["lag_p99"], lag["p99"] or 0)
+            peak["cpu"] = max(peak["cpu"], worker_stats["cpu_percent"])
+            peak["rss"] = max(peak["rss"], worker_stats["rss_mb"])
+            active = sum(1 for call, task in zip(calls, tasks) if call.connected_at and not task.done())
+            failed = sum(1 for call in calls if call.error)
+            print(f"{time.perf_counter() - started:6.1f} {active:6d} {format_ms(lag)} "
+                  f"{worker_stats['cpu_percent']:6.1f} {worker_stats['rss_mb']:8.1f}  "
+                  f"{format_ms(percentiles(outbound))}   {format_ms(realtime_stats['inbound_latency_ms'])} {failed:7d}")
+
+        realtime_stats = (await http.get(f"http://127.0.0.1:{args.realtime_port}/stats")).json()
+        tools = (await http.get(f"{base_url}/tools")).json()
+        admission = (await http.get(f"{base_url}/calls")).json()["admission"]
+
+    completed = [call for call in calls if not call.error and not call.rejected]
+    per_call = [percentiles(call.outbound_latency) for call in completed if call.outbound_latency]
+    everything = percentiles([sample for call in completed for sample in call.outbound_latency])
+    print()
+    rejected = sum(1 for call in calls if call.rejected)
+    print(f"calls {len(calls)}, completed {len(completed)}, rejected {rejected}, "
+          f"failed {len(calls) - len(completed) - rejected}")
+    for call in calls:
+        if call.error:
+            print(f"   {call.name}: {call.error}")
+    if per_call:
+        print(f"outbound relay latency (OpenAI delta -> Twilio media), all frames: p50 {everything['p50']} ms, "
+              f"p99 {everything['p99']} ms, max {everything['max']} ms")
+        print(f"   per call: median p50 {statistics.median(c['p50'] for c in per_call):.1f} ms, "
+              f"median p99 {statistics.median(c['p99'] for c in per_call):.1f} ms, "
+              f"worst p99 {max(c['p99'] for c in per_call):.1f} ms")
+    first_audio = [call.first_audio for call in completed if call.first_audio is not None]
+    if first_audio:
+        print(f"first assistant audio after connect: {percentiles(first_audio)}")
+    late = sum(call.stats["late_frames"] for call in calls)
+    print(f"late inbound frames (driver fell behind real time): {late}")
+    print(f"worker peaks: loop lag p99 {peak['lag_p99']} ms, cpu {peak['cpu']}%, rss {peak['rss']} MB")
+    print(f"fake Realtime: {json.dumps({k: v for k, v in realtime_stats.items() if not k.endswith('_ms')})}")
+    print(f"   tool round trip (arguments.done -> response.create): {realtime_stats['tool_round_trip_ms']}")
+    print(f"admission: {json.dumps(admission)}")
+    print(f"tools: {json.dumps({name: stats for name, stats in tools.items() if stats['calls']})}")
+
+
+def run(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = offline_environment(args, workdir)
+    os.makedirs(env["GOOGLE_CREDENTIALS_DIR"])
+    # The worker's settings and the index builder read the same environment.
+    os.environ.update(env)
+    build_vector_index(workdir)
+
+    realtime = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_realtime",
+        "--port", str(args.realtime_port),
+        "--handshake-delay", "0", "--first-audio-delay", str(args.first_audio_delay),
+        "--turn-ms", str(args.turn_ms), "--function-call-every", str(args.function_call_every),
+        "--queries-from", "data/products.json", "--stamp",
+        "--embeddings-port", str(args.embeddings_port), "--embedding-latency", str(args.embedding_latency),
+    ], env=env, stdout=subprocess.DEVNULL)
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--worker", "--port", str(args.port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(drive(args, worker, realtime))
+    finally:
+        for process in (worker, realtime):
+            process.terminate()
+        for process in (worker, realtime):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    print(f"worker log: {env['LOG_FILE']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50, help="concurrent calls to ramp up to")
+    parser.add_argument("--ramp", type=float, default=5.0, help="new calls per second")
+    parser.add_argument("--hold", type=float, default=20.0, help="seconds all calls stay up")
+    parser.add_argument("--audio", help="8 kHz μ-law recording (raw or WAV) streamed by every call; a tone by default")
+    parser.add_argument("--turn-ms", type=int, default=3000, help="caller audio per turn; replies still playing get interrupted")
+    parser.add_argument("--function-call-every", type=int, default=2, help="the first and every Nth turn after it call rag_search")
+    parser.add_argument("--first-audio-delay", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=5070)
+    parser.add_argument("--realtime-port", type=int, default=9070)
+    parser.add_argument("--embeddings-port", type=int, default=9071)
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="seconds per fake embeddings request")
+    parser.add_argument("--verbose", action="store_true", help="show the worker's stderr")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(serve_worker(args.port))
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
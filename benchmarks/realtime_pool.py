@@ -0,0 +1,99 @@
+"""Offline check of the pre-warmed Realtime session pool.
+
+Starts `FakeRealtimeServer`, points `OPENAI_REALTIME_URL` at it and drives the
+real `OpenaiService` + `RealtimeSessionPool` through three scenarios:
+
+  1. time-to-first-audio for cold connections vs reserved warm sessions,
+  2. idle TTL expiry and refill,
+  3. health checks replacing sessions after the server drops them.
+
+    python -m benchmarks.realtime_pool [--calls 10] [--handshake-delay 0.3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fake_realtime import FakeRealtimeServer
+
+
+async def first_audio(ws) -> None:
+    async for message in ws:
+        if json.loads(message).get("type") == "response.audio.delta":
+            return
+
+
+async def time_to_first_audio(pool, reserve: bool) -> float:
+    start = time.perf_counter()
+    token = await pool.reserve() if reserve else None
+    async with pool.session(token) as ws:
+        await first_audio(ws)
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(args) -> None:
+    server = FakeRealtimeServer(
+        port=args.port, handshake_delay=args.handshake_delay, first_audio_delay=args.first_audio_delay
+    )
+    await server.start()
+
+    from app.core.services.openai import OpenaiService
+    from app.core.services.realtime_pool import RealtimeSessionPool
+
+    openai = OpenaiService()
+
+    def make_pool(**kwargs):
+        return RealtimeSessionPool(
+            connect=openai.websocket,
+            prepare=lambda ws: openai.update_session(ws, wait=True),
+            activate=openai.send_initial_conversation_item,
+            **kwargs,
+        )
+
+    print("1. time to first audio delta")
+    cold = make_pool(size=0)
+    cold_ms = [await time_to_first_audio(cold, reserve=False) for _ in range(args.calls)]
+    warm = make_pool(size=args.calls)
+    await warm.start(wait=True)
+    warm_ms = [await time_to_first_audio(warm, reserve=True) for _ in range(args.calls)]
+    await warm.close()
+    print(f"   cold p50 {statistics.median(cold_ms):7.1f} ms   max {max(cold_ms):7.1f} ms")
+    print(f"   warm p50 {statistics.median(warm_ms):7.1f} ms   max {max(warm_ms):7.1f} ms   pool stats {warm.stats}")
+
+    print("2. idle TTL expiry")
+    ttl = make_pool(size=2, idle_ttl=0.5, health_interval=0.25)
+    await ttl.start(wait=True)
+    first = {id(s) for s in ttl._idle}
+    await asyncio.sleep(1.5)
+    replaced = not first & {id(s) for s in ttl._idle}
+    print(f"   idle sessions {len(ttl._idle)}, all replaced: {replaced}, stats {ttl.stats}")
+    await ttl.close()
+
+    print("3. health check after server drops connections")
+    health = make_pool(size=2, health_interval=0.25, ping_timeout=0.5)
+    await health.start(wait=True)
+    await server.drop_all()
+    await asyncio.sleep(1.5)
+    alive = sum(s.ws.open for s in health._idle)
+    print(f"   idle sessions alive {alive}/{health.size}, stats {health.stats}")
+    await health.close()
+
+    await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--port", type=int, default=9051)
+    parser.add_argument("--handshake-delay", type=float, default=0.3)
+    parser.add_argument("--first-audio-delay", type=float, default=0.3)
+    args = parser.parse_args()
+    # Settings are read at import time, so the fake endpoint must be configured first.
+    os.environ["OPENAI_REALTIME_URL"] = f"ws://127.0.0.1:{args.port}/v1/realtime"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
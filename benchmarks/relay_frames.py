@@ -0,0 +1,98 @@
+"""Microbenchmark for the per-frame work done by the media-stream relay.
+
+Compares the original stdlib path (json.loads, base64 decode/encode, dict,
+json.dumps as done by `send_json`) with the orjson + pre-templated path in
+`app.utils.frames`. Runs on a single core, no sockets involved.
+
+    python -m benchmarks.relay_frames [--frames 200000] [--delta-bytes 2400]
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+from app.utils import frames
+
+STREAM_SID = "MZ" + "0" * 32
+
+
+def openai_delta_message(delta_bytes: int) -> str:
+    return json.dumps({
+        "type": "response.audio.delta",
+        "event_id": "event_abc123",
+        "response_id": "resp_abc123",
+        "item_id": "item_abc123",
+        "output_index": 0,
+        "content_index": 0,
+        "delta": base64.b64encode(os.urandom(delta_bytes)).decode("utf-8"),
+    })
+
+
+def twilio_media_message() -> str:
+    # One 20 ms μ-law frame at 8 kHz.
+    return json.dumps({
+        "event": "media",
+        "sequenceNumber": "42",
+        "streamSid": STREAM_SID,
+        "media": {
+            "track": "inbound",
+            "chunk": "41",
+            "timestamp": "820",
+            "payload": base64.b64encode(os.urandom(160)).decode("utf-8"),
+        },
+    })
+
+
+def outbound_before(message: str) -> str:
+    response = json.loads(message)
+    audio_payload = base64.b64encode(base64.b64decode(response['delta'])).decode('utf-8')
+    audio_delta = {"event": "media", "streamSid": STREAM_SID, "media": {"payload": audio_payload}}
+    return json.dumps(audio_delta, separators=(",", ":"), ensure_ascii=False)
+
+
+def outbound_after(message: str, template=frames.MediaFrameTemplate(STREAM_SID)) -> str:
+    response = frames.loads(message)
+    return template.render(response['delta'])
+
+
+def inbound_before(message: str) -> str:
+    data = json.loads(message)
+    return json.dumps({"type": "input_audio_buffer.append", "audio": data['media']['payload']})
+
+
+def inbound_after(message: str) -> str:
+    data = frames.loads(message)
+    return frames.audio_append_frame(data['media']['payload'])
+
+
+def measure(func, message: str, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        func(message)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--delta-bytes", type=int, default=2400, help="decoded size of one response.audio.delta")
+    args = parser.parse_args()
+
+    delta = openai_delta_message(args.delta_bytes)
+    media = twilio_media_message()
+    assert json.loads(outbound_before(delta)) == json.loads(outbound_after(delta))
+    assert json.loads(inbound_before(media)) == json.loads(inbound_after(media))
+
+    print(f"{'path':<34}{'before f/s':>14}{'after f/s':>14}{'speedup':>10}")
+    for name, before, after, message in (
+        ("OpenAI -> Twilio (audio.delta)", outbound_before, outbound_after, delta),
+        ("Twilio -> OpenAI (media)", inbound_before, inbound_after, media),
+    ):
+        b = measure(before, message, args.frames)
+        a = measure(after, message, args.frames)
+        print(f"{name:<34}{b:>14,.0f}{a:>14,.0f}{a / b:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
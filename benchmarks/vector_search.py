@@ -0,0 +1,111 @@
+"""Benchmark top-k retrieval: in-memory NumPy index vs Atlas $vectorSearch.
+
+Also runs the hybrid BM25 + vector retriever over the in-memory index, for
+queries naming a product and for vague ones, and counts the embedding calls
+each kind needed.
+
+Embeddings are deterministic pseudo-random vectors so the run needs no
+embeddings API. The Mongo path is measured only when `--mongo-uri` points at a
+deployment with a `vector_index` on the target collection; its documents are
+written by this script into a scratch collection and removed afterwards.
+
+    python -m benchmarks.vector_search [--docs 500] [--queries 200] [--mongo-uri mongodb+srv://...]
+"""
+import argparse
+import hashlib
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.services.hybrid_retriever import HybridRetriever
+from app.core.services.memory_vector_db import InMemoryVectorProvider
+from app.utils.functions import document_text
+
+DIMENSIONS = 1536
+
+
+def fake_embed(text: str) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIMENSIONS).astype(np.float32).tolist()
+
+
+def catalog(size: int) -> list:
+    return [
+        {"id": str(i), "name": f"Product {i}", "description": f"Description of product {i}", "type": "Misc", "price": i}
+        for i in range(size)
+    ]
+
+
+def measure(search, queries) -> list:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{name:<22}p50 {statistics.median(timings):8.3f} ms   p99 {p99:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mongo-uri")
+    parser.add_argument("--mongo-database", default="benchmarks")
+    args = parser.parse_args()
+
+    documents = catalog(args.docs)
+    queries = [f"question {i}" for i in range(args.queries)]
+    embeddings = {q: fake_embed(q) for q in queries}
+
+    embed_calls = [0]
+
+    def tokenizer(text):
+        embed_calls[0] += 1
+        return embeddings.get(text) or fake_embed(text)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = InMemoryVectorProvider({"collection": {}, "path": path}, tokenizer)
+        start = time.perf_counter()
+        for document in documents:
+            index.add_document(dict(document), "products", persist=False)
+        index.persist("products")
+        print(f"memory index built: {args.docs} docs in {(time.perf_counter() - start) * 1000:.0f} ms")
+        report("memory (numpy)", measure(lambda q: index.retrieve_similar(q, "products", k=args.k), queries))
+
+        hybrid = HybridRetriever(index, ["products"])
+        named = [f"do you have product {i}?" for i in range(args.queries)]
+        for label, batch in (("hybrid (named)", named), ("hybrid (vague)", queries)):
+            embed_calls[0] = 0
+            report(label, measure(lambda q: hybrid.retrieve_similar(q, "products", k=args.k), batch))
+            print(f"{'':<22}embedding calls {embed_calls[0]}/{len(batch)}")
+
+        start = time.perf_counter()
+        reloaded = InMemoryVectorProvider({"collection": {"products": None}, "path": path}, tokenizer)
+        print(f"memory index reloaded (mmap) in {(time.perf_counter() - start) * 1000:.1f} ms, {len(reloaded.collections['products'])} docs")
+
+    if not args.mongo_uri:
+        print("mongo ($vectorSearch)  skipped: pass --mongo-uri to compare")
+        return
+
+    from app.core.services.mongo_db import MongoDBProvider
+
+    mongo = MongoDBProvider({"uri": args.mongo_uri, "database": args.mongo_database, "collection": {}}, tokenizer)
+    mongo.db["products"].insert_many([dict(d, embedding=tokenizer(document_text(d, "products"))) for d in documents])
+    try:
+        report("mongo ($vectorSearch)", measure(lambda q: mongo.retrieve_similar(q, "products", k=args.k), queries))
+    finally:
+        mongo.db["products"].delete_many({"id": {"$in": [d["id"] for d in documents]}})
+        mongo.disconnect()
+
+
+if __name__ == "__main__":
+    main()
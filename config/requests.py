@@ -10,6 +10,9 @@ class OutgoingCallRequest(BaseModel):
     number: str
     # google_user_id: str | None = None
 
+class CampaignCreateRequest(BaseModel):
+    numbers: list[str]
+
 class DocumentsAddRequest(BaseModel):
     name: str
     description: str | None = None
@@ -18,13 +21,14 @@ class DocumentsAddRequest(BaseModel):
     type: str | None = None
     metadata: dict = {}
     id: int = None
-    workspace_id: int = None
+    workspace_id: str | None = None
 
 
 class CalendarAccountAddRequest(BaseModel):
     account_id: str
     credentials_info: dict
     calendar_id: str | None = "primary"
+    workspace_id: str | None = None
 
 
 class ScheduleAppointmentRequest(BaseModel):
@@ -6,6 +6,7 @@ class TwilioConfig(UserDict):
     welcome_message: str = 'Welcome to Solutions Two! Please wait while we connect your call to the voice assistant?'
     goodbye_message: str = 'Thank you for calling Solutions Two. Have a great day!'
     ready_message: str = ''
+    busy_message: str = 'All of our lines are busy right now. Please call again in a few minutes.'
     incomming_call_url: str = f'{settings.APP_URL}/incoming-call'
 
 class OpenAIConfig(UserDict):
@@ -19,88 +20,154 @@ class OpenAIConfig(UserDict):
         # "If the user asks for a service or product, provide detailed information and suggest scheduling an appointment if applicable."
     )
     voice: str = 'sage'
+    embedding_model: str = 'text-embedding-3-small'
+    transcription_model: str = 'gpt-4o-mini-transcribe'  # caller transcripts, streamed as deltas; feeds the RAG prefetch
 
 class MongoConfig(UserDict):
     k: int = 5
+    vector_index: str = 'vector_index'  # Atlas Vector Search index name on every collection
+    document_index: str = 'workspace_id_1_id_1'  # unique (workspace_id, id) index on every collection
+    embedding_dimensions: int = 1536  # OPENAI.embedding_model output size
+    similarity: str = 'cosine'
+    candidates_per_result: int = 20  # numCandidates = k * this, within the bounds below
+    min_candidates: int = 100
+    max_candidates: int = 10000  # Atlas upper limit
+
+class CalendarConfig(UserDict):
+    max_connections: int = 20  # pooled connections to the Calendar API per worker
+    max_keepalive_connections: int = 20  # keep equal to max_connections so bursts reuse connections
+    timeout: float = 10.0  # seconds per Calendar API request
+    refresh_margin: float = 300.0  # refresh access tokens this many seconds before they expire
+    refresh_interval: float = 60.0  # seconds between background token expiry checks
+    freebusy_ttl: float = 60.0  # seconds cached busy ranges are trusted without our own writes
+    lookup_concurrency: int = 10  # accounts probed at once when an event is missing from the appointment index
+    warmup_concurrency: int = 16  # accounts whose clients and tokens are prepared at once during startup
+
+class EmbeddingCacheConfig(UserDict):
+    max_size: int = 4096  # embeddings kept in memory per worker
+    ttl: float = 24 * 3600.0  # seconds an in-memory embedding stays valid
+    disk_ttl: float = 30 * 24 * 3600.0  # seconds an on-disk embedding stays valid
+    disk_prune_interval: float = 3600.0  # seconds between deletions of expired on-disk embeddings
+
+class RealtimePoolConfig(UserDict):
+    size: int = 2  # idle pre-initialized sessions kept per worker
+    idle_ttl: float = 300.0  # seconds an idle session is kept before it is recycled
+    reservation_ttl: float = 30.0  # seconds a session reserved by /incoming-call waits for /media-stream
+    health_interval: float = 15.0  # seconds between ping checks of idle sessions
+    ping_timeout: float = 5.0
+    # Start the greeting from /incoming-call. Only useful when /media-stream reaches the same worker;
+    # None turns it on for the per-process `memory` state backend (one worker) and off otherwise.
+    preactivate: bool | None = None
+
+class AudioConfig(UserDict):
+    batch_window_ms: int = 40  # inbound audio coalesced per input_audio_buffer.append; <= 20 disables batching
+    batch_max_window_ms: int = 100  # upper bound while the OpenAI socket is slow
+    slow_send_ms: float = 5.0  # a send slower than this widens the batching window
+    mark_interval_ms: int = 200  # outbound audio between Twilio playback marks
+
+class RelayConfig(UserDict):
+    inbound_max_ms: int = 1000  # caller audio queued for a slow OpenAI socket; the oldest frames are dropped beyond this
+    outbound_max_ms: int = 10000  # assistant audio queued for a slow Twilio socket before reading from OpenAI pauses
+    outbound_frame_ms: int = 500  # largest media frame merged from deltas waiting in the outbound queue
+
+class AdmissionConfig(UserDict):
+    max_calls: int = 40  # streams one worker relays at once, calls admitted but not yet streaming included; 0 disables
+    pending_ttl: float = 10.0  # seconds an admitted call counts toward max_calls before its stream starts
+    min_headroom: float = 0.05  # reject while any OpenAI rate limit has less than this share remaining before it resets
+    overflow_url: str = ''  # another node's /incoming-call to redirect rejected calls to; empty says TWILIO.busy_message and hangs up
+
+class IngestionConfig(UserDict):
+    batch_size: int = 100  # documents per embeddings request and bulk write
+    concurrency: int = 4  # batches in flight at once
+
+class HybridConfig(UserDict):
+    k1: float = 1.2  # BM25 term-frequency saturation
+    b: float = 0.75  # BM25 length normalization
+    name_weight: int = 3  # name terms count this many times
+    ambiguity_ratio: float = 1.5  # another fully named hit within this score ratio makes a lexical hit unconfident
+    candidates: int = 10  # results taken from each retriever before fusion
+    rrf_k: int = 60  # reciprocal-rank fusion constant
+
+class RagPrefetchConfig(UserDict):
+    enabled: bool = True  # search the knowledge base from caller transcripts before the model asks
+    resources: tuple = ('services', 'products')  # collections searched per prefetch
+    top_k: int = 5  # documents kept per prefetch; rag_search calls asking for more go to the database
+    min_words: int = 2  # content words (stopwords excluded) a partial transcript needs before the first prefetch
+    step_words: int = 3  # new content words before a growing partial transcript is searched again
+    min_overlap: float = 0.6  # share of the rag_search query's words that must appear in a prefetched transcript
+    max_entries: int = 16  # prefetched searches kept per call, newest first
+    ttl: float = 60.0  # seconds a prefetched result may answer rag_search
+    max_workers: int = 2  # threads for prefetch searches, shared by all calls; prefetches are skipped while all are busy
+
+class ToolsConfig(UserDict):
+    max_workers: int = 8  # threads shared by all calls in a worker for blocking tool handlers
+    timeout: float = 8.0  # seconds before a tool call is answered with an error, waiting for a slot included
+    concurrency: int = 4  # calls of one tool in flight at once across all calls in a worker
+    max_result_chars: int = 4000  # longer tool outputs are truncated before they reach the model
+    limits: dict = {  # per-tool overrides of concurrency, timeout and max_result_chars
+        'rag_search': {'concurrency': 8},
+        'schedule_appointment': {'concurrency': 2, 'timeout': 15.0},
+        'reschedule_appointment': {'concurrency': 2, 'timeout': 15.0},
+        'cancel_appointment': {'concurrency': 2, 'timeout': 15.0},
+    }
+
+class LoggingConfig(UserDict):
+    level: str = 'INFO'
+    queue_size: int = 10000  # records buffered for the writer thread; records beyond this are dropped
+    max_message_chars: int = 2000  # longer messages (e.g. response.done payloads) are truncated
+    console: bool = True  # mirror records to stderr, also from the writer thread
+    sample_every: dict = {  # keep one record in N for chatty event types
+        'rate_limits.updated': 10,
+        'input_audio_buffer.committed': 5,
+    }
+
+class StartupConfig(UserDict):
+    warmup_timeout: float = 20.0  # seconds startup waits for warm-up steps; slower ones finish in the background
+
+class CampaignConfig(UserDict):
+    cps: float = 1.0  # outbound calls placed per second (Twilio's default CPS for a number)
+    max_concurrent_calls: int = 10  # campaign calls in progress at once; keep within OpenAI Realtime capacity
+    max_attempts: int = 3  # per number, counting API errors and busy / no-answer / failed outcomes
+    backoff_base: float = 30.0  # seconds before the first retry, doubled per attempt
+    backoff_max: float = 600.0
+    api_timeout: float = 10.0  # seconds allowed for the Twilio create-call request
+    call_timeout: float = 900.0  # a placed call frees its slot after this long if no status callback arrives
+    poll_interval: float = 1.0  # seconds between the dialer's passes over shared campaign state
+    lease_ttl: float = 15.0  # the dialing worker's lease lapses after this long without a pass
+    retention: float = 86400.0  # seconds a finished campaign stays readable
+
+class SharedStateConfig(UserDict):
+    namespace: str = 'twosol'  # prefix for every shared-state key
+    max_active_calls: int = 0  # global cap across all workers and nodes; 0 disables it
+    call_ttl: float = 30.0  # an active call expires unless its worker refreshes it within this many seconds
+    rate_window: int = 60  # seconds per rate-counter window
 
 
 TWILIO = TwilioConfig()
 # TWILIO['incomming_call_url'] = f'{settings.APP_URL}/incoming-call'
 OPENAI = OpenAIConfig()
 MONGO = MongoConfig()
+CALENDAR = CalendarConfig()
+EMBEDDING_CACHE = EmbeddingCacheConfig()
+REALTIME_POOL = RealtimePoolConfig()
+AUDIO = AudioConfig()
+RELAY = RelayConfig()
+ADMISSION = AdmissionConfig()
+INGESTION = IngestionConfig()
+TOOLS = ToolsConfig()
+HYBRID = HybridConfig()
+RAG_PREFETCH = RagPrefetchConfig()
+STARTUP = StartupConfig()
+LOGGING = LoggingConfig()
+SHARED_STATE = SharedStateConfig()
+CAMPAIGN = CampaignConfig()
 
 
+# "tools" is added from the tool registry (app/core/services/call_tools.py) when the frame is built,
+# and "input_audio_transcription" when RAG_PREFETCH is enabled (nothing else reads the transcripts).
 OPENAI_SESSION_UPDATE = {
     "type": "session.update",
     "session": {
-        "tools": [
-            {
-                "type": "function",
-                "name": "rag_search",
-                "description": "Search the knowledge base and return relevant documents about services and products.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "The natural language query to search in the RAG database."
-                            },
-                            "resource": {
-                                "type": "string",
-                                "description": "The resource to search in the RAG database, only can be 'services' or 'products'.",
-                                "default": "services"
-                            },
-                            "top_k": {
-                                "type": "integer",
-                                "description": "Number of most relevant documents to return.",
-                                "default": 5
-                            }
-                        },
-                        "required": ["query"]
-                    }
-            },
-            {
-                "type": "function",
-                "name": "schedule_appointment",
-                "description": "Schedule an appointment to the calendar.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "account_id": {
-                            "type": "string",
-                            "description": "The calendar account ID."
-                        },
-                        "start_time": {
-                            "type": "string",
-                            "format": "date-time",
-                            "description": "Start time of the appointment in ISO 8601 format."
-                        },
-                        "end_time": {
-                            "type": "string",
-                            "format": "date-time",
-                            "description": "End time of the appointment in ISO 8601 format.",
-                            "default": "services"
-                        },
-                        "title": {
-                            "type": "string",
-                            "description": "Title of the appointment."
-                        },
-                        "description": {
-                            "type": ["string", "null"],
-                            "description": "Description of the appointment.",
-                            "default": None
-                        },
-                        "location": {
-                            "type": ["string", "null"],
-                            "description": "Location of the appointment.",
-                            "default": None
-                        }
-                    },
-                    "required": ["account_id", "start_time", "end_time", "title"]
-                }
-            },
-
-        ],
         "tool_choice": "auto",
         "turn_detection": {"type": "server_vad"},
         "input_audio_format": "g711_ulaw",
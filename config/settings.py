@@ -12,7 +12,18 @@ class Settings(BaseSettings):
     TWILIO_PHONE_NUMBER: str = Field(..., env="TWILIO_PHONE_NUMBER")
     GOOGLE_API_KEY: str = Field(..., env="GOOGLE_API_KEY")
     GOOGLE_CREDENTIALS_DIR: str = Field(default="config/google_credentials", env="GOOGLE_CREDENTIALS_DIR")
+    GOOGLE_CALENDAR_API_URL: str = Field(default="https://www.googleapis.com/calendar/v3", env="GOOGLE_CALENDAR_API_URL")
+    APPOINTMENT_INDEX_PATH: str = Field(default="data/appointments.sqlite", env="APPOINTMENT_INDEX_PATH")  # event id -> account
     OPENAI_API_KEY: str = Field(..., env="OPENAI_API_KEY")
+    OPENAI_REALTIME_URL: str = Field(default="wss://api.openai.com/v1/realtime", env="OPENAI_REALTIME_URL")
+    EMBEDDING_CACHE_PATH: str | None = Field(default=None, env="EMBEDDING_CACHE_PATH")  # sqlite file, disabled if unset
+    VECTOR_BACKEND: str = Field(default="mongo", env="VECTOR_BACKEND")  # "mongo" (Atlas $vectorSearch) or "memory"
+    VECTOR_INDEX_SOURCE: str = Field(default="seed", env="VECTOR_INDEX_SOURCE")  # "seed" (data/*.json) or "mongo"
+    RETRIEVAL_MODE: str = Field(default="hybrid", env="RETRIEVAL_MODE")  # "hybrid" (BM25 first, then fused) or "vector"
+    VECTOR_INDEX_PATH: str = Field(default="data/vector_index", env="VECTOR_INDEX_PATH")
+    STATE_BACKEND: str = Field(default="memory", env="STATE_BACKEND")  # "memory" (single worker) or "redis"
+    REDIS_URL: str = Field(default="redis://127.0.0.1:6379/0", env="REDIS_URL")
+    DEFAULT_WORKSPACE_ID: str | None = Field(default=None, env="DEFAULT_WORKSPACE_ID")  # used when a call names no workspace
     MONGO_URI: str = Field(..., env="MONGO_URI")
     MONGO_DATABASE_NAME: str = Field(..., env="MONGO_DATABASE_NAME")
     MONGO_COLLECTION_NAME_PRODUCTS: str = Field(..., env="MONGO_COLLECTION_NAME_PRODUCTS")
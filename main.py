@@ -1,11 +1,35 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.utils.log import configure_logging, shutdown_logging
+
+configure_logging()
+
 from app.routes import api
+from app.utils.startup import startup
 from config.settings import settings
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await api.warm_up()
+    heartbeat = asyncio.create_task(api.calls.heartbeat())
+    api.dialer.start()
+    yield
+    heartbeat.cancel()
+    await api.dialer.close()
+    await api.twilio.close()
+    await api.calendar.close()
+    await startup.cancel_pending()
+    await api.realtime_pool.close()
+    api.tools.shutdown()
+    api.prefetch_executor.shutdown()
+    api.state.close()
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -0,0 +1,60 @@
+"""Load catalog documents from a JSON array or NDJSON file into MongoDB.
+
+Documents are embedded in batches and upserted by `id`, so the command can be
+re-run safely after a partial import.
+
+    python -m scripts.load_documents data/products.json --collection products
+    python -m scripts.load_documents services.ndjson --collection services --batch-size 200 --concurrency 8
+"""
+import argparse
+import asyncio
+
+from app.core.services.embedding_cache import CachedEmbedder
+from app.core.services.ingestion import DocumentIngestor, iter_json_records
+from app.core.services.mongo_db import MongoDBProvider
+from app.core.services.openai import OpenaiService
+from config.requests import Collections
+from config.services import INGESTION, OPENAI
+from config.settings import settings
+
+
+async def read_chunks(path: str, size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+def print_progress(report: dict) -> None:
+    print(
+        f"batch {report['batches']}: received {report['received']}, upserted {report['upserted']}, "
+        f"modified {report['modified']}, failed {report['failed']} ({report['elapsed']}s)",
+        flush=True,
+    )
+
+
+async def load(args) -> dict:
+    openai = OpenaiService()
+    database = MongoDBProvider({
+        "uri": settings.MONGO_URI,
+        "database": settings.MONGO_DATABASE_NAME,
+        "collection": {}
+    }, CachedEmbedder(openai.embed, OPENAI.embedding_model, embed_many=openai.embed_many))
+    try:
+        ingestor = DocumentIngestor(database, batch_size=args.batch_size, concurrency=args.concurrency)
+        return await ingestor.ingest(iter_json_records(read_chunks(args.path)), args.collection, progress=print_progress)
+    finally:
+        database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSON array or NDJSON file")
+    parser.add_argument("--collection", required=True, choices=[c.value for c in Collections])
+    parser.add_argument("--batch-size", type=int, default=INGESTION.batch_size)
+    parser.add_argument("--concurrency", type=int, default=INGESTION.concurrency)
+    report = asyncio.run(load(parser.parse_args()))
+    print(f"Done: {report}")
+
+
+if __name__ == "__main__":
+    main()
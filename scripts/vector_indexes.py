@@ -0,0 +1,44 @@
+"""Create or update the Atlas Vector Search indexes used by `rag_search`.
+
+Each catalog collection gets `MONGO.vector_index` over `embedding` with
+`workspace_id` as a filter field, which workspace-scoped searches need, and the
+unique `MONGO.document_index` on `(workspace_id, id)` that document upserts go
+by. Without `--apply` the command only prints the definition and what would change.
+
+    python -m scripts.vector_indexes
+    python -m scripts.vector_indexes --apply --collection products
+"""
+import argparse
+import json
+
+from app.core.services.mongo_db import MongoDBProvider, vector_index_definition
+from config.requests import Collections
+from config.services import MONGO
+from config.settings import settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", action="append", choices=[c.value for c in Collections],
+                        help="limit to these collections (default: all)")
+    parser.add_argument("--apply", action="store_true", help="create or update the indexes")
+    args = parser.parse_args()
+
+    print(f"Index '{MONGO.vector_index}':")
+    print(json.dumps(vector_index_definition(), indent=2))
+    database = MongoDBProvider({
+        "uri": settings.MONGO_URI,
+        "database": settings.MONGO_DATABASE_NAME,
+        "collection": {}
+    })
+    try:
+        for resource in args.collection or [c.value for c in Collections]:
+            # rag_search and the loaders address collections by resource name.
+            print(f"{resource}: {database.ensure_vector_index(resource, apply=args.apply)}")
+            print(f"{resource} '{MONGO.document_index}': {database.ensure_document_index(resource, apply=args.apply)}")
+    finally:
+        database.disconnect()
+
+
+if __name__ == "__main__":
+    main()
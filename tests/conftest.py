@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Settings are validated on import; the tests only talk to local fakes.
+for name, value in {
+    "TWILIO_ACCOUNT_SID": "ACtest",
+    "TWILIO_AUTH_TOKEN": "test",
+    "TWILIO_PHONE_NUMBER": "+15550000000",
+    "GOOGLE_API_KEY": "test",
+    "OPENAI_API_KEY": "sk-test",
+    "MONGO_URI": "mongodb://127.0.0.1:9",
+    "MONGO_DATABASE_NAME": "test",
+    "MONGO_COLLECTION_NAME_PRODUCTS": "products",
+    "MONGO_COLLECTION_NAME_SERVICES": "services",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
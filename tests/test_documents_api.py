@@ -0,0 +1,30 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import api
+
+DOCUMENT = {"id": 1, "workspace_id": "w", "name": "Chair", "price": 299, "collection": "products"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(api.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_add_document_reports_a_failed_write(client, monkeypatch):
+    monkeypatch.setattr(api.database, "add_document", lambda document, collection: False)
+    response = client.post("/documents/add", json=DOCUMENT)
+    assert response.status_code == 500
+    assert response.json() == {"error": "Document could not be added."}
+
+
+def test_add_document(client, monkeypatch):
+    written = []
+    monkeypatch.setattr(api.database, "add_document", lambda document, collection: written.append(document) or True)
+    response = client.post("/documents/add", json=DOCUMENT)
+    assert response.status_code == 200
+    assert written[0]["price"] == 299
@@ -0,0 +1,52 @@
+import threading
+
+from app.core.services import embedding_cache
+from app.core.services.embedding_cache import SQLiteEmbeddingCache
+
+DAY = 24 * 3600.0
+
+
+def rows(cache):
+    return cache._conn.execute("SELECT key FROM embeddings ORDER BY key").fetchall()
+
+
+def test_expired_rows_are_deleted(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: clock[0])
+    cache = SQLiteEmbeddingCache(str(tmp_path / "embeddings.sqlite"), ttl=DAY, prune_interval=3600)
+    cache.set("old", [1.0])
+    cache.set("read", [2.0])
+    clock[0] += DAY + 1
+    assert cache.get("read") is None  # expired rows are deleted when read
+    assert rows(cache) == [("old",)]
+
+    cache.set("new", [3.0])  # the first write after prune_interval deletes the rest
+    assert rows(cache) == [("new",)]
+    assert cache.stats["evictions"] == 2
+    assert cache.get("new") == [3.0]
+
+
+def test_expired_rows_are_deleted_on_open(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: clock[0])
+    path = str(tmp_path / "embeddings.sqlite")
+    SQLiteEmbeddingCache(path, ttl=DAY).set("old", [1.0])
+    clock[0] += DAY + 1
+    assert rows(SQLiteEmbeddingCache(path, ttl=DAY)) == []
+
+
+def test_stats_add_up_across_threads(tmp_path):
+    cache = SQLiteEmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cache.set("hit", [1.0])
+
+    def lookups():
+        for _ in range(500):
+            cache.get("hit")
+            cache.get("miss")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats == {"hits": 4000, "misses": 4000, "evictions": 0}
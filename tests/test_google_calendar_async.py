@@ -0,0 +1,213 @@
+"""`AsyncGoogleCalendarService` against the fake Calendar API in `benchmarks.fake_calendar`."""
+import asyncio
+import json
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.services.appointment_index import AppointmentIndex
+from app.core.services.google_calendar import iter_credentials_files
+from app.core.services.google_calendar_async import AsyncGoogleCalendarService
+from app.core.services.shared_state import InMemoryStateProvider
+from benchmarks.fake_calendar import FakeCalendarServer
+
+START = datetime(2030, 1, 7, 9, tzinfo=timezone.utc)
+HALF_HOUR = timedelta(minutes=30)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_with_calendar(tmp_path, scenario, accounts=("alice",), workspaces=None, state=None):
+    """Run `scenario(server, calendar)` with a fresh fake server and client.
+
+    `workspaces` maps accounts to the workspace that owns them.
+    """
+
+    async def main():
+        server = FakeCalendarServer(port=free_port())
+        await server.start()
+        calendar = AsyncGoogleCalendarService(
+            base_url=server.api_url,
+            credentials_dir=str(tmp_path),
+            load_accounts=False,
+            appointments=AppointmentIndex(str(tmp_path / "appointments.sqlite")),
+            state=state,
+        )
+        for account in accounts:
+            workspace_id = (workspaces or {}).get(account)
+            calendar.add_account(account, server.credentials_info(account), persist=False, workspace_id=workspace_id)
+        try:
+            await scenario(server, calendar)
+        finally:
+            await calendar.close()
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_empty_calendar_is_free(tmp_path):
+    async def scenario(server, calendar):
+        assert await calendar.check_availability("alice", START, START + HALF_HOUR)
+        slots = await calendar.get_availability_slots("alice", START, START + 4 * HALF_HOUR)
+        assert [slot["start"] for slot in slots] == [START + i * HALF_HOUR for i in range(4)]
+
+    run_with_calendar(tmp_path, scenario)
+
+
+def test_scheduled_slot_becomes_busy(tmp_path):
+    async def scenario(server, calendar):
+        event_id = await calendar.schedule_appointment("alice", "Consultation", START, START + HALF_HOUR)
+        assert event_id
+        assert not await calendar.check_availability("alice", START, START + HALF_HOUR)
+        assert await calendar.check_availability("alice", START + HALF_HOUR, START + 2 * HALF_HOUR)
+        with pytest.raises(ValueError):
+            await calendar.schedule_appointment("alice", "Overlap", START, START + HALF_HOUR)
+
+    run_with_calendar(tmp_path, scenario)
+
+
+def test_freebusy_cache_answers_repeated_checks(tmp_path):
+    async def scenario(server, calendar):
+        await calendar.get_availability_slots("alice", START, START + 8 * HALF_HOUR)
+        queries = server.stats["freebusy"]
+        for i in range(8):
+            assert await calendar.check_availability("alice", START + i * HALF_HOUR, START + (i + 1) * HALF_HOUR)
+        assert server.stats["freebusy"] == queries
+
+    run_with_calendar(tmp_path, scenario)
+
+
+def test_reschedule_and_cancel_through_the_appointment_index(tmp_path):
+    async def scenario(server, calendar):
+        event_id = await calendar.schedule_appointment("bob", "Fitting", START, START + HALF_HOUR)
+        assert calendar.appointments.get(event_id) == ("bob", "primary")
+        assert await calendar.reschedule_appointment(event_id, START + HALF_HOUR, START + 2 * HALF_HOUR)
+        assert await calendar.check_availability("bob", START, START + HALF_HOUR)
+        assert not await calendar.check_availability("bob", START + HALF_HOUR, START + 2 * HALF_HOUR)
+        assert await calendar.cancel_appointment(event_id)
+        assert not server.events
+        assert calendar.appointments.get(event_id) is None
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob", "carol"))
+
+
+def test_event_missing_from_the_index_is_found_on_its_account(tmp_path):
+    async def scenario(server, calendar):
+        event_id = await calendar.schedule_appointment("carol", "Review", START, START + HALF_HOUR)
+        calendar.appointments.delete(event_id)
+        assert await calendar.cancel_appointment(event_id)
+        assert not server.events
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob", "carol"))
+
+
+def test_concurrent_requests_share_one_token_refresh(tmp_path):
+    async def scenario(server, calendar):
+        windows = [(START + i * HALF_HOUR, START + (i + 1) * HALF_HOUR) for i in range(10)]
+        results = await asyncio.gather(*(calendar.check_availability("alice", *window) for window in windows))
+        assert all(results)
+        assert server.stats["token_refreshes"] == 1
+
+    run_with_calendar(tmp_path, scenario)
+
+
+def test_revoked_token_is_refreshed_and_the_request_retried(tmp_path):
+    async def scenario(server, calendar):
+        assert await calendar.check_availability("alice", START, START + HALF_HOUR)
+        server.tokens.clear()
+        event_id = await calendar.schedule_appointment("alice", "Retry", START, START + HALF_HOUR)
+        assert event_id
+        assert server.stats["token_refreshes"] == 2
+
+    run_with_calendar(tmp_path, scenario)
+
+
+def test_unknown_account_is_rejected(tmp_path):
+    async def scenario(server, calendar):
+        with pytest.raises(ValueError):
+            await calendar.check_availability("mallory", START, START + HALF_HOUR)
+
+    run_with_calendar(tmp_path, scenario)
+
+
+TENANTS = {"alice": "w1", "bob": "w2"}
+
+
+def test_other_workspace_account_is_unknown(tmp_path):
+    async def scenario(server, calendar):
+        with pytest.raises(ValueError, match="Unknown Google Calendar account_id: bob"):
+            await calendar.check_availability("bob", START, START + HALF_HOUR, workspace_id="w1")
+        with pytest.raises(ValueError):
+            await calendar.schedule_appointment("bob", "Consultation", START, START + HALF_HOUR, workspace_id="w1")
+        assert server.stats["requests"] == 0
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob"), workspaces=TENANTS)
+
+
+def test_indexed_event_of_another_workspace_is_not_found(tmp_path):
+    async def scenario(server, calendar):
+        event_id = await calendar.schedule_appointment("bob", "Fitting", START, START + HALF_HOUR, workspace_id="w2")
+        requests = server.stats["requests"]
+        assert not await calendar.cancel_appointment(event_id, workspace_id="w1")
+        assert not await calendar.reschedule_appointment(event_id, START, START + HALF_HOUR, workspace_id="w1")
+        assert server.stats["requests"] == requests
+        assert await calendar.cancel_appointment(event_id, workspace_id="w2")
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob"), workspaces=TENANTS)
+
+
+def test_event_lookup_only_probes_the_workspace_accounts(tmp_path):
+    async def scenario(server, calendar):
+        event_id = await calendar.schedule_appointment("bob", "Fitting", START, START + HALF_HOUR)
+        calendar.appointments.delete(event_id)
+        with pytest.raises(RuntimeError):
+            await calendar.cancel_appointment(event_id, workspace_id="w1")
+        assert server.events
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob"), workspaces=TENANTS)
+
+
+def test_account_added_on_another_worker_is_picked_up(tmp_path):
+    state = InMemoryStateProvider()
+
+    async def scenario(server, calendar):
+        other = AsyncGoogleCalendarService(
+            base_url=server.api_url, credentials_dir=str(tmp_path), load_accounts=False,
+            appointments=calendar.appointments, state=state,
+        )
+        try:
+            other.add_account("dave", server.credentials_info("dave"), workspace_id="w3")
+            assert await calendar.check_availability("dave", START, START + HALF_HOUR, workspace_id="w3")
+            with pytest.raises(ValueError):
+                await calendar.check_availability("dave", START, START + HALF_HOUR, workspace_id="w1")
+        finally:
+            await other.close()
+
+    run_with_calendar(tmp_path, scenario, state=state)
+    assert json.loads((tmp_path / "dave.json").read_text())["workspace_id"] == "w3"
+
+
+def test_warm_up_fetches_every_token(tmp_path):
+    async def scenario(server, calendar):
+        assert await calendar.warm_up() == {}
+        assert server.stats["token_refreshes"] == 3
+        await calendar.check_availability("carol", START, START + HALF_HOUR)
+        assert server.stats["token_refreshes"] == 3
+
+    run_with_calendar(tmp_path, scenario, accounts=("alice", "bob", "carol"))
+
+
+def test_credentials_files_with_and_without_workspace(tmp_path):
+    (tmp_path / "legacy.json").write_text(json.dumps({"token": "a"}))
+    (tmp_path / "tenant.json").write_text(
+        json.dumps({"credentials_info": {"token": "b"}, "calendar_id": "team", "workspace_id": "w1"})
+    )
+    assert dict(iter_credentials_files(str(tmp_path))) == {
+        "legacy": {"credentials_info": {"token": "a"}, "calendar_id": "primary", "workspace_id": None},
+        "tenant": {"credentials_info": {"token": "b"}, "calendar_id": "team", "workspace_id": "w1"},
+    }
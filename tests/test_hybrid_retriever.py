@@ -0,0 +1,46 @@
+import zlib
+
+import numpy as np
+
+from app.core.services.hybrid_retriever import HybridRetriever
+from app.core.services.memory_vector_db import InMemoryVectorProvider
+
+CHAIR = {"id": "1", "workspace_id": "w", "name": "Office Chair", "type": "Furniture", "description": "Ergonomic", "price": 299}
+DESK = {"id": "2", "workspace_id": "w", "name": "Standing Desk", "type": "Furniture", "description": "Oak top", "price": 499}
+
+
+def embed(text):
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(8)
+
+
+def catalog():
+    vector = InMemoryVectorProvider({"collection": {}}, embed)
+    vector.add_documents([CHAIR, DESK], "products")
+    return vector
+
+
+def test_named_product_is_served_from_the_vector_store():
+    vector = catalog()
+    retriever = HybridRetriever(vector, ["products"])
+    # Another worker changes the price; only the shared store sees the write.
+    vector.add_document(dict(CHAIR, price=249), "products")
+    assert retriever.search_documents("how much is the office chair?", "products", k=1, workspace_id="w") == [
+        dict(CHAIR, price=249)
+    ]
+
+
+def test_fused_results_are_served_from_the_vector_store():
+    vector = catalog()
+    retriever = HybridRetriever(vector, ["products"])
+    vector.add_document(dict(DESK, price=450), "products")
+    documents = retriever.search_documents("something made of oak", "products", k=2, workspace_id="w")
+    assert dict(DESK, price=450) in documents
+    assert DESK not in documents
+
+
+def test_documents_removed_from_the_store_are_not_served():
+    vector = catalog()
+    retriever = HybridRetriever(vector, ["products"])
+    retriever.indexes["products"].add({"id": "3", "workspace_id": "w", "name": "Office Lamp"})
+    documents = retriever.search_documents("office lamp", "products", k=2, workspace_id="w")
+    assert all(document["id"] != "3" for document in documents)
@@ -0,0 +1,33 @@
+"""BM25 over non-ASCII catalogs: tokenization and lookups by name."""
+from app.core.services.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_keeps_accented_words_whole():
+    assert tokenize("Café Crème") == ["cafe", "creme"]
+    assert tokenize("STRASSE straße") == ["strasse", "strasse"]
+
+
+def test_tokenize_hebrew():
+    assert tokenize("מה המחיר של הכיסא המשרדי?") == ["המחיר", "הכיסא", "המשרדי"]
+    # Niqqud does not change the word.
+    assert tokenize("כִּסֵּא") == tokenize("כסא") == ["כסא"]
+
+
+def test_tokenize_splits_on_punctuation_and_underscores():
+    assert tokenize("snake_case, kebab-case; 42") == ["snake", "case", "kebab", "case", "42"]
+
+
+def test_hebrew_query_finds_hebrew_document():
+    index = BM25Index()
+    index.add({"id": 1, "workspace_id": "w", "name": "כיסא משרדי", "description": "כיסא ארגונומי עם משענת"})
+    index.add({"id": 2, "workspace_id": "w", "name": "שולחן עבודה", "description": "שולחן מעץ אלון"})
+    hits = index.search("כמה עולה כיסא משרדי", 2, "w")
+    assert [key for key, _, _ in hits] == [("w", 1)]
+    assert hits[0][2]  # every word of the name is in the query
+
+
+def test_accented_query_matches_unaccented_document():
+    index = BM25Index()
+    index.add({"id": 1, "name": "Creme brulee", "description": "Vanilla custard"})
+    hits = index.search("crème brûlée", 1)
+    assert hits and hits[0][0] == (None, 1)
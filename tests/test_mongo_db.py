@@ -0,0 +1,40 @@
+from app.core.services.mongo_db import MongoDBProvider
+
+
+class FakeCollection:
+    """Records writes; enough of a pymongo collection for `add_document`."""
+
+    def __init__(self):
+        self.documents = {}
+        self.inserted = []
+
+    def update_one(self, filter, update, upsert=False):
+        key = (filter["workspace_id"], filter["id"])
+        self.documents[key] = {**self.documents.get(key, {}), **update["$set"]}
+
+    def insert_one(self, document):
+        self.inserted.append(document)
+
+
+def provider(collection):
+    mongo = MongoDBProvider({"uri": "mongodb://unused", "database": "test"}, lazy=True)
+    mongo._db = {"products": collection}
+    mongo._connected = True
+    return mongo
+
+
+def test_add_document_upserts_by_workspace_and_id():
+    collection = FakeCollection()
+    mongo = provider(collection)
+    assert mongo.add_document({"id": 1, "workspace_id": "w", "name": "Chair", "price": 299}, "products")
+    assert mongo.add_document({"id": 1, "workspace_id": "w", "name": "Chair", "price": 249}, "products")
+    assert mongo.add_document({"id": 1, "workspace_id": "v", "name": "Chair", "price": 100}, "products")
+    assert collection.documents[("w", 1)]["price"] == 249
+    assert collection.documents[("v", 1)]["price"] == 100
+    assert not collection.inserted
+
+
+def test_add_document_without_id_is_inserted():
+    collection = FakeCollection()
+    assert provider(collection).add_document({"id": None, "workspace_id": "w", "name": "Chair"}, "products")
+    assert collection.inserted == [{"workspace_id": "w", "name": "Chair"}]
@@ -0,0 +1,63 @@
+"""`RagPrefetcher` fed with Hebrew transcripts, the language callers speak."""
+import asyncio
+
+from app.core.services.rag_prefetch import RagPrefetcher, bare_form
+from app.core.services.tool_executor import ToolExecutor
+
+CHAIR = {"id": 1, "workspace_id": "w", "name": "כיסא משרדי", "price": 450}
+
+
+def run_prefetcher(scenario, resources=("products",)):
+    async def main():
+        executor = ToolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        searches = []
+
+        def search(text, resource, k, workspace_id=None):
+            searches.append((text, resource, workspace_id))
+            return [CHAIR]
+
+        prefetcher = RagPrefetcher(search, executor, asyncio.create_task, "w", resources=resources)
+        try:
+            await scenario(prefetcher, searches)
+        finally:
+            executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_hebrew_transcript_starts_a_prefetch():
+    async def scenario(prefetcher, searches):
+        for delta in ("מה ", "המחיר ", "של ", "הכיסא ", "המשרדי"):
+            prefetcher.on_transcript_delta("item", delta)
+        await asyncio.sleep(0.05)
+        assert prefetcher.stats["prefetches"] == 1
+        assert searches and searches[0][1:] == ("products", "w")
+
+    run_prefetcher(scenario)
+
+
+def test_function_words_alone_do_not_prefetch():
+    async def scenario(prefetcher, searches):
+        for delta in ("היי, ", "מה ", "שלום? ", "אני ", "רוצה "):
+            prefetcher.on_transcript_delta("item", delta)
+        await asyncio.sleep(0.05)
+        assert prefetcher.stats["prefetches"] == 0
+
+    run_prefetcher(scenario)
+
+
+def test_query_without_prefix_letters_hits_the_prefetch():
+    async def scenario(prefetcher, searches):
+        prefetcher.on_transcript_done("item", "מה המחיר של הכיסא המשרדי")
+        documents = await prefetcher.lookup("מחיר כיסא משרדי", "products", 3)
+        assert documents == [CHAIR]
+        assert prefetcher.stats["hits"] == 1
+        assert await prefetcher.lookup("שולחן עבודה", "products", 3) is None
+
+    run_prefetcher(scenario)
+
+
+def test_bare_form_only_strips_hebrew_prefixes_from_longer_words():
+    assert bare_form("הכיסא") == "כיסא"
+    assert bare_form("שם") == "שם"
+    assert bare_form("chair") == "chair"
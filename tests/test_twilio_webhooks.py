@@ -0,0 +1,80 @@
+"""Twilio webhook routes, signed the way Twilio signs them."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from twilio.request_validator import RequestValidator
+
+from app.routes import api
+from config.settings import settings
+
+# Twilio posts every field it knows, including empty ones, and signs them all.
+CALL_FORM = {
+    "CallSid": "CA0123456789abcdef0123456789abcdef",
+    "From": "+972500000000",
+    "To": "+15550000000",
+    "FromCity": "",
+    "FromState": "",
+    "CallerZip": "",
+    "CallerState": "",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(api.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def sign(url: str, form: dict) -> dict:
+    return {"X-Twilio-Signature": RequestValidator(settings.TWILIO_AUTH_TOKEN).compute_signature(url, form)}
+
+
+def test_incoming_call_accepts_signed_form_with_blank_fields(client):
+    response = client.post("/incoming-call", data=CALL_FORM, headers=sign(api.incoming_call_url, CALL_FORM))
+    assert response.status_code == 200
+    assert b"<Stream" in response.content
+
+
+def test_incoming_call_signature_covers_the_query_string(client):
+    url = f"{api.incoming_call_url}?workspace=acme"
+    response = client.post("/incoming-call?workspace=acme", data=CALL_FORM, headers=sign(url, CALL_FORM))
+    assert response.status_code == 200
+    response = client.post("/incoming-call?workspace=other", data=CALL_FORM, headers=sign(url, CALL_FORM))
+    assert response.status_code == 403
+
+
+def test_incoming_call_rejects_unsigned_and_altered_requests(client):
+    assert client.post("/incoming-call", data=CALL_FORM).status_code == 403
+    headers = sign(api.incoming_call_url, CALL_FORM)
+    altered = {**CALL_FORM, "From": "+15559999999"}
+    assert client.post("/incoming-call", data=altered, headers=headers).status_code == 403
+
+
+STATUS_FORM = {
+    "CallSid": "CAfeedfacefeedfacefeedfacefeedface",
+    "CallStatus": "completed",
+    "CallDuration": "42",
+    "ToCity": "",
+    "ToState": "",
+    "CalledZip": "",
+}
+
+
+def test_campaign_status_callback_accepts_signed_form_with_blank_fields(client, monkeypatch):
+    reported = []
+
+    async def report_status(call_sid, status):
+        reported.append((call_sid, status))
+
+    monkeypatch.setattr(api.dialer, "report_status", report_status)
+    response = client.post(
+        "/campaigns/call-status", data=STATUS_FORM, headers=sign(api.campaign_status_url, STATUS_FORM)
+    )
+    assert response.status_code == 204
+    assert reported == [(STATUS_FORM["CallSid"], "completed")]
+
+
+def test_campaign_status_callback_rejects_unsigned_requests(client):
+    assert client.post("/campaigns/call-status", data=STATUS_FORM).status_code == 403